@@ -1,16 +1,24 @@
 import pandas as pd
+import multiprocessing
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from time import time
 
+from sources import DEFAULT_CITY, SOURCES, get_source, raw_files
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "notebooks"))
+from profiling import span
+from partitions import PARTITION_DIR, write_partitions
+from normalize import BUSINESS_TYPE_CANONICAL, STATUS_CANONICAL, normalize_labels
+from changepoint import refresh_crisis_windows
+from licences import CRISES_FILE
+
 # Create cleaned directory
 os.makedirs("data/cleaned", exist_ok=True)
 
-RAW_FILES = {
-    "1997_2012": "data/raw/1997_2012.csv",
-    "2013_2024": "data/raw/2013_2024.csv",
-    "current_2024_plus": "data/raw/current_2024_plus.csv"
-}
-
+# Merged default-city extract read by the analysis scripts
+CLEANED_FILE = "data/cleaned/business_licences_1997_2024.csv"
 
 
 def clean_column_names(df):
@@ -27,107 +35,163 @@ def clean_column_names(df):
 def normalize_status(df):
     """Normalize status values"""
     if "status" in df.columns:
-        df["status"] = (
-            df["status"]
-            .astype(str)
-            .str.lower()
-            .str.strip()
-            .replace({
-                "expired": "closed",
-                "closed": "closed",
-                "active": "active"
-            })
-        )
+        df["status"] = normalize_labels(df["status"], STATUS_CANONICAL, drop_markers=())
     return df
 
 def normalize_business_type(df):
-    """Normalize business type and subtype"""
-    for col in ["businesstype", "businesssubtype"]:
+    """Normalize business type and subtype to cross-era labels (*historic* markers removed)"""
+    if "businesstype" in df.columns:
+        df["businesstype"] = normalize_labels(df["businesstype"], BUSINESS_TYPE_CANONICAL)
+    if "businesssubtype" in df.columns:
+        df["businesssubtype"] = normalize_labels(df["businesssubtype"])
+    return df
+
+def apply_column_mapping(df, source):
+    """Rename source columns to the canonical (Vancouver) names"""
+    return df.rename(columns=source["columns"])
+
+def add_issue_year(df, date_formats):
+    """Add the issue year used to partition the cleaned store"""
+    for col in ["issueddate", "issued_date"]:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.lower().str.strip()
+            issued = pd.to_datetime(df[col], errors="coerce", format=date_formats.get(col), utc=True)
+            df["year"] = issued.dt.year
+            break
     return df
 
-if __name__ == "__main__":
-    print("=" * 60)
-    print("CLEANING AND MERGING DATA")
-    print("=" * 60)
-    
-    total_start = time()
-    cleaned_dfs = []
+def clean_extract(city, name, file_path):
+    """Load and clean one raw extract"""
+    source = get_source(city)
+    file_start = time()
+    print(f"\nProcessing {city}/{name}...")
 
-    for name, file_path in RAW_FILES.items():
-        if not os.path.exists(file_path):
-            print(f"⚠️ WARNING: {file_path} not found, skipping...")
-            continue
-        
-        file_start = time()
-        print(f"\nProcessing {name}...")
-        
-        # Read with dtype optimization for large files
+    # Read with dtype optimization for large files
+    with span(f"load {name}") as stage:
         df = pd.read_csv(file_path, low_memory=False)
-        print(f"  Loaded: {len(df):,} rows, {len(df.columns)} columns ({time()-file_start:.1f}s)")
-        
-        # Clean column names
-        df = clean_column_names(df)
-        
+        stage.rows = len(df)
+    print(f"  Loaded: {len(df):,} rows, {len(df.columns)} columns ({time()-file_start:.1f}s)")
 
-        # Normalize data
+    # Clean column names
+    df = clean_column_names(df)
+    df = apply_column_mapping(df, source)
+
+    # Normalize data
+    with span("normalize", rows=len(df)):
         df = normalize_status(df)
         df = normalize_business_type(df)
-        
-        # Add year if issue date exists
-        if "issueddate" in df.columns:
-            df["year"] = pd.to_datetime(df["issueddate"], errors="coerce").dt.year
-        elif "issued_date" in df.columns:
-            df["year"] = pd.to_datetime(df["issued_date"], errors="coerce").dt.year
-        
-        # Replace string 'nan' with actual NA
+
+    # Add year if issue date exists
+    with span("parse dates", rows=len(df)):
+        df = add_issue_year(df, source["date_formats"])
+
+    # Replace string 'nan' with actual NA
+    with span("replace nan", rows=len(df)):
         df = df.replace('nan', pd.NA)
-        
-        file_time = time() - file_start
-        print(f"  ✓ Cleaned: {len(df):,} records with {len(df.columns)} columns ({file_time:.1f}s)")
-        cleaned_dfs.append(df)
-
-    # Merge all dataframes
-    if cleaned_dfs:
-        print("\nMerging all datasets...", end=" ")
-        merge_start = time()
+
+    file_time = time() - file_start
+    print(f"  ✓ Cleaned: {len(df):,} records with {len(df.columns)} columns ({file_time:.1f}s)")
+    return df
+
+def clean_city(city):
+    """Clean all of a city's extracts and write its city/year partitions.
+
+    The default city is also written as the merged CLEANED_FILE, and the
+    detected crisis windows (changepoint.py) are recomputed from it. Returns a
+    summary dict (the frame itself stays in the worker).
+    """
+    cleaned_dfs = []
+    for name, file_path in raw_files(city).items():
+        if not os.path.exists(file_path):
+            print(f"⚠️ WARNING: {file_path} not found, skipping...")
+            continue
+        cleaned_dfs.append(clean_extract(city, name, file_path))
+    if not cleaned_dfs:
+        return None
+
+    with span("merge") as stage:
         merged_df = pd.concat(cleaned_dfs, ignore_index=True)
-        print(f"done ({time()-merge_start:.1f}s)")
-        
-        # Save with progress
-        output_file = "data/cleaned/business_licences_1997_2024.csv"
-        print(f"Saving to {output_file}...", end=" ")
-        save_start = time()
-        merged_df.to_csv(output_file, index=False)
-        print(f"done ({time()-save_start:.1f}s)")
+        stage.rows = len(merged_df)
+
+    with span("save partitions", rows=len(merged_df)):
+        manifest = write_partitions(merged_df, city)
+    if city == DEFAULT_CITY:
+        with span("save", rows=len(merged_df)):
+            merged_df.to_csv(CLEANED_FILE, index=False)
+        with span("detect crises"):
+            refresh_crisis_windows()
+
+    return {
+        "city": city,
+        "rows": len(merged_df),
+        "columns": list(merged_df.columns),
+        "partitions": len(manifest["partitions"]),
+        "memory_mb": merged_df.memory_usage(deep=True).sum() / 1024**2,
+        "nulls": merged_df.isna().sum(),
+        "head": merged_df.head(),
+        "status": merged_df["status"].value_counts() if "status" in merged_df.columns else None,
+        "top_types": (merged_df["businesstype"].value_counts().head(10)
+                      if "businesstype" in merged_df.columns else None),
+    }
+
+def clean_cities(cities, max_workers=None):
+    """Clean cities in parallel (one worker per city); returns {city: summary}"""
+    if len(cities) <= 1 or max_workers == 1:
+        return {city: clean_city(city) for city in cities}
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork") if "fork" in methods else None
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        return dict(zip(cities, executor.map(clean_city, cities)))
 
-        total_time = time() - total_start
 
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Clean raw licence extracts into city/year partitions")
+    parser.add_argument("--cities", default=",".join(SOURCES), help=f"comma-separated subset of {list(SOURCES)}")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CLEANING AND MERGING DATA")
+    print("=" * 60)
+    
+    total_start = time()
+    summaries = clean_cities(args.cities.split(","), max_workers=args.workers)
+    total_time = time() - total_start
+
+    if any(summaries.values()):
         print("\n" + "=" * 60)
         print("COMPLETE!")
         print("=" * 60)
-        print(f"Total records: {len(merged_df):,}")
-        print(f"Total columns: {len(merged_df.columns)}")
-        print(f"Column names: {list(merged_df.columns)}")
         print(f"Total processing time: {total_time:.1f}s ({total_time/60:.1f} minutes)")
-        print(f"\nMemory usage: ~{merged_df.memory_usage(deep=True).sum() / 1024**2:.1f} MB")
+
+    for city, summary in summaries.items():
+        if summary is None:
+            print(f"\n⚠️ ERROR: No data to merge for {city}!")
+            continue
+        print(f"\n{city.upper()}")
+        print(f"Total records: {summary['rows']:,}")
+        print(f"Total columns: {len(summary['columns'])}")
+        print(f"Column names: {summary['columns']}")
+        print(f"✓ Saved: {PARTITION_DIR}/city={city}/ ({summary['partitions']} year partitions)")
+        if city == DEFAULT_CITY:
+            print(f"✓ Saved: {CLEANED_FILE}")
+            print(f"✓ Saved: {CRISES_FILE}")
+        print(f"\nMemory usage: ~{summary['memory_mb']:.1f} MB")
         print(f"\nData quality:")
         print(f"  Null values per column:")
-        for col in merged_df.columns:
-            null_count = merged_df[col].isna().sum()
-            null_pct = (null_count / len(merged_df)) * 100
+        for col, null_count in summary["nulls"].items():
+            null_pct = (null_count / summary["rows"]) * 100
             print(f"    {col}: {null_count:,} ({null_pct:.1f}%)")
         
         print("\nSample data:")
-        print(merged_df.head())
+        print(summary["head"])
         
         print("\nValue counts for key columns:")
-        if "status" in merged_df.columns:
+        if summary["status"] is not None:
             print("\nStatus distribution:")
-            print(merged_df["status"].value_counts())
-        if "businesstype" in merged_df.columns:
+            print(summary["status"])
+        if summary["top_types"] is not None:
             print("\nTop 10 business types:")
-            print(merged_df["businesstype"].value_counts().head(10))
-    else:
-        print("\n⚠️ ERROR: No data to merge!")
\ No newline at end of file
+            print(summary["top_types"])
@@ -0,0 +1,207 @@
+import pandas as pd
+import numpy as np
+import os
+from time import time
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.feature_extraction.text import HashingVectorizer
+
+CLEANED_FILE = "data/cleaned/business_licences_1997_2024.csv"
+MATCHES_FILE = "data/cleaned/business_matches.csv"
+ENTITIES_FILE = "data/cleaned/business_entities.csv"
+
+# Words that differ between registrations of the same business
+LEGAL_SUFFIXES = r"\b(?:ltd|limited|inc|incorporated|corp|corporation|co|company|llp|llc|the)\b"
+
+# Blocking passes: (block key column, sort column). Each pass is a sorted
+# neighbourhood scan, so comparisons grow with rows * window, not rows^2.
+BLOCKING_PASSES = [
+    ("postal_key", "match_key"),
+    ("localarea_key", "match_key"),
+    ("token_key", "location_key"),
+]
+
+# A shared postal code (or, at half weight, local area) adds up to this much
+# to the name similarity. Pairs with no shared location - businesses that
+# moved between extracts - are accepted on name similarity alone against the
+# stricter NAME_ONLY_THRESHOLD.
+LOCATION_BONUS = 0.1
+NAME_ONLY_THRESHOLD = 0.95
+
+# Character trigrams hashed into a fixed-width sparse space (no vocabulary to fit)
+_vectorizer = HashingVectorizer(
+    analyzer="char_wb", ngram_range=(3, 3), n_features=2**20,
+    alternate_sign=False, norm="l2"
+)
+
+
+def normalize_names(names):
+    """Lowercase, drop punctuation and legal suffixes from business names"""
+    return (
+        names
+        .fillna("")
+        .astype(str)
+        .str.lower()
+        .str.replace("&", " and ", regex=False)
+        .str.replace(r"[^0-9a-z ]", " ", regex=True)
+        .str.replace(LEGAL_SUFFIXES, " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def build_match_keys(df):
+    """Build normalized name and blocking keys for every licence"""
+    keys = pd.DataFrame(index=df.index)
+    keys["name_key"] = normalize_names(df.get("businessname", pd.Series(index=df.index, dtype=object)))
+    keys["trade_key"] = normalize_names(df.get("businesstradename", pd.Series(index=df.index, dtype=object)))
+
+    postal = df.get("postalcode", pd.Series(index=df.index, dtype=object))
+    keys["postal_key"] = postal.fillna("").astype(str).str.upper().str.replace(r"\s+", "", regex=True)
+    area = df.get("localarea", pd.Series(index=df.index, dtype=object))
+    keys["localarea_key"] = area.fillna("").astype(str).str.lower().str.strip()
+    # Licences with only a trade name block and sort on it instead
+    keys["match_key"] = keys["name_key"].where(keys["name_key"] != "", keys["trade_key"])
+    keys["token_key"] = keys["match_key"].str.split(" ", n=1).str[0].fillna("")
+    keys["location_key"] = keys["postal_key"] + "|" + keys["localarea_key"] + "|" + keys["match_key"]
+    return keys
+
+
+def candidate_pairs(keys, window=5):
+    """Sorted-neighbourhood candidate pairs over all blocking passes.
+
+    Returns two aligned int arrays (left, right) of row positions with left < right.
+    """
+    has_name = (keys["match_key"] != "").to_numpy()
+    pairs = []
+    for block_col, sort_col in BLOCKING_PASSES:
+        block = keys[block_col].to_numpy()
+        valid = np.flatnonzero(has_name & (block != ""))
+        if len(valid) < 2:
+            continue
+        order = valid[np.lexsort((keys[sort_col].to_numpy()[valid], block[valid]))]
+        block_codes = pd.factorize(block[order])[0]
+        for k in range(1, window + 1):
+            same = block_codes[:-k] == block_codes[k:]
+            left, right = order[:-k][same], order[k:][same]
+            pairs.append(np.stack([np.minimum(left, right), np.maximum(left, right)]))
+
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.unique(np.concatenate(pairs, axis=1), axis=1)
+    return pairs[0], pairs[1]
+
+
+def rowwise_similarity(vectors_a, vectors_b, left, right):
+    """Cosine similarity of row left[i] in vectors_a with row right[i] in vectors_b"""
+    if len(left) == 0:
+        return np.empty(0)
+    return np.asarray(vectors_a[left].multiply(vectors_b[right]).sum(axis=1)).ravel()
+
+
+def score_pairs(keys, left, right):
+    """Score candidate pairs; returns a DataFrame with similarities and confidence"""
+    names = _vectorizer.transform(keys["name_key"])
+    trades = _vectorizer.transform(keys["trade_key"])
+
+    name_sim = rowwise_similarity(names, names, left, right)
+    trade_sim = rowwise_similarity(trades, trades, left, right)
+    # A business may register its trade name as the legal name on another licence
+    cross_sim = np.maximum(
+        rowwise_similarity(names, trades, left, right),
+        rowwise_similarity(trades, names, left, right),
+    )
+    best_sim = np.maximum.reduce([name_sim, trade_sim, cross_sim])
+
+    postal = keys["postal_key"].to_numpy()
+    area = keys["localarea_key"].to_numpy()
+    same_postal = (postal[left] != "") & (postal[left] == postal[right])
+    same_area = (area[left] != "") & (area[left] == area[right])
+    location = np.where(same_postal, 1.0, np.where(same_area, 0.5, 0.0))
+
+    return pd.DataFrame({
+        "left": left,
+        "right": right,
+        "name_similarity": name_sim,
+        "tradename_similarity": trade_sim,
+        "location_score": location,
+        "confidence": np.minimum(best_sim + LOCATION_BONUS * location, 1.0),
+    })
+
+
+def resolve_entities(df, window=5, threshold=0.85, name_only_threshold=NAME_ONLY_THRESHOLD):
+    """Link licences belonging to the same business.
+
+    Pairs sharing a postal code or local area are accepted at `threshold`;
+    pairs with no shared location need `name_only_threshold`.
+
+    Returns (entities, matches): entities has one row per licence with an
+    entity_id, entity_size and match_confidence (best accepted link, NaN for
+    singletons); matches holds every accepted pair with its confidence.
+    """
+    keys = build_match_keys(df)
+    left, right = candidate_pairs(keys, window=window)
+    scored = score_pairs(keys, left, right)
+    required = np.where(scored["location_score"] > 0, threshold, name_only_threshold)
+    matches = scored[scored["confidence"] >= required].reset_index(drop=True)
+
+    n = len(df)
+    graph = coo_matrix(
+        (np.ones(len(matches)), (matches["left"].to_numpy(), matches["right"].to_numpy())),
+        shape=(n, n)
+    )
+    _, labels = connected_components(graph, directed=False)
+
+    best = np.zeros(n)
+    conf = matches["confidence"].to_numpy()
+    np.maximum.at(best, matches["left"].to_numpy(), conf)
+    np.maximum.at(best, matches["right"].to_numpy(), conf)
+    best[best == 0] = np.nan
+
+    entities = pd.DataFrame({
+        "entity_id": labels,
+        "entity_size": np.bincount(labels)[labels],
+        "match_confidence": best,
+    }, index=df.index)
+    return entities, matches
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("RESOLVING BUSINESS ENTITIES")
+    print("=" * 60)
+
+    total_start = time()
+    df = pd.read_csv(CLEANED_FILE, low_memory=False)
+    print(f"Loaded: {len(df):,} licences ({time()-total_start:.1f}s)")
+
+    match_start = time()
+    entities, matches = resolve_entities(df)
+    print(f"  ✓ Accepted {len(matches):,} matches in {time()-match_start:.1f}s")
+
+    id_cols = [c for c in ["licencersn", "licencenumber", "businessname", "businesstradename",
+                           "postalcode", "localarea", "folderyear"] if c in df.columns]
+    entities = pd.concat([df[id_cols], entities], axis=1)
+
+    if "licencenumber" in df.columns:
+        licence_numbers = df["licencenumber"].to_numpy()
+        matches["left_licence"] = licence_numbers[matches["left"]]
+        matches["right_licence"] = licence_numbers[matches["right"]]
+
+    os.makedirs("data/cleaned", exist_ok=True)
+    entities.to_csv(ENTITIES_FILE, index=False)
+    matches.to_csv(MATCHES_FILE, index=False)
+
+    n_entities = entities["entity_id"].nunique()
+    print(f"\nLicences: {len(entities):,}")
+    print(f"Distinct businesses: {n_entities:,}")
+    print(f"Linked licences: {(entities['entity_size'] > 1).sum():,}")
+    print(f"\nLargest entities:")
+    largest = entities.groupby("entity_id").agg(
+        businessname=("businessname", "first"), licences=("entity_size", "size")
+    ).nlargest(10, "licences")
+    print(largest.to_string(index=False))
+
+    print(f"\n✓ Saved → {ENTITIES_FILE}")
+    print(f"✓ Saved → {MATCHES_FILE}")
+    print(f"Total time: {time()-total_start:.1f}s")
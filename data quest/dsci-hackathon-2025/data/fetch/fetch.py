@@ -1,23 +1,25 @@
 import requests
 import pandas as pd
 import os
+import sys
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from time import time
 
-# Create directories
-os.makedirs("data/raw", exist_ok=True)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "notebooks"))
+from profiling import span
 
-DATASETS = {
-    "current_2024_plus": "business-licences",
-    "1997_2012": "business-licences-1997-to-2012",
-    "2013_2024": "business-licences-2013-to-2024"
-}
+from sources import SOURCES, get_source, raw_path
 
-BASE_URL = "https://opendata.vancouver.ca/api/explore/v2.1/catalog/datasets/{}/records"
+# LICENCE_API_URL points the fetcher at another endpoint (e.g. the benchmark's local API)
+# instead of each source's registered base_url
+API_URL_OVERRIDE = os.environ.get("LICENCE_API_URL")
 
-def fetch_page(dataset_id, offset, limit=100):
+def base_url(city):
+    return API_URL_OVERRIDE or get_source(city)["base_url"]
+
+def fetch_page(base_url, dataset_id, offset, limit=100):
     """Fetch a single page of records"""
-    url = f"{BASE_URL.format(dataset_id)}?limit={limit}&offset={offset}"
+    url = f"{base_url.format(dataset_id)}?limit={limit}&offset={offset}"
     try:
         r = requests.get(url, timeout=30)
         r.raise_for_status()
@@ -27,12 +29,12 @@ def fetch_page(dataset_id, offset, limit=100):
         print(f"  ⚠️ Error at offset {offset}: {e}")
         return [], 0  # FIXED: was just "exit"
 
-def fetch_all_records(dataset_id, max_workers=10):
+def fetch_all_records(base_url, dataset_id, max_workers=10):
     """Fetch all records using parallel requests"""
     
     # First request to get total count
     print(f"  Getting total count...", end=" ")
-    first_page, total_count = fetch_page(dataset_id, 0)
+    first_page, total_count = fetch_page(base_url, dataset_id, 0)
     print(f"{total_count:,} records to fetch")
     
     if total_count == 0:
@@ -51,7 +53,7 @@ def fetch_all_records(dataset_id, max_workers=10):
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Submit all fetch tasks
         future_to_offset = {
-            executor.submit(fetch_page, dataset_id, offset, limit): offset 
+            executor.submit(fetch_page, base_url, dataset_id, offset, limit): offset 
             for offset in offsets
         }
         
@@ -75,25 +77,34 @@ def fetch_all_records(dataset_id, max_workers=10):
     
     return all_records
 
-def fetch_and_save(name, dataset_id, max_workers=10):
-    """Fetch data from API and save to CSV"""
-    print(f"\nDataset: {name}")
+def fetch_and_save(city, name, dataset_id, max_workers=10):
+    """Fetch data from API and save to the city's raw CSV"""
+    print(f"\nDataset: {city}/{name}")
     
-    all_records = fetch_all_records(dataset_id, max_workers=max_workers)
+    with span(f"fetch {name}") as stage:
+        all_records = fetch_all_records(base_url(city), dataset_id, max_workers=max_workers)
+        stage.rows = len(all_records)
     
     if not all_records:
         print(f"  ⚠️ WARNING: No records fetched for {name}")
         return None
     
-    df = pd.DataFrame(all_records)
-    
-    output_path = f"data/raw/{name}.csv"
-    df.to_csv(output_path, index=False)
+    output_path = raw_path(city, name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with span("save", rows=len(all_records)):
+        df = pd.DataFrame(all_records)
+        df.to_csv(output_path, index=False)
     print(f"  ✓ Saved → {output_path}")
     
     return df
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch raw licence extracts for registered cities")
+    parser.add_argument("--cities", default=",".join(SOURCES), help=f"comma-separated subset of {list(SOURCES)}")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("FAST PARALLEL FETCHING FROM APIs")
     print("=" * 60)
@@ -105,8 +116,9 @@ if __name__ == "__main__":
     # 10-20 is usually a good balance
     MAX_WORKERS = 15
     
-    for name, dataset_id in DATASETS.items():
-        fetch_and_save(name, dataset_id, max_workers=MAX_WORKERS)
+    for city in args.cities.split(","):
+        for name, dataset_id in get_source(city)["datasets"].items():
+            fetch_and_save(city, name, dataset_id, max_workers=MAX_WORKERS)
     
     total_elapsed = time() - total_start
     
@@ -0,0 +1,53 @@
+import os
+
+# Registry of business licence sources, one entry per city.
+#
+#   base_url      records endpoint; "{}" is replaced by the dataset id
+#   pager         response layout fetch.py understands ("opendatasoft": limit/offset
+#                 paging returning {"results": [...], "total_count": n})
+#   raw_dir       where fetch.py writes <extract>.csv and clean.py reads it
+#   datasets      {extract name: dataset id}; cleaned rows keep this order
+#   columns       {source column: canonical column}, applied after clean_column_names
+#   date_formats  {canonical column: pandas to_datetime format}
+#
+# Canonical columns are the Vancouver ones (see business_licences_1997_2024.csv).
+# Adding a city is a new entry here; fetch.py and clean.py pick it up and
+# clean.py writes it to its own city=<name> partitions (partitions.py).
+
+DEFAULT_CITY = "vancouver"
+
+PAGERS = ["opendatasoft"]
+
+SOURCES = {
+    "vancouver": {
+        "base_url": "https://opendata.vancouver.ca/api/explore/v2.1/catalog/datasets/{}/records",
+        "pager": "opendatasoft",
+        "raw_dir": "data/raw",
+        "datasets": {
+            "1997_2012": "business-licences-1997-to-2012",
+            "2013_2024": "business-licences-2013-to-2024",
+            "current_2024_plus": "business-licences",
+        },
+        "columns": {},
+        # Pre-2020 extracts hold plain dates, later ones ISO 8601 with offsets
+        "date_formats": {"issueddate": "ISO8601", "expireddate": "ISO8601", "extractdate": "ISO8601"},
+    },
+}
+
+
+def get_source(city):
+    if city not in SOURCES:
+        raise KeyError(f"Unknown city: {city} (registered: {', '.join(SOURCES)})")
+    source = SOURCES[city]
+    if source["pager"] not in PAGERS:
+        raise ValueError(f"{city}: unsupported pager {source['pager']} (expected one of {PAGERS})")
+    return source
+
+
+def raw_path(city, name):
+    return os.path.join(get_source(city)["raw_dir"], f"{name}.csv")
+
+
+def raw_files(city):
+    """{extract name: raw CSV path} for one city"""
+    return {name: raw_path(city, name) for name in get_source(city)["datasets"]}
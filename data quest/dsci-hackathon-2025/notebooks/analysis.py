@@ -1,7 +1,6 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
+
+from licences import CRISES, tag_crises
 
 # Load cleaned data
 df = pd.read_csv("data/cleaned/business_licences_1997_2024.csv")
@@ -62,24 +61,8 @@ print(f"Year range: {df_with_dates['year'].min():.0f} to {df_with_dates['year'].
 # STEP 2: DEFINE CRISIS PERIODS
 # =============================================================================
 
-CRISES = {
-    "Dot-Com Crash": ("2000-01", "2002-12"),
-    "Great Recession": ("2008-01", "2009-12"),
-    "Oil Price Crash": ("2014-07", "2016-12"),
-    "COVID-19": ("2020-03", "2021-12"),
-    "Interest Rate Shock": ("2022-01", "2023-12")
-}
-
-# Add crisis indicator column
-def identify_crisis(date):
-    if pd.isna(date):
-        return "None"
-    for crisis_name, (start, end) in CRISES.items():
-        if start <= date.strftime('%Y-%m') <= end:
-            return crisis_name
-    return "Normal"
-
-df_with_dates['crisis_period'] = df_with_dates['issued_date'].apply(identify_crisis)
+# Crisis windows come from licences.py (CRISIS_SOURCE=detected uses changepoint.py's)
+df_with_dates['crisis_period'] = tag_crises(df_with_dates['issued_date'])
 
 # =============================================================================
 # STEP 3: AGGREGATE DATA FOR TIME SERIES
@@ -192,17 +175,13 @@ print(df_with_dates['crisis_period'].value_counts())
 from sklearn.linear_model import LinearRegression
 import numpy as np
 
-forecast_list = []
-
-all_types = df_with_dates['businesstype'].unique()
+from grouped import run_grouped
 
-for btype in all_types:
-    subset = df_with_dates[df_with_dates['businesstype'] == btype]
-    
+def forecast_type(btype, subset):
     yearly = subset.groupby('year').size().reset_index(name='count')
 
     if len(yearly) < 5:   # too little data, skip
-        continue
+        return None
 
     X = yearly['year'].values.reshape(-1, 1)
     y = yearly['count'].values
@@ -213,14 +192,13 @@ for btype in all_types:
     future_years = np.arange(2025, 2030)
     predicted_counts = model.predict(future_years.reshape(-1, 1))
 
-    for year, pred in zip(future_years, predicted_counts):
-        forecast_list.append({
-            'businesstype': btype,
-            'year': year,
-            'predicted_count': max(0, pred)   # no negatives
-        })
+    return [{
+        'year': year,
+        'predicted_count': max(0, pred)   # no negatives
+    } for year, pred in zip(future_years, predicted_counts)]
 
-forecast_df = pd.DataFrame(forecast_list)
+# Partition rows by business type once and fit each type in a process pool
+forecast_df = run_grouped(df_with_dates, 'businesstype', forecast_type, columns=['year'])
 print("\nGenerated forecast table:")
 print(forecast_df.head(20))
 print("\nTotal predictions:", len(forecast_df))
@@ -233,15 +211,7 @@ import statsmodels.api as sm
 import pandas as pd
 
 # Prepare monthly data
-def is_crisis(date):
-    for start_str, end_str in CRISES.values():
-        start = pd.to_datetime(start_str + "-01")  # add day to make full date
-        end = pd.to_datetime(end_str + "-01") + pd.offsets.MonthEnd(0)  # end of month
-        if start <= date <= end:
-            return 1
-    return 0
-
-monthly_counts['is_crisis'] = monthly_counts['date'].apply(is_crisis)
+monthly_counts['is_crisis'] = (tag_crises(monthly_counts['date']) != "Normal").astype(int)
 
 X = sm.add_constant(monthly_counts['is_crisis'])
 y = monthly_counts['count']
@@ -0,0 +1,329 @@
+import pandas as pd
+import ast
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from time import perf_counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from synthetic import load_profile, write_synthetic
+
+# Benchmarks every pipeline stage on synthetic licence data.
+#
+# Each stage script runs unmodified in a fresh subprocess whose working
+# directory is a scratch workspace holding synthetic inputs (synthetic.py) at
+# the paths the script expects (data/raw/*.csv or the cleaned CSV). Wall time
+# and the child's peak RSS are recorded per stage and size, along with the
+# time a fresh interpreter spends on the script's module-level imports.
+#
+# On Linux a child's ru_maxrss includes the RSS of the process it was forked
+# from, so a stage forked straight from this (pandas-sized) driver would never
+# report less than the driver. Stages are therefore started by a small exec
+# helper (RSS_HELPER): the stage is forked from the helper, and the helper
+# reports the stage's own wait4 peak RSS.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = "results/benchmarks"
+RESULTS_FILE = os.path.join(RESULTS_DIR, "benchmark_results.json")
+HISTORY_FILE = os.path.join(RESULTS_DIR, "history.csv")
+# Tracked (results/benchmarks/ is not), so the reference run is versioned with the code
+BASELINE_FILE = "results/benchmark_baseline.json"
+
+TAXONOMY_DIR = "data/taxonomy"
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+STAGES = {
+    "fetch": {"script": "data/fetch/fetch.py", "inputs": "api", "max_rows": 1_000_000},
+    "clean": {"script": "data/fetch/clean.py", "inputs": "raw"},
+    "crisis_analysis": {"script": "notebooks/crisis_analysis.py", "inputs": "cleaned"},
+    "forecast": {"script": "notebooks/hierarchical_forecast.py", "inputs": "cleaned"},
+    "train": {"script": "notebooks/crisis_train.py", "inputs": "cleaned"},
+    "status": {"script": "notebooks/pipeline.py", "args": ["status"], "inputs": "cleaned"},
+}
+
+# A stage regresses when wall time or peak RSS exceed baseline * (1 + tolerance)
+# by more than these absolute slacks (keeps tiny runs from flapping)
+TOLERANCE = 0.2
+MIN_SLACK_SECONDS = 0.5
+MIN_SLACK_MB = 20.0
+
+DATASET_IDS = {
+    "business-licences": "current_2024_plus",
+    "business-licences-1997-to-2012": "1997_2012",
+    "business-licences-2013-to-2024": "2013_2024",
+}
+
+
+# =============================================================================
+# SYNTHETIC DATA (synthetic.py, fitted to data/raw/*.csv)
+# =============================================================================
+
+def write_raw_inputs(workspace, n_rows, seed, profile=None):
+    """Synthetic data/raw/<extract>.csv files in the fetch.py layout"""
+    return write_synthetic(n_rows, os.path.join(workspace, "data/raw"), profile, seed=seed, layout="raw")
+
+
+def write_cleaned_input(workspace, n_rows, seed, profile=None):
+    """Synthetic cleaned CSV in the layout clean.py produces"""
+    return write_synthetic(n_rows, os.path.join(workspace, "data/cleaned"), profile, seed=seed,
+                           layout="cleaned")
+
+
+class SyntheticAPI:
+    """Local stand-in for the Open Data records endpoint used by fetch.py"""
+
+    def __init__(self, n_rows, seed, profile=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_synthetic(n_rows, tmp, profile, seed=seed, layout="raw")
+            self.frames = {os.path.splitext(os.path.basename(path))[0]: pd.read_csv(path, low_memory=False)
+                           for path in paths}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}/catalog/datasets/{{}}/records"
+
+    def _handler(self):
+        frames = self.frames
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                dataset_id = url.path.split("/")[-2]
+                params = {k: int(v[0]) for k, v in parse_qs(url.query).items()}
+                frame = frames.get(DATASET_IDS[dataset_id], pd.DataFrame())
+                offset, limit = params.get("offset", 0), params.get("limit", 100)
+                page = frame.iloc[offset:offset + limit].astype(object)
+                records = page.where(page.notna(), None).to_dict("records")
+                body = json.dumps({"total_count": len(frame), "results": records}, default=str).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# =============================================================================
+# RUNNING STAGES
+# =============================================================================
+
+def import_cost(script):
+    """Seconds a fresh interpreter spends on a script's module-level imports.
+
+    Only the script's top-level import statements (and sys.path setup) are
+    replayed, so the figure excludes the stage's own work.
+    """
+    path = os.path.join(PROJECT_ROOT, script)
+    with open(path) as f:
+        source = f.read()
+    statements = [ast.get_source_segment(source, node) for node in ast.parse(source).body
+                  if isinstance(node, (ast.Import, ast.ImportFrom))
+                  or (isinstance(node, ast.Expr) and "sys.path" in ast.get_source_segment(source, node))]
+    # Private names, so the replayed imports (e.g. "from time import time") can't shadow them
+    code = "\n".join(["import sys", "from time import perf_counter as _clock", f"__file__ = {path!r}",
+                      f"sys.path.insert(0, {os.path.dirname(path)!r})", "_start = _clock()", *statements,
+                      "print(_clock() - _start)"])
+    proc = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                          env={**os.environ, "MPLBACKEND": "Agg"})
+    return round(float(proc.stdout.split()[-1]), 3) if proc.returncode == 0 and proc.stdout.strip() else None
+
+
+# argv: rss file, command... Runs the command, writes its peak RSS (KB) to the
+# rss file and exits with the command's exit code
+RSS_HELPER = """
+import os, sys
+pid = os.fork()
+if pid == 0:
+    try:
+        os.execv(sys.argv[2], sys.argv[2:])
+    finally:
+        os._exit(127)
+_, status, usage = os.wait4(pid, 0)
+with open(sys.argv[1], "w") as f:
+    f.write(str(usage.ru_maxrss))
+code = os.waitstatus_to_exitcode(status)
+if code < 0:
+    os.kill(os.getpid(), -code)
+sys.exit(code)
+"""
+
+
+def run_script(script, workspace, env=None, timeout=None, args=()):
+    """Run a stage script in a subprocess; returns (exit code, wall seconds, peak RSS MB, log path)"""
+    log_path = os.path.join(workspace, f"{os.path.basename(script)}.log")
+    rss_path = os.path.join(workspace, ".peak_rss")
+    env = {**os.environ, "MPLBACKEND": "Agg", **(env or {})}
+    if os.path.exists(rss_path):
+        os.remove(rss_path)
+    with open(log_path, "w") as log:
+        start = perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", RSS_HELPER, rss_path,
+                                 sys.executable, os.path.join(PROJECT_ROOT, script), *args],
+                                cwd=workspace, stdout=log, stderr=subprocess.STDOUT, env=env,
+                                start_new_session=True)
+        # Kill the helper's whole session so the stage goes with it
+        timer = threading.Timer(timeout, os.killpg, (proc.pid, signal.SIGKILL)) if timeout else None
+        if timer:
+            timer.start()
+        proc.wait()
+        wall = perf_counter() - start
+        if timer:
+            timer.cancel()
+    rss_kb = 0.0
+    if os.path.exists(rss_path):
+        with open(rss_path) as f:
+            rss_kb = float(f.read())
+    # ru_maxrss is reported in kilobytes on Linux
+    return proc.returncode, wall, rss_kb / 1024, log_path
+
+
+def run_stage(stage, n_rows, seed=0, timeout=None, keep_workspace=False, profile=None, trace=False):
+    """Benchmark one stage at one size; returns a result dict.
+
+    With trace=True the script's profiling spans (profiling.py) are enabled and
+    their trace/summary files are written to results/profiles/.
+    """
+    spec = STAGES[stage]
+    profile = profile or load_profile()
+    workspace = tempfile.mkdtemp(prefix=f"bench_{stage}_{n_rows}_")
+    try:
+        env = {}
+        if trace:
+            env["PROFILE"] = "1"
+            env["PROFILE_DIR"] = os.path.join(PROJECT_ROOT, "results/profiles")
+        # Reference tables the scripts read alongside their inputs (taxonomy.py)
+        if os.path.isdir(os.path.join(PROJECT_ROOT, TAXONOMY_DIR)):
+            shutil.copytree(os.path.join(PROJECT_ROOT, TAXONOMY_DIR), os.path.join(workspace, TAXONOMY_DIR))
+        if spec["inputs"] == "raw":
+            write_raw_inputs(workspace, n_rows, seed, profile)
+        elif spec["inputs"] == "cleaned":
+            write_cleaned_input(workspace, n_rows, seed, profile)
+
+        if spec["inputs"] == "api":
+            with SyntheticAPI(n_rows, seed, profile) as api:
+                env["LICENCE_API_URL"] = api.url
+                code, wall, rss, log_path = run_script(spec["script"], workspace, env, timeout, spec.get("args", ()))
+        else:
+            code, wall, rss, log_path = run_script(spec["script"], workspace, env, timeout, spec.get("args", ()))
+
+        result = {
+            "stage": stage,
+            "rows": n_rows,
+            "status": "ok" if code == 0 else f"failed ({code})",
+            "wall_s": round(wall, 3),
+            "peak_rss_mb": round(rss, 1),
+            "rows_per_s": round(n_rows / wall, 1) if wall > 0 else None,
+            "import_s": import_cost(spec["script"]),
+        }
+        if code != 0:
+            with open(log_path) as f:
+                result["log_tail"] = f.read()[-2000:]
+        return result
+    finally:
+        if not keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def compare_to_baseline(results, baseline, tolerance=TOLERANCE):
+    """Annotate each result with its verdict against the stored baseline"""
+    reference = {(r["stage"], r["rows"]): r for r in baseline.get("results", [])}
+    for result in results:
+        base = reference.get((result["stage"], result["rows"]))
+        if base is None or base["status"] != "ok" or result["status"] != "ok":
+            result["verdict"] = "new" if base is None else "n/a"
+            continue
+        slower = result["wall_s"] > base["wall_s"] * (1 + tolerance) + MIN_SLACK_SECONDS
+        bigger = result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance) + MIN_SLACK_MB
+        faster = result["wall_s"] < base["wall_s"] * (1 - tolerance) - MIN_SLACK_SECONDS
+        result["baseline_wall_s"] = base["wall_s"]
+        result["baseline_peak_rss_mb"] = base["peak_rss_mb"]
+        result["verdict"] = "REGRESSION" if slower or bigger else "improved" if faster else "ok"
+    return results
+
+
+def save_results(results, path=RESULTS_FILE, history=HISTORY_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    run = {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0],
+           "results": results}
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    rows = pd.DataFrame(results).drop(columns=["log_tail"], errors="ignore").assign(timestamp=run["timestamp"])
+    rows.to_csv(history, mode="a", header=not os.path.exists(history), index=False)
+    return run
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic licence data")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma-separated subset of {list(SIZES)}")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {list(STAGES)}")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a stage is killed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--keep-workspace", action="store_true")
+    parser.add_argument("--trace", action="store_true", help="enable stage profiling spans (profiling.py)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("PIPELINE BENCHMARKS ON SYNTHETIC LICENCE DATA")
+    print("=" * 70)
+
+    profile = load_profile()
+    results = []
+    for size in args.sizes.split(","):
+        for stage in args.stages.split(","):
+            n_rows = SIZES[size]
+            if n_rows > STAGES[stage].get("max_rows", n_rows):
+                print(f"  {stage:16s} {size:>5s}: skipped (above max_rows for this stage)")
+                continue
+            result = run_stage(stage, n_rows, seed=args.seed, timeout=args.timeout,
+                               keep_workspace=args.keep_workspace, profile=profile, trace=args.trace)
+            results.append(result)
+            imports = f"{result['import_s']:.2f}s" if result["import_s"] is not None else "-"
+            print(f"  {stage:16s} {size:>5s}: {result['status']:10s} {result['wall_s']:9.2f}s "
+                  f"{result['peak_rss_mb']:9.1f} MB {result['rows_per_s'] or 0:12,.0f} rows/s  imports {imports}")
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+    compare_to_baseline(results, baseline, args.tolerance)
+    run = save_results(results)
+
+    table = pd.DataFrame(results)
+    columns = [c for c in ["stage", "rows", "status", "wall_s", "import_s", "baseline_wall_s", "peak_rss_mb",
+                           "baseline_peak_rss_mb", "rows_per_s", "verdict"] if c in table.columns]
+    print("\n" + table[columns].to_string(index=False))
+    print(f"\n✓ Saved: {RESULTS_FILE}")
+    print(f"✓ Appended: {HISTORY_FILE}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"✓ Saved baseline: {BASELINE_FILE}")
+
+    regressions = [r for r in results if r.get("verdict") == "REGRESSION"]
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} regression(s) beyond {args.tolerance:.0%} of baseline")
+        sys.exit(1)
@@ -0,0 +1,200 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+from time import time
+
+from licences import CRISES_FILE, load_licences, monthly_counts_by
+
+SECTOR_OUTPUT_FILE = "data/cleaned/sector_change_points.csv"
+
+# A detected regime counts as a crisis window when its mean level is at least
+# this much below the regime before it
+MIN_DROP = 0.2
+# Regimes shorter than this are treated as noise
+MIN_SEGMENT_MONTHS = 6
+
+
+def segment_cost_fn(y, cost="normal"):
+    """O(1) segment cost from cumulative sums; returns cost(starts, end) vectorized over starts.
+
+    'normal' is the Gaussian mean-change cost with the noise variance estimated
+    robustly from first differences (MAD); 'poisson' is the Poisson
+    negative log-likelihood for count series.
+    """
+    y = np.asarray(y, dtype=float)
+    s1 = np.concatenate([[0.0], np.cumsum(y)])
+    if cost == "normal":
+        s2 = np.concatenate([[0.0], np.cumsum(y ** 2)])
+        diffs = np.diff(y)
+        sigma2 = (1.4826 * np.median(np.abs(diffs - np.median(diffs))) / np.sqrt(2)) ** 2 if len(diffs) else 1.0
+        sigma2 = sigma2 if sigma2 > 0 else max(np.var(y), 1e-8)
+
+        def segment_cost(starts, end):
+            length = end - starts
+            total = s1[end] - s1[starts]
+            return (s2[end] - s2[starts] - total ** 2 / length) / sigma2
+        return segment_cost
+
+    if cost == "poisson":
+        def segment_cost(starts, end):
+            length = end - starts
+            total = s1[end] - s1[starts]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return 2 * np.where(total > 0, total - total * np.log(total / length), 0.0)
+        return segment_cost
+
+    raise ValueError(f"Unknown cost: {cost}")
+
+
+def pelt(y, penalty=None, cost="normal", min_size=2):
+    """Pruned Exact Linear Time change-point search.
+
+    Each step evaluates all surviving candidate change points with one
+    vectorized cost call. Returns sorted segment end indices (the last is len(y)).
+    """
+    n = len(y)
+    if n < 2 * min_size:
+        return [n]
+    penalty = 2 * np.log(n) if penalty is None else penalty
+    segment_cost = segment_cost_fn(y, cost)
+
+    F = np.full(n + 1, np.inf)
+    F[0] = -penalty
+    last_change = np.zeros(n + 1, dtype=np.int64)
+    candidates = np.array([0], dtype=np.int64)
+    for t in range(min_size, n + 1):
+        valid = candidates[t - candidates >= min_size]
+        if len(valid) == 0:
+            continue
+        totals = F[valid] + segment_cost(valid, t)
+        best = totals.argmin()
+        F[t] = totals[best] + penalty
+        last_change[t] = valid[best]
+        # Prune candidates that can never be optimal again
+        keep = np.ones(len(candidates), dtype=bool)
+        keep[np.isin(candidates, valid)] = totals <= F[t]
+        candidates = np.append(candidates[keep], t - min_size + 1)
+
+    ends, t = [], n
+    while t > 0:
+        ends.append(t)
+        t = last_change[t]
+    return sorted(ends)
+
+
+def segments_from_ends(index, y, ends):
+    """Describe the segments between change points (start, end, mean)"""
+    rows, start = [], 0
+    for end in ends:
+        rows.append({
+            "start": index[start],
+            "end": index[end - 1],
+            "months": end - start,
+            "mean": float(np.mean(y[start:end])),
+        })
+        start = end
+    return pd.DataFrame(rows)
+
+
+def deseasonalize(log_values, months):
+    """Remove month-of-year medians so year-end renewal peaks are not read as regimes"""
+    month_of_year = pd.DatetimeIndex(months).month
+    seasonal = pd.Series(log_values).groupby(month_of_year).transform("median").to_numpy()
+    return log_values - seasonal
+
+
+def detect_regimes(series, penalty=None, cost="normal"):
+    """Change-point segments of a monthly series.
+
+    The 'normal' cost runs on deseasonalized log counts and skips all-zero gap
+    months; the 'poisson' cost runs on the raw counts.
+    """
+    if cost == "normal":
+        observed = series[series > 0]
+        values = deseasonalize(np.log1p(observed.to_numpy(dtype=float)), observed.index)
+    else:
+        observed = series
+        values = observed.to_numpy(dtype=float)
+    ends = pelt(values, penalty=penalty, cost=cost)
+    segments = segments_from_ends(observed.index, observed.to_numpy(dtype=float), ends)
+    return segments
+
+
+def crisis_windows(segments, min_drop=MIN_DROP, min_months=MIN_SEGMENT_MONTHS):
+    """Turn detected regimes into crisis windows in the CRISES format.
+
+    A window is a regime whose mean level falls at least `min_drop` below the
+    previous regime; consecutive such regimes are merged. Returns
+    {name: ("YYYY-MM", "YYYY-MM")}.
+    """
+    segments = segments[segments["months"] >= min_months].reset_index(drop=True)
+    windows = {}
+    current = None
+    for i in range(1, len(segments)):
+        prev, seg = segments.loc[i - 1], segments.loc[i]
+        dropped = seg["mean"] < (1 - min_drop) * prev["mean"]
+        if dropped and current is not None and prev["end"] == current[1]:
+            current = (current[0], seg["end"])
+        elif dropped:
+            if current is not None:
+                windows[current[0].strftime("Detected %Y-%m")] = current
+            current = (seg["start"], seg["end"])
+    if current is not None:
+        windows[current[0].strftime("Detected %Y-%m")] = current
+    return {name: (start.strftime("%Y-%m"), end.strftime("%Y-%m")) for name, (start, end) in windows.items()}
+
+
+def sector_change_points(monthly, penalty=None, cost="poisson", min_licences=100):
+    """Change points for every sector series; one row per sector regime"""
+    frames = []
+    for sector in monthly.columns[monthly.sum() >= min_licences]:
+        segments = detect_regimes(monthly[sector], penalty=penalty, cost=cost)
+        segments["sector"] = sector
+        segments["change"] = segments["mean"].pct_change()
+        frames.append(segments)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def save_crisis_windows(windows, path=CRISES_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(windows, f, indent=2)
+
+
+def refresh_crisis_windows(df=None, path=CRISES_FILE):
+    """Re-detect crisis windows from the cleaned licences and save them (clean.py runs this)"""
+    if df is None:
+        df = load_licences(columns=["issueddate"])
+    windows = crisis_windows(detect_regimes(monthly_counts_by(df)["count"]))
+    save_crisis_windows(windows, path)
+    return windows
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("CHANGE-POINT DETECTION OF CRISIS WINDOWS")
+    print("=" * 70)
+
+    start = time()
+    df = load_licences(columns=["issueddate", "businesstype"])
+    total = monthly_counts_by(df)["count"]
+    regimes = detect_regimes(total)
+    print(f"\nRegimes in total monthly licences ({len(regimes)}):")
+    for _, seg in regimes.iterrows():
+        print(f"  {seg['start']:%Y-%m} to {seg['end']:%Y-%m}: {seg['mean']:.0f}/month ({seg['months']} months)")
+
+    windows = crisis_windows(regimes)
+    save_crisis_windows(windows)
+    print(f"\nDetected crisis windows ({len(windows)}):")
+    for name, (first, last) in windows.items():
+        print(f"  {name}: {first} to {last}")
+
+    by_type = monthly_counts_by(df, "businesstype")
+    sectors = sector_change_points(by_type)
+    sectors.to_csv(SECTOR_OUTPUT_FILE, index=False)
+    print(f"\nSector regimes: {len(sectors):,} across {sectors['sector'].nunique() if len(sectors) else 0} sectors")
+    print(f"Total time: {time()-start:.1f}s")
+    print(f"\n✓ Saved: {CRISES_FILE}")
+    print(f"✓ Saved: {SECTOR_OUTPUT_FILE}")
+    print("Set CRISIS_SOURCE=detected to run the analysis modules on these windows.")
@@ -0,0 +1,129 @@
+import numpy as np
+import json
+import os
+
+# Fixed-layout binary count arrays.
+#
+# Every array is stored as two files in ARRAY_DIR:
+#   <name>.bin   raw C-order values, shape (rows, series), no padding
+#   <name>.json  header: format, version, dtype, shape, index_kind, index,
+#                columns, optional levels (series = product of level labels,
+#                last level fastest) and free-form meta
+# Rows are months ("YYYY-MM") or years. Readers memory-map the .bin file, so
+# concurrent chart and model processes share the same pages with no parsing.
+# pandas is imported only by the functions that build frames, so opening an
+# array (pipeline.py query) needs nothing heavier than numpy.
+
+ARRAY_DIR = "data/cleaned/arrays"
+FORMAT = "licence-counts"
+VERSION = 1
+
+
+def _paths(name, directory):
+    return os.path.join(directory, f"{name}.bin"), os.path.join(directory, f"{name}.json")
+
+
+def _index_labels(index, index_kind):
+    if index_kind == "month":
+        import pandas as pd
+        return [pd.Timestamp(m).strftime("%Y-%m") for m in index]
+    if index_kind == "year":
+        return [int(y) for y in index]
+    raise ValueError(f"Unknown index kind: {index_kind} (expected 'month' or 'year')")
+
+
+def write_array(name, values, index, index_kind="month", columns=None, levels=None,
+                meta=None, dtype="<i8", directory=ARRAY_DIR):
+    """Write a (rows x series) array and its header.
+
+    Files are written under temporary names and moved into place, so readers
+    that already mapped the previous version keep a consistent view.
+    """
+    values = np.ascontiguousarray(values, dtype=np.dtype(dtype))
+    values = values.reshape(len(index), -1)
+    if columns is None and levels is None:
+        raise ValueError("Either columns or levels must be given")
+    if levels is not None and int(np.prod([len(v) for v in levels.values()])) != values.shape[1]:
+        raise ValueError("Level sizes do not match the number of series")
+    header = {
+        "format": FORMAT,
+        "version": VERSION,
+        "dtype": values.dtype.str,
+        "shape": list(values.shape),
+        "index_kind": index_kind,
+        "index": _index_labels(index, index_kind),
+        "columns": [str(c) for c in columns] if columns is not None else None,
+        "levels": {k: [str(v) for v in labels] for k, labels in levels.items()} if levels else None,
+        "meta": meta or {},
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    bin_path, json_path = _paths(name, directory)
+    values.tofile(bin_path + ".tmp")
+    with open(json_path + ".tmp", "w") as f:
+        json.dump(header, f)
+    os.replace(bin_path + ".tmp", bin_path)
+    os.replace(json_path + ".tmp", json_path)
+    return header
+
+
+def write_counts(name, frame, index_kind="month", directory=ARRAY_DIR, meta=None):
+    """Write a numeric frame (rows = months or years, columns = series)"""
+    return write_array(name, frame.to_numpy(), frame.index, index_kind=index_kind,
+                       columns=list(frame.columns), meta=meta, directory=directory)
+
+
+def read_header(name, directory=ARRAY_DIR):
+    _, json_path = _paths(name, directory)
+    with open(json_path) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT or header.get("version") != VERSION:
+        raise ValueError(f"{json_path} is not a {FORMAT} v{VERSION} header")
+    return header
+
+
+def open_counts(name, directory=ARRAY_DIR):
+    """Memory-map an array read-only; returns (memmap of shape (rows, series), header)"""
+    header = read_header(name, directory)
+    bin_path, _ = _paths(name, directory)
+    if not os.path.exists(bin_path):
+        raise FileNotFoundError(f"{bin_path} not found (run the aggregation stage first)")
+    values = np.memmap(bin_path, dtype=np.dtype(header["dtype"]), mode="r",
+                       shape=tuple(header["shape"]))
+    return values, header
+
+
+def header_index(header):
+    """Row labels as a DatetimeIndex (months) or integer Index (years)"""
+    import pandas as pd
+    if header["index_kind"] == "month":
+        return pd.DatetimeIndex(pd.to_datetime(header["index"], format="%Y-%m"), name="month_start")
+    return pd.Index(header["index"], name="year")
+
+
+def load_counts(name, directory=ARRAY_DIR):
+    """Zero-copy DataFrame view over a memory-mapped array with a 'columns' header"""
+    import pandas as pd
+    values, header = open_counts(name, directory)
+    if header["columns"] is None:
+        raise ValueError(f"{name} is a levelled array; use open_counts() and reshape")
+    return pd.DataFrame(values, index=header_index(header), columns=header["columns"], copy=False)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    # Convert the CSV aggregates written by crisis_analysis.py
+    print("=" * 70)
+    print("CONVERTING AGGREGATE CSVs TO MEMORY-MAPPED ARRAYS")
+    print("=" * 70)
+
+    monthly = pd.read_csv("data/cleaned/monthly_business_counts.csv", parse_dates=["month_start"])
+    write_counts("monthly_business_counts", monthly.set_index("month_start")[["count", "is_crisis"]])
+    yearly = pd.read_csv("data/cleaned/yearly_business_counts.csv")
+    write_counts("yearly_business_counts", yearly.set_index("year")[["count"]], index_kind="year")
+    for name in ["business_type_by_year", "status_by_year"]:
+        path = f"data/cleaned/{name}.csv"
+        if os.path.exists(path):
+            write_counts(name, pd.read_csv(path, index_col="year"), index_kind="year")
+    print(f"✓ Saved: {ARRAY_DIR}/")
@@ -1,15 +1,19 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
 import numpy as np
 from sklearn.linear_model import LinearRegression
 import statsmodels.api as sm
-from scipy import stats
-from pandas.tseries.offsets import MonthEnd
+from resampling import bootstrap_indices
+from count_store import ARRAY_DIR, write_counts
+from profiling import span, traced
+from crisis_impact import bootstrap_crisis_impact
+from taxonomy import SECTORS, to_sectors
+from grouped import run_grouped
+from licences import CRISES, crisis_bounds
 
 # Load cleaned data
-df = pd.read_csv("data/cleaned/business_licences_1997_2024.csv")
+with span("load") as stage:
+    df = pd.read_csv("data/cleaned/business_licences_1997_2024.csv")
+    stage.rows = len(df)
 
 print(f"Loaded {len(df):,} business records")
 print(f"Columns: {list(df.columns)}")
@@ -29,6 +33,8 @@ if 'folderyear' in df.columns:
 # STEP 1: DATA PREPARATION (robust date parsing & synthesis)
 # =============================================================================
 
+stage = span("parse dates", rows=len(df)).start()
+
 # Try to find a candidate date column automatically
 date_cols = [c for c in df.columns if 'issued' in c.lower() or ('date' in c.lower() and c.lower() != 'year')]
 print(f"\nCandidate date columns: {date_cols}")
@@ -81,6 +87,7 @@ print(f"Records with valid issued_date: {df['issued_date'].notna().sum():,} / {l
 
 # Keep only rows with any date info (you may decide to keep rows missing dates separately)
 df_with_dates = df[df['issued_date'].notna()].copy()
+stage.stop()
 
 if len(df_with_dates) == 0:
     print("No records with valid dates found. Check your CSV's date columns.")
@@ -109,25 +116,15 @@ if len(df_with_dates) > 0 and not pd.isna(df_with_dates['year'].min()):
 # STEP 2: DEFINE CRISIS PERIODS (use Timestamp ranges)
 # =============================================================================
 
-CRISES = {
-    "Dot-Com Crash": ("2000-01", "2002-12"),
-    "Great Recession": ("2008-01", "2009-12"),
-    "Oil Price Crash": ("2014-07", "2016-12"),
-    "COVID-19": ("2020-03", "2021-12"),
-    "Interest Rate Shock": ("2022-01", "2023-12")
-}
-
-# Convert crisis ranges to Timestamp intervals
-CRISES_TS = {
-    name: (pd.to_datetime(start + "-01"), pd.to_datetime(end + "-01") + MonthEnd(0))
-    for name, (start, end) in CRISES.items()
-}
+# Crisis windows come from licences.py (CRISIS_SOURCE=detected uses changepoint.py's)
+CRISES_TS = crisis_bounds(CRISES)
 
 # Assign crisis_period by vectorized timestamp comparisons
-df_with_dates['crisis_period'] = 'Normal'  # default
-for name, (start_ts, end_ts) in CRISES_TS.items():
-    mask = df_with_dates['issued_date'].notna() & (df_with_dates['issued_date'] >= start_ts) & (df_with_dates['issued_date'] <= end_ts)
-    df_with_dates.loc[mask, 'crisis_period'] = name
+with span("tag crises", rows=len(df_with_dates)):
+    df_with_dates['crisis_period'] = 'Normal'  # default
+    for name, (start_ts, end_ts) in CRISES_TS.items():
+        mask = df_with_dates['issued_date'].notna() & (df_with_dates['issued_date'] >= start_ts) & (df_with_dates['issued_date'] <= end_ts)
+        df_with_dates.loc[mask, 'crisis_period'] = name
 
 print("\nApplying crisis identification... done")
 
@@ -146,6 +143,8 @@ for year in [2000, 2010, 2019, 2020, 2021, 2022, 2023, 2024]:
 # STEP 3: AGGREGATE DATA FOR TIME SERIES (monthly & yearly)
 # =============================================================================
 
+stage = span("aggregate", rows=len(df_with_dates)).start()
+
 # Monthly business licence counts using month_start
 if len(df_with_dates) > 0:
     monthly_counts = (
@@ -181,67 +180,29 @@ status_by_year = None
 if 'status' in df_with_dates.columns and len(df_with_dates) > 0:
     status_by_year = df_with_dates.groupby(['year', 'status']).size().unstack(fill_value=0)
 
-# Business type trends
+# Business type trends, by sector (taxonomy.py) so that types renamed between
+# extracts stay one series
 type_by_year = None
 if 'businesstype' in df_with_dates.columns and len(df_with_dates) > 0:
-    top_business_types = df_with_dates['businesstype'].value_counts().head(10).index
-    df_top_types = df_with_dates[df_with_dates['businesstype'].isin(top_business_types)]
-    type_by_year = df_top_types.groupby(['year', 'businesstype']).size().unstack(fill_value=0)
+    sectors = to_sectors(df_with_dates['businesstype'], df_with_dates.get('businesssubtype'))
+    df_with_dates['sector'] = sectors.cat.rename_categories(lambda code: SECTORS.get(code, code)).astype(object)
+    top_business_types = df_with_dates['sector'].value_counts().head(10).index
+    df_top_types = df_with_dates[df_with_dates['sector'].isin(top_business_types)]
+    type_by_year = df_top_types.groupby(['year', 'sector']).size().unstack(fill_value=0)
+stage.stop()
 
 # =============================================================================
 # STEP 4: BOOTSTRAP CRISIS IMPACT ANALYSIS (simplified, correct)
 # =============================================================================
 
-def bootstrap_crisis_impact(data, crisis_name, baseline_year, n_bootstrap=1000, random_state=0):
-    """
-    Bootstrap confidence intervals for crisis impact metrics.
-    Uses Poisson draws on counts (sensible for count data) to get distribution of changes.
-    Returns dict with baseline_count, crisis_count, mean_change (pct), ci (2.5,97.5) or abs stats.
-    """
-    rng = np.random.default_rng(random_state)
-    baseline_count = int(data[data['year'] == baseline_year].shape[0])
-    crisis_count = int(data[data['crisis_period'] == crisis_name].shape[0])
-
-    # No data at all
-    if baseline_count == 0 and crisis_count == 0:
-        return {'baseline_count': 0, 'crisis_count': 0, 'mean_change': np.nan, 'ci': (np.nan, np.nan)}
-
-    # If baseline missing, return absolute bootstrap of crisis_count
-    if baseline_count == 0:
-        bs = rng.poisson(lam=crisis_count, size=n_bootstrap)
-        return {
-            'baseline_count': 0,
-            'crisis_count': crisis_count,
-            'mean_change': np.nan,
-            'ci': (float(np.percentile(bs, 2.5)), float(np.percentile(bs, 97.5))),
-            'abs_mean': float(bs.mean())
-        }
-
-    # If crisis_count is 0, nothing to compute
-    if crisis_count == 0:
-        return {'baseline_count': baseline_count, 'crisis_count': 0, 'mean_change': np.nan, 'ci': (np.nan, np.nan)}
-
-    # Bootstrap percentage changes
-    changes = []
-    for _ in range(n_bootstrap):
-        b = rng.poisson(lam=baseline_count)
-        c = rng.poisson(lam=crisis_count)
-        if b > 0:
-            changes.append(((c - b) / b) * 100.0)
-    if len(changes) == 0:
-        return {'baseline_count': baseline_count, 'crisis_count': crisis_count, 'mean_change': np.nan, 'ci': (np.nan, np.nan)}
-
-    return {
-        'baseline_count': baseline_count,
-        'crisis_count': crisis_count,
-        'mean_change': float(np.mean(changes)),
-        'ci': (float(np.percentile(changes, 2.5)), float(np.percentile(changes, 97.5)))
-    }
+# bootstrap_crisis_impact lives in crisis_impact.py, which can also run a single
+# crisis reading only its window (python notebooks/crisis_impact.py "COVID-19")
 
 print("\n" + "="*70)
 print("BOOTSTRAPPED CRISIS IMPACT ANALYSIS")
 print("="*70)
 
+stage = span("bootstrap impact").start()
 crisis_results = {}
 for crisis_name, (start, end) in CRISES.items():
     baseline_year = int(start[:4]) - 1
@@ -269,23 +230,26 @@ for crisis_name, (start, end) in CRISES.items():
         print(f"  Top business types during crisis:")
         for btype, count in crisis_types.items():
             print(f"    - {btype}: {count:,}")
+stage.stop(rows=len(df_with_dates))
 
 # =============================================================================
 # STEP 5: BOOTSTRAPPED FORECAST WITH CONFIDENCE INTERVALS
 # =============================================================================
 
-def bootstrap_forecast(X, y, future_years, n_bootstrap=1000, random_state=0):
+@traced("bootstrap forecast")
+def bootstrap_forecast(X, y, future_years, n_bootstrap=1000, random_state=0, method="iid", block_length=None):
     """
     Bootstrap confidence intervals for linear regression forecasts
     X: numpy array of years
     y: numpy array of counts
     future_years: numpy array of years to predict
+    method: resampling scheme from resampling.py ("iid", "moving", "circular", "stationary")
     """
-    rng = np.random.default_rng(random_state)
     predictions = []
     n = len(X)
-    for _ in range(n_bootstrap):
-        indices = rng.integers(0, n, size=n)
+    all_indices = bootstrap_indices(n, n_bootstrap, method=method, block_length=block_length,
+                                    random_state=random_state)
+    for indices in all_indices:
         X_boot = X[indices]
         y_boot = y[indices]
         model = LinearRegression()
@@ -304,15 +268,12 @@ print("\n" + "="*70)
 print("BOOTSTRAPPED FORECAST ANALYSIS")
 print("="*70)
 
-forecast_list = []
-all_types = df_with_dates['businesstype'].unique() if 'businesstype' in df_with_dates.columns else []
-
-for btype in all_types:
-    subset = df_with_dates[df_with_dates['businesstype'] == btype]
+def forecast_group(key, subset):
+    """Bootstrapped 2025-2029 forecast for one business type or sector (run per group by grouped.py)"""
     yearly = subset.groupby('year').size().reset_index(name='count')
 
     if len(yearly) < 5:
-        continue
+        return None
 
     X = yearly['year'].astype(int).values
     y = yearly['count'].values
@@ -320,38 +281,50 @@ for btype in all_types:
 
     mean_pred, ci_lower, ci_upper = bootstrap_forecast(X, y, future_years, n_bootstrap=500)
 
-    for year, pred, lower, upper in zip(future_years, mean_pred, ci_lower, ci_upper):
-        forecast_list.append({
-            'businesstype': btype,
-            'year': int(year),
-            'predicted_count': max(0, float(pred)),
-            'ci_lower': max(0, float(lower)),
-            'ci_upper': max(0, float(upper))
-        })
-
-forecast_df = pd.DataFrame(forecast_list)
-
-# Show top 5 business types by 2029 predicted count
-if not forecast_df.empty:
-    top_forecasts = forecast_df[forecast_df['year'] == 2029].nlargest(5, 'predicted_count')
-    print("\nTop 5 business types forecasted for 2029 (with 95% CI):")
+    return [{
+        'year': int(year),
+        'predicted_count': max(0, float(pred)),
+        'ci_lower': max(0, float(lower)),
+        'ci_upper': max(0, float(upper))
+    } for year, pred, lower, upper in zip(future_years, mean_pred, ci_lower, ci_upper)]
+
+stage = span("forecast", rows=len(df_with_dates)).start()
+# Rows are partitioned by key once; groups run in a process pool. The
+# businesstype forecasts keep their original file; sectors get their own.
+forecast_df = pd.DataFrame()
+sector_forecast_df = pd.DataFrame()
+if 'businesstype' in df_with_dates.columns:
+    forecast_df = run_grouped(df_with_dates, 'businesstype', forecast_group, columns=['year'])
+if 'sector' in df_with_dates.columns:
+    sector_forecast_df = run_grouped(df_with_dates, 'sector', forecast_group, columns=['year'])
+stage.stop()
+
+# Show top 5 business types and sectors by 2029 predicted count
+for label, key, frame in [("business types", 'businesstype', forecast_df),
+                          ("sectors", 'sector', sector_forecast_df)]:
+    if frame.empty:
+        print(f"\nNo {label} forecasts generated (insufficient time series).")
+        continue
+    top_forecasts = frame[frame['year'] == 2029].nlargest(5, 'predicted_count')
+    print(f"\nTop 5 {label} forecasted for 2029 (with 95% CI):")
     for idx, row in top_forecasts.iterrows():
-        print(f"  {row['businesstype']}: {row['predicted_count']:.0f} "
+        print(f"  {row[key]}: {row['predicted_count']:.0f} "
               f"[{row['ci_lower']:.0f}, {row['ci_upper']:.0f}]")
-else:
-    print("\nNo forecasts generated (insufficient business-type time series).")
 
 # =============================================================================
 # STEP 6: BOOTSTRAPPED CRISIS MODEL COEFFICIENTS (monthly)
 # =============================================================================
 
-def bootstrap_ols_coefficients(X, y, n_bootstrap=1000, random_state=0):
+@traced("bootstrap ols")
+def bootstrap_ols_coefficients(X, y, n_bootstrap=1000, random_state=0, method="moving", block_length=12):
+    # Monthly counts are autocorrelated: resample contiguous blocks of months
+    # (see resampling.py) rather than individual months
     coef_samples = []
-    rng = np.random.default_rng(random_state)
     n = len(X)
+    all_indices = bootstrap_indices(n, n_bootstrap, method=method, block_length=block_length,
+                                    random_state=random_state)
     # X should be a DataFrame (with const column)
-    for _ in range(n_bootstrap):
-        indices = rng.integers(0, n, size=n)
+    for indices in all_indices:
         X_boot = X.iloc[indices]
         y_boot = y.iloc[indices]
         model = sm.OLS(y_boot, X_boot).fit()
@@ -380,7 +353,8 @@ if not monthly_counts.empty:
     y = monthly_counts['count']
 
     # Original model
-    model = sm.OLS(y, X).fit()
+    with span("fit", rows=len(y)):
+        model = sm.OLS(y, X).fit()
     print("\nOriginal OLS Model:")
     print(model.summary())
 
@@ -388,7 +362,7 @@ if not monthly_counts.empty:
     mean_coef, ci_lower, ci_upper = bootstrap_ols_coefficients(X, y, n_bootstrap=1000)
 
     print("\n" + "="*70)
-    print("BOOTSTRAPPED COEFFICIENT ESTIMATES (n=1000)")
+    print("BOOTSTRAPPED COEFFICIENT ESTIMATES (n=1000, 12-month moving blocks)")
     print("="*70)
     print(f"\nIntercept (Non-crisis baseline):")
     print(f"  Mean: {mean_coef[0]:.2f}")
@@ -410,11 +384,13 @@ else:
 
 # Ensure output folder exists
 import os
+stage = span("save").start()
 os.makedirs("data/cleaned", exist_ok=True)
 
 monthly_counts.to_csv("data/cleaned/monthly_business_counts.csv", index=False)
 yearly_counts.to_csv("data/cleaned/yearly_business_counts.csv", index=False)
 forecast_df.to_csv("data/cleaned/business_forecast_with_ci.csv", index=False)
+sector_forecast_df.to_csv("data/cleaned/business_forecast_by_sector_with_ci.csv", index=False)
 
 if status_by_year is not None:
     status_by_year.to_csv("data/cleaned/status_by_year.csv")
@@ -422,9 +398,20 @@ if status_by_year is not None:
 if type_by_year is not None:
     type_by_year.to_csv("data/cleaned/business_type_by_year.csv")
 
+# Fixed-layout binary copies for memory-mapped readers (count_store.py)
+if not monthly_counts.empty:
+    write_counts("monthly_business_counts",
+                 monthly_counts.set_index('month_start')[['count', 'is_crisis']])
+write_counts("yearly_business_counts", yearly_counts.set_index('year')[['count']], index_kind="year")
+if status_by_year is not None:
+    write_counts("status_by_year", status_by_year, index_kind="year")
+if type_by_year is not None:
+    write_counts("business_type_by_year", type_by_year, index_kind="year")
+
 # Save bootstrap results
 crisis_results_df = pd.DataFrame(crisis_results).T
 crisis_results_df.to_csv("data/cleaned/crisis_bootstrap_results.csv")
+stage.stop()
 
 print("\n" + "="*70)
 print("DATA WRANGLING COMPLETE!")
@@ -433,8 +420,10 @@ print("\nFiles saved:")
 print("  - data/cleaned/monthly_business_counts.csv")
 print("  - data/cleaned/yearly_business_counts.csv")
 print("  - data/cleaned/business_forecast_with_ci.csv (NEW)")
+print("  - data/cleaned/business_forecast_by_sector_with_ci.csv (NEW)")
 print("  - data/cleaned/crisis_bootstrap_results.csv (NEW)")
 if status_by_year is not None:
     print("  - data/cleaned/status_by_year.csv")
 if type_by_year is not None:
     print("  - data/cleaned/business_type_by_year.csv")
+print(f"  - {ARRAY_DIR}/*.bin + *.json (memory-mapped copies)")
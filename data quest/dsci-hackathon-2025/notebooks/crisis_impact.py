@@ -0,0 +1,112 @@
+import pandas as pd
+import numpy as np
+
+from licences import CRISES, load_window, tag_crises
+from profiling import span, traced
+
+# Bootstrapped impact of one crisis against the year before it.
+#
+# The analysis only needs the baseline year and the crisis months, so
+# crisis_impact() loads just that window from the year-partitioned store
+# (licences.load_window); its cost follows the window length, not the 27
+# years of history. crisis_analysis.py runs the same bootstrap for every
+# crisis on the table it has already loaded.
+
+
+@traced("bootstrap crisis impact")
+def bootstrap_crisis_impact(data, crisis_name, baseline_year, n_bootstrap=1000, random_state=0):
+    """
+    Bootstrap confidence intervals for crisis impact metrics.
+    Uses Poisson draws on counts (sensible for count data) to get distribution of changes.
+    Returns dict with baseline_count, crisis_count, mean_change (pct), ci (2.5,97.5) or abs stats.
+    """
+    rng = np.random.default_rng(random_state)
+    baseline_count = int(data[data['year'] == baseline_year].shape[0])
+    crisis_count = int(data[data['crisis_period'] == crisis_name].shape[0])
+
+    # No data at all
+    if baseline_count == 0 and crisis_count == 0:
+        return {'baseline_count': 0, 'crisis_count': 0, 'mean_change': np.nan, 'ci': (np.nan, np.nan)}
+
+    # If baseline missing, return absolute bootstrap of crisis_count
+    if baseline_count == 0:
+        bs = rng.poisson(lam=crisis_count, size=n_bootstrap)
+        return {
+            'baseline_count': 0,
+            'crisis_count': crisis_count,
+            'mean_change': np.nan,
+            'ci': (float(np.percentile(bs, 2.5)), float(np.percentile(bs, 97.5))),
+            'abs_mean': float(bs.mean())
+        }
+
+    # If crisis_count is 0, nothing to compute
+    if crisis_count == 0:
+        return {'baseline_count': baseline_count, 'crisis_count': 0, 'mean_change': np.nan, 'ci': (np.nan, np.nan)}
+
+    # Bootstrap percentage changes
+    changes = []
+    for _ in range(n_bootstrap):
+        b = rng.poisson(lam=baseline_count)
+        c = rng.poisson(lam=crisis_count)
+        if b > 0:
+            changes.append(((c - b) / b) * 100.0)
+    if len(changes) == 0:
+        return {'baseline_count': baseline_count, 'crisis_count': crisis_count, 'mean_change': np.nan, 'ci': (np.nan, np.nan)}
+
+    return {
+        'baseline_count': baseline_count,
+        'crisis_count': crisis_count,
+        'mean_change': float(np.mean(changes)),
+        'ci': (float(np.percentile(changes, 2.5)), float(np.percentile(changes, 97.5)))
+    }
+
+
+def crisis_impact(crisis_name, n_bootstrap=1000, random_state=0, top_n=5):
+    """Load a crisis window plus its baseline year and bootstrap the change.
+
+    Returns (bootstrap result dict, top business types during the crisis).
+    """
+    start, end = CRISES[crisis_name]
+    baseline_year = int(start[:4]) - 1
+    with span("load window") as stage:
+        window = load_window(crisis=crisis_name, baseline_years=1, columns=["issueddate", "businesstype"])
+        stage.rows = len(window)
+    window["year"] = window["issued_date"].dt.year
+    window["crisis_period"] = tag_crises(window["issued_date"])
+    out = bootstrap_crisis_impact(window, crisis_name, baseline_year, n_bootstrap=n_bootstrap,
+                                  random_state=random_state)
+    crisis_rows = window[window["crisis_period"] == crisis_name]
+    return out, crisis_rows["businesstype"].value_counts().head(top_n)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bootstrapped impact of one crisis, reading only its window")
+    parser.add_argument("crisis", choices=list(CRISES))
+    parser.add_argument("--n-bootstrap", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start, end = CRISES[args.crisis]
+    baseline_year = int(start[:4]) - 1
+    out, top_types = crisis_impact(args.crisis, n_bootstrap=args.n_bootstrap, random_state=args.seed)
+
+    print("=" * 70)
+    print(f"BOOTSTRAPPED CRISIS IMPACT: {args.crisis} ({start} to {end})")
+    print("=" * 70)
+    print(f"  Baseline year ({baseline_year}): {out['baseline_count']:,} licences")
+    print(f"  Crisis period total: {out['crisis_count']:,} licences")
+    if not pd.isna(out.get('mean_change')):
+        ci_low, ci_high = out['ci']
+        print(f"  Mean change: {out['mean_change']:+.1f}%")
+        print(f"  95% CI: [{ci_low:+.1f}%, {ci_high:+.1f}%]")
+    elif 'abs_mean' in out:
+        print(f"  No baseline available; crisis absolute mean (bootstrap): {out['abs_mean']:.1f}")
+        print(f"  95% CI (abs): [{out['ci'][0]:.1f}, {out['ci'][1]:.1f}]")
+    else:
+        print("  Unable to calculate change (insufficient data)")
+    if len(top_types):
+        print("  Top business types during crisis:")
+        for btype, count in top_types.items():
+            print(f"    - {btype}: {count:,}")
@@ -0,0 +1,263 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import re
+from time import time
+
+from count_store import ARRAY_DIR, open_counts, header_index
+from licences import CRISES, crisis_bounds
+from taxonomy import SECTORS, UNMAPPED, to_sectors
+
+# Crisis winners/losers report for every crisis at once.
+#
+# Reads the month x (business type, local area) openings cube that
+# dashboard.py stores with count_store.py (built here if missing). Per-crisis
+# baseline and crisis rates for every business type and sector come from one
+# matrix product of month-window masks with the counts; months with no
+# licences at all are gaps between extracts and are left out of both the
+# counts and the month totals. Writes
+#
+#   results/crisis_analysis/crisis_report.json   all crises, machine-readable
+#   results/crisis_analysis/crisis_report.csv    one row per crisis x level x series
+#   results/crisis_analysis/<crisis>/SUMMARY.txt text summary
+#
+# Windows with too many gap months, and series with too small a baseline,
+# are flagged as insufficient data instead of reported as 0% changes. The
+# CAUSE OF CRISIS text already in a SUMMARY.txt is carried over.
+
+REPORT_DIR = "results/crisis_analysis"
+CUBE_NAME = "dashboard_openings"
+
+BASELINE_MONTHS = 24        # months before the crisis used as the baseline
+MAX_GAP_SHARE = 0.5         # windows missing more months than this are insufficient
+MIN_BASELINE_PER_YEAR = 5   # smaller series get no % change
+TOP_N = 3
+
+
+def crisis_dir_name(crisis):
+    """'COVID-19' -> 'COVID_19' (the results/crisis_analysis layout)"""
+    return re.sub(r"[^0-9A-Za-z]+", "_", crisis).strip("_")
+
+
+def load_type_counts(directory=ARRAY_DIR, build=False):
+    """Months x business type openings from the shared cube (areas summed)"""
+    if build or not os.path.exists(os.path.join(directory, f"{CUBE_NAME}.json")):
+        from dashboard import build_aggregates
+        from licences import load_licences
+        df = load_licences(columns=["status", "issueddate", "expireddate", "businesstype", "localarea"])
+        build_aggregates(df, directory)
+    values, header = open_counts(CUBE_NAME, directory)
+    types = header["levels"]["businesstype"]
+    areas = header["levels"]["localarea"]
+    counts = values.reshape(len(values), len(types), len(areas)).sum(axis=2)
+    return pd.DataFrame(counts, index=header_index(header), columns=types)
+
+
+def sector_counts(type_counts):
+    """Months x sector name counts (type labels mapped with taxonomy.py)"""
+    codes = to_sectors(pd.Series(type_counts.columns)).astype(object).fillna(UNMAPPED)
+    names = codes.map(lambda c: SECTORS.get(c, c)).to_numpy()
+    return type_counts.T.groupby(names, sort=True).sum().T
+
+
+def window_masks(months, crises=CRISES, baseline_months=BASELINE_MONTHS):
+    """(baseline, crisis) boolean masks shaped (crises, months)"""
+    months = pd.DatetimeIndex(months)
+    baseline, crisis = [], []
+    for start_ts, end_ts in crisis_bounds(crises).values():
+        first = start_ts - pd.DateOffset(months=baseline_months)
+        baseline.append((months >= first) & (months < start_ts))
+        crisis.append((months >= start_ts) & (months <= end_ts))
+    return np.array(baseline), np.array(crisis)
+
+
+def window_rates(counts, observed, mask):
+    """Per-year rates (crises x series) and the share of each window's months observed"""
+    masked = mask & observed[None, :]
+    months = masked.sum(axis=1)
+    totals = masked.astype(float) @ counts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(months[:, None] > 0, 12.0 * totals / months[:, None], np.nan)
+    return rates, months / np.maximum(mask.sum(axis=1), 1)
+
+
+def crisis_changes(series_counts, crises=CRISES, baseline_months=BASELINE_MONTHS):
+    """Baseline and crisis rates with % change for every crisis x series, in one pass.
+
+    Returns a long frame with window coverage and an insufficient_data flag
+    per row (window mostly gaps, or baseline below MIN_BASELINE_PER_YEAR).
+    """
+    counts = series_counts.to_numpy(dtype=float)
+    observed = counts.sum(axis=1) > 0
+    base_mask, crisis_mask = window_masks(series_counts.index, crises, baseline_months)
+    base_rate, base_cover = window_rates(counts, observed, base_mask)
+    crisis_rate, crisis_cover = window_rates(counts, observed, crisis_mask)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = 100.0 * (crisis_rate / base_rate - 1)
+
+    window_ok = (base_cover >= 1 - MAX_GAP_SHARE) & (crisis_cover >= 1 - MAX_GAP_SHARE)
+    enough = window_ok[:, None] & (base_rate >= MIN_BASELINE_PER_YEAR)
+    names, series = list(crises), list(series_counts.columns)
+    n_crises, n_series = base_rate.shape
+    return pd.DataFrame({
+        "crisis": np.repeat(names, n_series),
+        "series": np.tile(series, n_crises),
+        "baseline_per_year": base_rate.ravel(),
+        "crisis_per_year": crisis_rate.ravel(),
+        "change_pct": np.where(enough, change, np.nan).ravel(),
+        "baseline_coverage": np.repeat(base_cover, n_series),
+        "crisis_coverage": np.repeat(crisis_cover, n_series),
+        "insufficient_data": ~enough.ravel(),
+        "window_insufficient": np.repeat(~window_ok, n_series),
+    })
+
+
+def build_report(type_counts, crises=CRISES, baseline_months=BASELINE_MONTHS, top_n=TOP_N):
+    """(rows, report): the long table and a per-crisis dict with winners and losers"""
+    total = type_counts.sum(axis=1).rename("all").to_frame()
+    levels = {"all": total, "sector": sector_counts(type_counts), "businesstype": type_counts}
+    rows = pd.concat([crisis_changes(frame, crises, baseline_months).assign(level=level)
+                      for level, frame in levels.items()], ignore_index=True)
+    rows = rows[["crisis", "level"] + [c for c in rows.columns if c not in ("crisis", "level")]]
+
+    report = {}
+    for crisis, (start, end) in crises.items():
+        subset = rows[rows["crisis"] == crisis]
+        overall = subset[subset["level"] == "all"].iloc[0]
+        entry = {
+            "window": [start, end],
+            "baseline_months": baseline_months,
+            "insufficient_data": bool(overall["window_insufficient"]),
+            "baseline_coverage": round(float(overall["baseline_coverage"]), 3),
+            "crisis_coverage": round(float(overall["crisis_coverage"]), 3),
+            "overall": _series_record(overall),
+        }
+        for level in ["sector", "businesstype"]:
+            ranked = subset[(subset["level"] == level) & ~subset["insufficient_data"]]
+            entry[level] = {
+                "growing": int((ranked["change_pct"] > 0).sum()),
+                "shrinking": int((ranked["change_pct"] < 0).sum()),
+                "insufficient": int(((subset["level"] == level) & subset["insufficient_data"]).sum()),
+                "winners": [_series_record(r) for _, r in
+                            ranked[ranked["change_pct"] > 0].nlargest(top_n, "change_pct").iterrows()],
+                "losers": [_series_record(r) for _, r in
+                           ranked[ranked["change_pct"] < 0].nsmallest(top_n, "change_pct").iterrows()],
+            }
+        report[crisis] = entry
+    return rows, report
+
+
+def _series_record(row):
+    def number(value):
+        return None if pd.isna(value) else round(float(value), 2)
+    return {"series": row["series"], "baseline_per_year": number(row["baseline_per_year"]),
+            "crisis_per_year": number(row["crisis_per_year"]), "change_pct": number(row["change_pct"]),
+            "insufficient_data": bool(row["insufficient_data"])}
+
+
+def read_cause(path):
+    """CAUSE OF CRISIS paragraph from an existing SUMMARY.txt (None if absent)"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        text = f.read()
+    match = re.search(r"CAUSE OF CRISIS:\n(.*?)\n+={10,}", text, re.S)
+    return match.group(1).strip() if match else None
+
+
+def _years(window):
+    return f"{window[0][:4]}-{window[1][:4]}"
+
+
+def _ranked_lines(title, records):
+    lines = ["=" * 70, title, "=" * 70, ""]
+    if not records:
+        lines += ["None (no series with enough data moved in this direction).", ""]
+    for i, r in enumerate(records, 1):
+        lines += [f"{i}. {r['series']}",
+                  f"   Change: {r['change_pct']:+.1f}%",
+                  f"   Baseline: {r['baseline_per_year']:.0f}/year -> Crisis: {r['crisis_per_year']:.0f}/year", ""]
+    return lines
+
+
+def format_summary(crisis, entry, cause=None):
+    lines = [f"{crisis} ({_years(entry['window'])})", "=" * 70, ""]
+    if cause:
+        lines += ["CAUSE OF CRISIS:", cause, ""]
+    lines += ["=" * 70, "KEY STATISTICS", "=" * 70, ""]
+
+    overall = entry["overall"]
+    if entry["insufficient_data"]:
+        lines += ["INSUFFICIENT DATA: the licence extracts cover "
+                  f"{entry['baseline_coverage']:.0%} of the {entry['baseline_months']}-month baseline and "
+                  f"{entry['crisis_coverage']:.0%} of the crisis months",
+                  f"(at least {1 - MAX_GAP_SHARE:.0%} of each is needed). Changes for this crisis are not reported.",
+                  ""]
+        return "\n".join(lines)
+
+    lines += [f"Overall Change in Business Licences: {overall['change_pct']:+.1f}%"
+              if overall["change_pct"] is not None else "Overall Change in Business Licences: insufficient data",
+              f"  Baseline: {overall['baseline_per_year']:.0f} licences/year "
+              f"(previous {entry['baseline_months']} months)",
+              f"  Crisis: {overall['crisis_per_year']:.0f} licences/year", ""]
+    for level, label in [("sector", "Sectors"), ("businesstype", "Business Types")]:
+        stats = entry[level]
+        ranked = stats["growing"] + stats["shrinking"]
+        share = (lambda n: f"{100 * n / ranked:.1f}%") if ranked else (lambda n: "-")
+        lines += [f"{label} Growing: {stats['growing']} ({share(stats['growing'])})",
+                  f"{label} Shrinking: {stats['shrinking']} ({share(stats['shrinking'])})",
+                  f"{label} with insufficient data: {stats['insufficient']}", ""]
+
+    lines += _ranked_lines(f"TOP {TOP_N} WINNERS (Fastest Growing Sectors)", entry["sector"]["winners"])
+    lines += _ranked_lines(f"TOP {TOP_N} LOSERS (Most Declining Sectors)", entry["sector"]["losers"])
+    lines += _ranked_lines(f"TOP {TOP_N} WINNERS (Business Types)", entry["businesstype"]["winners"])
+    lines += _ranked_lines(f"TOP {TOP_N} LOSERS (Business Types)", entry["businesstype"]["losers"])
+    return "\n".join(lines)
+
+
+def write_report(rows, report, directory=REPORT_DIR):
+    """Write the JSON/CSV report and every crisis's SUMMARY.txt; returns the paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, "crisis_report.json"), os.path.join(directory, "crisis_report.csv")]
+    with open(paths[0], "w") as f:
+        json.dump(report, f, indent=2)
+    rows.to_csv(paths[1], index=False)
+    for crisis, entry in report.items():
+        crisis_dir = os.path.join(directory, crisis_dir_name(crisis))
+        os.makedirs(crisis_dir, exist_ok=True)
+        path = os.path.join(crisis_dir, "SUMMARY.txt")
+        text = format_summary(crisis, entry, read_cause(path))
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Crisis winners/losers report (JSON, CSV and SUMMARY.txt)")
+    parser.add_argument("--build", action="store_true", help="rebuild the openings cube from the cleaned CSV")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("CRISIS REPORT")
+    print("=" * 70)
+
+    start = time()
+    type_counts = load_type_counts(build=args.build)
+    rows, report = build_report(type_counts)
+    print(f"{len(report)} crises x {type_counts.shape[1]} business types in {time()-start:.2f}s\n")
+    for crisis, entry in report.items():
+        overall = entry["overall"]
+        if entry["insufficient_data"]:
+            print(f"  {crisis}: insufficient data (baseline {entry['baseline_coverage']:.0%}, "
+                  f"crisis {entry['crisis_coverage']:.0%} of months observed)")
+        else:
+            print(f"  {crisis}: {overall['change_pct']:+.1f}% "
+                  f"({overall['baseline_per_year']:.0f} -> {overall['crisis_per_year']:.0f} licences/year)")
+
+    print()
+    for path in write_report(rows, report):
+        print(f"✓ Saved: {path}")
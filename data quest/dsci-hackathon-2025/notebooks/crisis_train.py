@@ -1,103 +1,37 @@
 import pandas as pd
-import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Load data
-df = pd.read_csv("data/cleaned/business_licences_1997_2024.csv")
-
-# Parse dates
-df['issued_date'] = pd.to_datetime(df['issueddate'], errors='coerce', utc=True)
-df['issued_date'] = df['issued_date'].dt.tz_localize(None)
-df['expired_date'] = pd.to_datetime(df['expireddate'], errors='coerce', utc=True)
-df['expired_date'] = df['expired_date'].dt.tz_localize(None)
-
-# Calculate business duration (years)
-df['duration_years'] = (df['expired_date'] - df['issued_date']).dt.days / 365.25
-
-# Define crisis periods
-CRISES = {
-    "Dot-Com Crash": ("2000-01-01", "2002-12-31"),
-    "Great Recession": ("2008-01-01", "2009-12-31"),
-    "Oil Price Crash": ("2014-07-01", "2016-12-31"),
-    "COVID-19": ("2020-03-01", "2021-12-31"),
-    "Interest Rate Shock": ("2022-01-01", "2023-12-31")
-}
-
-def identify_crisis(date):
-    if pd.isna(date):
-        return "None"
-    for crisis_name, (start, end) in CRISES.items():
-        if start <= date.strftime('%Y-%m-%d') <= end:
-            return crisis_name
-    return "Normal"
-
-df['crisis_period'] = df['issued_date'].apply(identify_crisis)
-
-# Create target: Did business survive crisis? (binary)
-# If issued during crisis and expired during/shortly after = 0 (failed)
-# If issued during crisis and still active or expired much later = 1 (survived)
-
-def label_survival(row):
-    if row['crisis_period'] == "Normal":
-        return None  # Skip non-crisis businesses for now
-    
-    if pd.isna(row['duration_years']):
-        return 1  # Still active = survived
-    
-    # If business lasted less than 2 years during crisis = failed
-    if row['duration_years'] < 2:
-        return 0
-    else:
-        return 1
-
-df['survived'] = df.apply(label_survival, axis=1)
-
-# Filter to only crisis-period businesses
-crisis_df = df[df['crisis_period'] != "Normal"].copy()
-crisis_df = crisis_df[crisis_df['survived'].notna()]
-
-print(f"Total businesses during crises: {len(crisis_df):,}")
-print(f"Survived: {(crisis_df['survived'] == 1).sum():,}")
-print(f"Failed: {(crisis_df['survived'] == 0).sum():,}")
+from sklearn.metrics import classification_report
+
+import figures
+from feature_store import MIN_CLASS_COUNT, decode, feature_frame, materialize, open_features
+from plotting import render_figures, report
+from profiling import span
 
 # =============================================================================
-# FEATURE ENGINEERING
+# FEATURES (encoded once per cleaned dataset; see feature_store.py)
 # =============================================================================
 
-# Select features
-feature_cols = ['businesstype', 'businesssubtype', 'numberofemployees', 'crisis_period', 'localarea']
-
-# Clean and encode
-for col in feature_cols:
-    if col in crisis_df.columns:
-        crisis_df[col] = crisis_df[col].fillna('unknown')
-        crisis_df[col] = crisis_df[col].astype(str).str.lower().str.strip()
-
-# Encode categorical variables
-le_dict = {}
-for col in ['businesstype', 'businesssubtype', 'crisis_period', 'localarea']:
-    if col in crisis_df.columns:
-        le = LabelEncoder()
-        crisis_df[f'{col}_encoded'] = le.fit_transform(crisis_df[col])
-        le_dict[col] = le
+# Target: did a business issued during a crisis survive it? Licences closed
+# (closed status) within 2 years of issue failed (0); the rest survived (1).
+with span("features") as stage:
+    header = materialize()
+    features = open_features(header["key"])
+    stage.rows = header["rows"]
 
-# Handle employees
-if 'numberofemployees' in crisis_df.columns:
-    crisis_df['numberofemployees'] = pd.to_numeric(crisis_df['numberofemployees'], errors='coerce')
-    crisis_df['numberofemployees'] = crisis_df['numberofemployees'].fillna(crisis_df['numberofemployees'].median())
+X_cols = header["features"]
+X = feature_frame(features)
+y = pd.Series(features.y, name="survived")
 
-# Prepare feature matrix
-X_cols = ['businesstype_encoded', 'businesssubtype_encoded', 'numberofemployees', 
-          'crisis_period_encoded', 'localarea_encoded']
-X_cols = [col for col in X_cols if col in crisis_df.columns]
+print(f"Total businesses during crises: {len(y):,}")
+print(f"Survived: {(y == 1).sum():,}")
+print(f"Failed: {(y == 0).sum():,}")
+print(f"Feature store: {header['key']}")
 
-X = crisis_df[X_cols]
-y = crisis_df['survived']
+smallest = int(y.value_counts().reindex([0, 1], fill_value=0).min())
+if smallest < MIN_CLASS_COUNT:
+    raise SystemExit(f"Smaller label class has {smallest:,} licences (need {MIN_CLASS_COUNT:,}); "
+                     "not training on degenerate labels")
 
 print(f"\nFeatures used: {X_cols}")
 print(f"Feature matrix shape: {X.shape}")
@@ -111,10 +45,12 @@ X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_
 
 # Train Random Forest
 rf = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42, class_weight='balanced')
-rf.fit(X_train, y_train)
+with span("fit", rows=len(X_train)):
+    rf.fit(X_train, y_train)
 
 # Predictions
-y_pred = rf.predict(X_test)
+with span("predict", rows=len(X_test)):
+    y_pred = rf.predict(X_test)
 
 # =============================================================================
 # EVALUATE MODEL
@@ -144,7 +80,9 @@ print("BUSINESS TYPE VULNERABILITY ANALYSIS")
 print("="*70)
 
 # Get predictions for all business types
-crisis_df['predicted_survival_prob'] = rf.predict_proba(X)[:, 1]
+crisis_df = pd.DataFrame({'businesstype': decode(features, 'businesstype'), 'survived': y})
+with span("predict", rows=len(X)):
+    crisis_df['predicted_survival_prob'] = rf.predict_proba(X)[:, 1]
 
 # Group by business type
 vulnerability = crisis_df.groupby('businesstype').agg({
@@ -166,34 +104,15 @@ print(vulnerability.tail(15))
 # VISUALIZATIONS
 # =============================================================================
 
-# 1. Feature Importance Plot
-fig, ax = plt.subplots(figsize=(10, 6))
-feature_importance_plot = feature_importance.head(10)
-ax.barh(feature_importance_plot['feature'], feature_importance_plot['importance'])
-ax.set_xlabel('Importance Score', fontweight='bold')
-ax.set_title('Top 10 Features Predicting Business Survival During Crises', fontweight='bold', pad=20)
-ax.invert_yaxis()
-plt.tight_layout()
-plt.savefig('data/cleaned/feature_importance.png', dpi=300, bbox_inches='tight')
-plt.show()
-
-# 2. Business Type Vulnerability
-fig, ax = plt.subplots(figsize=(12, 8))
-top_vulnerable = vulnerability.head(20)
-colors = ['red' if x < 0.5 else 'orange' if x < 0.7 else 'green' 
-          for x in top_vulnerable['actual_survival_rate']]
-ax.barh(range(len(top_vulnerable)), top_vulnerable['actual_survival_rate'], color=colors, alpha=0.7)
-ax.set_yticks(range(len(top_vulnerable)))
-ax.set_yticklabels(top_vulnerable.index)
-ax.set_xlabel('Survival Rate During Crises', fontweight='bold')
-ax.set_title('Most Vulnerable Business Types During Economic Crises', fontweight='bold', pad=20)
-ax.axvline(0.5, color='black', linestyle='--', linewidth=1, alpha=0.5)
-plt.tight_layout()
-plt.savefig('data/cleaned/business_vulnerability.png', dpi=300, bbox_inches='tight')
-plt.show()
-
-print("\n✓ Saved: feature_importance.png")
-print("✓ Saved: business_vulnerability.png")
+print()
+with span("plot"):
+    rendered = render_figures([
+        {"path": "data/cleaned/feature_importance", "render": figures.feature_importance,
+         "data": {"importance": feature_importance}},
+        {"path": "data/cleaned/business_vulnerability", "render": figures.business_vulnerability,
+         "data": {"vulnerability": vulnerability}},
+    ])
+report(rendered)
 
 # =============================================================================
 # FUTURE PREDICTIONS
@@ -0,0 +1,275 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+from functools import lru_cache
+from time import time, perf_counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from licences import CRISES, crisis_bounds, load_licences, is_closed
+from count_store import ARRAY_DIR, write_array, open_counts, header_index
+from crisis_report import MAX_GAP_SHARE, window_rates
+
+# Months shown around a crisis window
+BEFORE_MONTHS = 12
+AFTER_MONTHS = 24
+
+
+# =============================================================================
+# PRECOMPUTED AGGREGATES
+# =============================================================================
+
+def build_aggregates(df, directory=ARRAY_DIR):
+    """Write month x (type, area) opening/closure counts as count_store arrays.
+
+    Openings are counted at the issued month; closures at the expiry month of
+    licences with a closed status.
+    """
+    months = pd.date_range(
+        pd.concat([df["issued_date"], df["expired_date"]]).min().to_period("M").to_timestamp(),
+        pd.concat([df["issued_date"], df["expired_date"]]).max().to_period("M").to_timestamp(),
+        freq="MS",
+    )
+    type_codes, types = pd.factorize(df["businesstype"].fillna("unknown"), sort=True)
+    area_codes, areas = pd.factorize(df["localarea"].fillna("unknown"), sort=True)
+    shape = (len(months), len(types), len(areas))
+
+    def counts(dates, mask):
+        valid = mask & dates.notna().to_numpy()
+        month_idx = months.get_indexer(dates[valid].dt.to_period("M").dt.to_timestamp())
+        flat = np.ravel_multi_index((month_idx, type_codes[valid], area_codes[valid]), shape)
+        return np.bincount(flat, minlength=np.prod(shape)).reshape(shape).astype(np.int32)
+
+    everything = np.ones(len(df), dtype=bool)
+    openings = counts(df["issued_date"], everything)
+    closures = counts(df["expired_date"], is_closed(df["status"]).to_numpy())
+
+    levels = {"businesstype": list(types), "localarea": list(areas)}
+    header = write_array("dashboard_openings", openings, months, levels=levels,
+                         meta={"crises": CRISES}, dtype="<i4", directory=directory)
+    write_array("dashboard_closures", closures, months, levels=levels,
+                meta={"crises": CRISES}, dtype="<i4", directory=directory)
+    return header
+
+
+class DashboardData:
+    """Memory-mapped aggregates with cached filter slices"""
+
+    def __init__(self, directory=ARRAY_DIR):
+        openings, header = open_counts("dashboard_openings", directory)
+        closures, _ = open_counts("dashboard_closures", directory)
+        self.months = header_index(header)
+        self.types = header["levels"]["businesstype"]
+        self.areas = header["levels"]["localarea"]
+        self.crises = {name: tuple(window) for name, window in header["meta"]["crises"].items()}
+        self.type_index = {t: i for i, t in enumerate(self.types)}
+        self.area_index = {a: i for i, a in enumerate(self.areas)}
+        # Views over the mapped (months x series) arrays; no data is copied
+        shape = (len(self.months), len(self.types), len(self.areas))
+        self.openings = openings.reshape(shape)
+        self.closures = closures.reshape(shape)
+        # Months with no licences of any type are gaps between extracts
+        self.observed = np.asarray(openings, dtype=np.int64).sum(axis=1) > 0
+
+    def options(self):
+        return {"crises": ["all"] + list(self.crises), "sectors": ["all"] + self.types,
+                "areas": ["all"] + self.areas}
+
+    def _window(self, crisis):
+        """Month positions shown for a crisis ('all' = full range)"""
+        if crisis == "all":
+            return 0, len(self.months), None
+        start_ts, end_ts = crisis_bounds({crisis: self.crises[crisis]})[crisis]
+        first = self.months.searchsorted(start_ts - pd.DateOffset(months=BEFORE_MONTHS))
+        last = self.months.searchsorted(end_ts + pd.DateOffset(months=AFTER_MONTHS), side="right")
+        inside = (self.months.searchsorted(start_ts), self.months.searchsorted(end_ts, side="right"))
+        return first, last, inside
+
+    @lru_cache(maxsize=1024)
+    def slice(self, crisis="all", sector="all", area="all"):
+        """Monthly openings/closures and crisis summary for one filter combination.
+
+        Averages skip gap months; like crisis_report.py, windows observed for
+        less than 1 - MAX_GAP_SHARE of their months are insufficient data.
+        """
+        if crisis != "all" and crisis not in self.crises:
+            raise KeyError(f"Unknown crisis: {crisis}")
+        first, last, inside = self._window(crisis)
+        type_sel = slice(None) if sector == "all" else self.type_index[sector]
+        area_sel = slice(None) if area == "all" else self.area_index[area]
+
+        def series(cube):
+            block = np.asarray(cube[first:last, type_sel, area_sel], dtype=np.int64)
+            return block.reshape(last - first, -1).sum(axis=1)
+
+        openings, closures = series(self.openings), series(self.closures)
+        result = {
+            "months": [m.strftime("%Y-%m") for m in self.months[first:last]],
+            "openings": openings.tolist(),
+            "closures": closures.tolist(),
+        }
+        if inside is not None:
+            lo, hi = inside[0] - first, inside[1] - first
+            positions = np.arange(last - first)
+            masks = np.array([positions < lo, (positions >= lo) & (positions < hi)])
+            rates, cover = window_rates(openings[:, None].astype(float), self.observed[first:last], masks)
+            enough = bool((cover >= 1 - MAX_GAP_SHARE).all())
+            result["crisis_start"], result["crisis_end"] = self.crises[crisis]
+            result["summary"] = {
+                "baseline_avg": float(rates[0, 0] / 12) if enough else None,
+                "crisis_avg": float(rates[1, 0] / 12) if enough else None,
+                "baseline_coverage": float(cover[0]),
+                "crisis_coverage": float(cover[1]),
+                "insufficient_data": not enough,
+                "closures": int(closures[lo:hi].sum()),
+            }
+        if sector == "all":
+            block = np.asarray(self.openings[first:last, :, area_sel], dtype=np.int64)
+            by_type = block.reshape(last - first, len(self.types), -1).sum(axis=(0, 2))
+            top = np.argsort(by_type)[::-1][:10]
+            result["top_sectors"] = [[self.types[i], int(by_type[i])] for i in top if by_type[i] > 0]
+        return result
+
+
+# =============================================================================
+# HTTP SERVER
+# =============================================================================
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Vancouver Business Licences</title>
+<style>
+body { font-family: sans-serif; margin: 24px; }
+select { margin-right: 16px; max-width: 260px; }
+#chart { border: 1px solid #ccc; margin-top: 16px; }
+#meta { color: #555; margin-top: 8px; }
+</style></head>
+<body>
+<h2>Vancouver Business Licences During Economic Crises</h2>
+<label>Crisis <select id="crisis"></select></label>
+<label>Sector <select id="sector"></select></label>
+<label>Area <select id="area"></select></label>
+<svg id="chart" width="1000" height="360"></svg>
+<div id="meta"></div>
+<script>
+const ids = ["crisis", "sector", "area"];
+function drawLine(values, maxV, color) {
+  const w = 1000, h = 340, n = values.length;
+  const pts = values.map((v, i) => `${(i / Math.max(n - 1, 1)) * w},${h - (v / maxV) * (h - 20)}`);
+  return `<polyline fill="none" stroke="${color}" stroke-width="2" points="${pts.join(" ")}"/>`;
+}
+async function refresh() {
+  const q = ids.map(k => `${k}=${encodeURIComponent(document.getElementById(k).value)}`).join("&");
+  const r = await fetch(`/api/slice?${q}`);
+  const d = await r.json();
+  if (d.error) { document.getElementById("meta").textContent = d.error; return; }
+  const maxV = Math.max(1, ...d.openings, ...d.closures);
+  let shade = "";
+  if (d.crisis_start) {
+    const n = d.months.length, a = d.months.indexOf(d.crisis_start), b = d.months.indexOf(d.crisis_end);
+    if (a >= 0) {
+      const x0 = a / Math.max(n - 1, 1) * 1000, x1 = (b >= 0 ? b : n - 1) / Math.max(n - 1, 1) * 1000;
+      shade = `<rect x="${x0}" y="0" width="${x1 - x0}" height="340" fill="#fdd" />`;
+    }
+  }
+  document.getElementById("chart").innerHTML = shade + drawLine(d.openings, maxV, "navy")
+    + drawLine(d.closures, maxV, "crimson");
+  let meta = `${d.months[0]} to ${d.months[d.months.length - 1]} | openings (navy) ` +
+    `${d.openings.reduce((a, b) => a + b, 0)}, closures (red) ${d.closures.reduce((a, b) => a + b, 0)}`;
+  if (d.summary) {
+    const s = d.summary;
+    meta += !s.insufficient_data
+      ? ` | ${s.baseline_avg.toFixed(1)} -> ${s.crisis_avg.toFixed(1)} openings/month`
+      : " | insufficient data for a baseline comparison";
+  }
+  if (d.top_sectors) meta += " | top sectors: " + d.top_sectors.slice(0, 5).map(t => t[0]).join(", ");
+  meta += ` | served in ${r.headers.get("X-Elapsed-ms")} ms`;
+  document.getElementById("meta").textContent = meta;
+}
+fetch("/api/options").then(r => r.json()).then(opts => {
+  ids.map(k => {
+    const el = document.getElementById(k);
+    el.innerHTML = opts[k === "crisis" ? "crises" : k + "s"].map(o => `<option>${o}</option>`).join("");
+    el.onchange = refresh;
+  });
+  refresh();
+});
+</script>
+</body></html>
+"""
+
+
+def make_handler(data):
+    """Request handler bound to one DashboardData instance"""
+
+    class DashboardHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type, elapsed_ms=None):
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            if elapsed_ms is not None:
+                self.send_header("X-Elapsed-ms", f"{elapsed_ms:.2f}")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            started = perf_counter()
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/":
+                self._send(200, PAGE, "text/html; charset=utf-8")
+            elif url.path == "/api/options":
+                self._send(200, json.dumps(data.options()), "application/json")
+            elif url.path == "/api/slice":
+                try:
+                    result = data.slice(params.get("crisis", "all"), params.get("sector", "all"),
+                                        params.get("area", "all"))
+                    status = 200
+                except KeyError as e:
+                    result, status = {"error": e.args[0]}, 400
+                elapsed = (perf_counter() - started) * 1000
+                self._send(status, json.dumps(result), "application/json", elapsed)
+            else:
+                self._send(404, json.dumps({"error": "not found"}), "application/json")
+
+        def log_message(self, format, *args):
+            pass
+
+    return DashboardHandler
+
+
+def serve(data, host="127.0.0.1", port=8050):
+    server = ThreadingHTTPServer((host, port), make_handler(data))
+    print(f"Dashboard running at http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local crisis dashboard over precomputed aggregates")
+    parser.add_argument("--build", action="store_true", help="recompute aggregates from the cleaned CSV")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("BUSINESS LICENCE DASHBOARD")
+    print("=" * 70)
+
+    if args.build or not os.path.exists(os.path.join(ARRAY_DIR, "dashboard_openings.json")):
+        start = time()
+        df = load_licences(columns=["status", "issueddate", "expireddate", "businesstype", "localarea"])
+        header = build_aggregates(df)
+        levels = header["levels"]
+        print(f"Built aggregates: {len(header['index'])} months x {len(levels['businesstype'])} types x "
+              f"{len(levels['localarea'])} areas in {time()-start:.1f}s")
+        print(f"✓ Saved: {ARRAY_DIR}/dashboard_openings, dashboard_closures")
+
+    serve(DashboardData(), host=args.host, port=args.port)
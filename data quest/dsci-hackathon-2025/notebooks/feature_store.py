@@ -0,0 +1,225 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+from collections import namedtuple
+
+from licences import CLEANED_FILE, CRISES, is_closed, parse_dates, tag_crises
+from profiling import span
+
+# Encoded crisis-survival features, materialized once per cleaned dataset.
+#
+#   data/cleaned/features/<key>/X.bin        float64 feature matrix, C order (rows, features)
+#   data/cleaned/features/<key>/y.bin        int8 survival labels (1 = survived)
+#   data/cleaned/features/<key>/header.json  format, version, key, shape, feature names,
+#                                            label-encoder classes and crisis windows
+#
+# The key combines VERSION, the crisis windows and a SHA-256 of the cleaned
+# CSV, so a re-clean (or a change to the encoding) gets a fresh directory and
+# an unchanged dataset is never re-encoded. Readers memory-map the .bin files
+# read-only (as count_store.py does): trainers, evaluators and scorers in
+# separate processes attach to the same page-cache pages by key with no
+# parsing and no per-process copy.
+
+FEATURE_DIR = "data/cleaned/features"
+FORMAT = "licence-features"
+# Bump when the labels or encoding below change
+VERSION = 3
+
+CATEGORICAL = ["businesstype", "businesssubtype", "crisis_period", "localarea"]
+FEATURES = ["businesstype_encoded", "businesssubtype_encoded", "numberofemployees",
+            "crisis_period_encoded", "localarea_encoded"]
+
+# Licences closed (licences.CLOSED_STATUSES) within this many years of issue count as failed
+SURVIVAL_YEARS = 2
+# Trainers refuse labels whose smaller class has fewer rows than this
+MIN_CLASS_COUNT = 50
+
+Features = namedtuple("Features", ["X", "y", "header"])
+
+
+def data_hash(path=CLEANED_FILE, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def store_key(path=CLEANED_FILE, crises=CRISES, digest=None):
+    """Store version for a cleaned CSV: encoding version + crisis windows + data hash"""
+    h = hashlib.sha256(json.dumps({"version": VERSION, "crises": crises}, sort_keys=True).encode())
+    h.update((digest or data_hash(path)).encode())
+    return f"v{VERSION}-{h.hexdigest()[:16]}"
+
+
+def _paths(key, directory):
+    root = os.path.join(directory, key)
+    return os.path.join(root, "X.bin"), os.path.join(root, "y.bin"), os.path.join(root, "header.json")
+
+
+def label_survival(df, crises=CRISES):
+    """Crisis-period licences with a 0/1 'survived' label.
+
+    Licences issued in a crisis fail if they have a closed status and
+    expired (their closure date, as in survival.py) within SURVIVAL_YEARS;
+    the rest survived. Plain expiry is not failure: licences run about a
+    year and are renewed. Rows without an issue date, and closed licences
+    without an expiry date, are dropped: their duration is unknown.
+    """
+    issued = parse_dates(df["issueddate"])
+    expired = parse_dates(df["expireddate"])
+    duration_years = (expired - issued).dt.days / 365.25
+    closed = is_closed(df["status"])
+
+    crisis_period = tag_crises(issued.dt.normalize(), crises)
+    keep = ((crisis_period != "Normal") & issued.notna() & ~(closed & expired.isna())).to_numpy()
+
+    out = df[keep].copy()
+    out["crisis_period"] = crisis_period[keep]
+    failed = closed & (duration_years < SURVIVAL_YEARS)
+    out["survived"] = np.where(failed[keep], 0, 1).astype(np.int8)
+    return out
+
+
+def encode_features(crisis_df):
+    """(X, feature names, {column: classes}) with LabelEncoder-style sorted codes"""
+    columns, names, classes = [], [], {}
+    cleaned = {col: crisis_df[col].fillna("unknown").astype(str).str.lower().str.strip()
+               for col in CATEGORICAL + ["numberofemployees"] if col in crisis_df.columns}
+    for name in FEATURES:
+        col = name.removesuffix("_encoded")
+        if col not in cleaned:
+            continue
+        if col == "numberofemployees":
+            employees = pd.to_numeric(cleaned[col], errors="coerce")
+            columns.append(employees.fillna(employees.median()).to_numpy("float64"))
+        else:
+            labels, codes = np.unique(cleaned[col].to_numpy(), return_inverse=True)
+            columns.append(codes.astype("float64"))
+            classes[col] = labels.tolist()
+        names.append(name)
+    X = np.column_stack(columns) if columns else np.empty((len(crisis_df), 0))
+    return np.ascontiguousarray(X), names, classes
+
+
+def read_header(key, directory=FEATURE_DIR):
+    _, _, header_path = _paths(key, directory)
+    if not os.path.exists(header_path):
+        raise FileNotFoundError(f"{header_path} not found (run notebooks/feature_store.py first)")
+    with open(header_path) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT or header.get("version") != VERSION:
+        raise ValueError(f"{header_path} is not a {FORMAT} v{VERSION} header")
+    return header
+
+
+def materialize(path=CLEANED_FILE, directory=FEATURE_DIR, crises=CRISES, force=False, keep_old=False):
+    """Encode features for the cleaned CSV unless this version is already stored; returns the header.
+
+    Files are written to a temporary directory and moved into place, so
+    readers never see a partial store. Other versions are removed unless
+    keep_old=True (processes that already mapped them keep their view).
+    """
+    digest = data_hash(path)
+    key = store_key(path, crises, digest)
+    if not force:
+        try:
+            return read_header(key, directory)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    with span("load") as stage:
+        df = pd.read_csv(path, low_memory=False)
+        stage.rows = len(df)
+    with span("label survival", rows=len(df)):
+        crisis_df = label_survival(df, crises)
+    with span("encode", rows=len(crisis_df)):
+        X, names, classes = encode_features(crisis_df)
+    y = crisis_df["survived"].to_numpy(np.int8)
+    header = {
+        "format": FORMAT,
+        "version": VERSION,
+        "key": key,
+        "source": path,
+        "data_sha256": digest,
+        "crises": crises,
+        "rows": int(len(y)),
+        "source_rows": int(len(df)),
+        "features": names,
+        "dtype": X.dtype.str,
+        "shape": list(X.shape),
+        "label_dtype": y.dtype.str,
+        "classes": classes,
+    }
+
+    final_dir = os.path.join(directory, key)
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    X.tofile(os.path.join(tmp_dir, "X.bin"))
+    y.tofile(os.path.join(tmp_dir, "y.bin"))
+    with open(os.path.join(tmp_dir, "header.json"), "w") as f:
+        json.dump(header, f)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+
+    if not keep_old:
+        for name in stored_keys(directory):
+            if name != key:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return header
+
+
+def stored_keys(directory=FEATURE_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory)
+                  if os.path.exists(os.path.join(directory, name, "header.json")))
+
+
+def open_features(key=None, path=CLEANED_FILE, directory=FEATURE_DIR):
+    """Memory-map a stored version read-only; returns Features(X, y, header).
+
+    key defaults to the version matching the current cleaned CSV. Worker
+    processes should be handed the key so they attach to exactly the arrays
+    the parent used.
+    """
+    key = key or store_key(path)
+    header = read_header(key, directory)
+    x_path, y_path, _ = _paths(key, directory)
+    X = np.memmap(x_path, dtype=np.dtype(header["dtype"]), mode="r", shape=tuple(header["shape"]))
+    y = np.memmap(y_path, dtype=np.dtype(header["label_dtype"]), mode="r", shape=(header["rows"],))
+    return Features(X, y, header)
+
+
+def feature_frame(features):
+    """Zero-copy DataFrame view over the feature matrix"""
+    return pd.DataFrame(features.X, columns=features.header["features"], copy=False)
+
+
+def decode(features, column):
+    """Original labels of an encoded categorical column, one per row"""
+    codes = features.X[:, features.header["features"].index(f"{column}_encoded")].astype(np.intp)
+    return np.asarray(features.header["classes"][column], dtype=object)[codes]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Materialize the crisis-survival feature store")
+    parser.add_argument("--force", action="store_true", help="re-encode even if this version is stored")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("CRISIS-SURVIVAL FEATURE STORE")
+    print("=" * 70)
+    header = materialize(force=args.force)
+    features = open_features(header["key"])
+    print(f"Version: {header['key']} (cleaned data sha256 {header['data_sha256'][:12]}…)")
+    print(f"Rows: {header['rows']:,} of {header['source_rows']:,} licences; "
+          f"survived {int(features.y.sum()):,}, failed {int((features.y == 0).sum()):,}")
+    print(f"Features: {header['features']}")
+    print(f"✓ Saved: {os.path.join(FEATURE_DIR, header['key'])}/")
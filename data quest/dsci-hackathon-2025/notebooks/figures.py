@@ -0,0 +1,193 @@
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# Render functions for plotting.render_figures(). Each takes plain data and
+# returns a Figure; saving, DPI and format are handled by the engine.
+
+
+# =============================================================================
+# visualization.py
+# =============================================================================
+
+def monthly_trend(monthly, crises, colors):
+    """Monthly licences with a 12-month rolling average and shaded crises"""
+    with sns.axes_style("whitegrid"):
+        fig, ax = plt.subplots(figsize=(18, 8))
+
+    ax.plot(monthly['date'], monthly['count'], linewidth=1.5, color='navy',
+            label='Monthly Business Licences', alpha=0.6)
+
+    # Add 12-month rolling average - use min_periods to handle edges better
+    rolling_avg = monthly['count'].rolling(window=12, center=True, min_periods=1).mean()
+    ax.plot(monthly['date'], rolling_avg, linewidth=3, color='red',
+            label='12-Month Rolling Average', linestyle='--', alpha=0.8)
+
+    # Shade crisis periods
+    for crisis_name, (start, end) in crises.items():
+        ax.axvspan(start, end, alpha=0.3, color=colors[crisis_name], label=crisis_name)
+
+    ax.set_xlabel("Year", fontsize=14, fontweight='bold')
+    ax.set_ylabel("Number of Business Licences Issued", fontsize=14, fontweight='bold')
+    ax.set_title("Vancouver Business Licence Trends with Economic Crisis Periods (1997-2024)",
+                 fontsize=16, fontweight='bold', pad=20)
+    ax.set_ylim(0, rolling_avg.max() * 1.2)
+    ax.legend(loc='upper left', fontsize=10)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def yoy_growth(yearly, crisis_years):
+    """Year-over-year growth bars with crisis years annotated"""
+    with sns.axes_style("whitegrid"):
+        fig, ax = plt.subplots(figsize=(16, 8))
+
+    growth = yearly['count'].pct_change() * 100
+    colors = ['red' if x < 0 else 'green' for x in growth]
+    ax.bar(yearly['year'], growth, color=colors, alpha=0.6, edgecolor='black')
+    ax.axhline(0, color='black', linewidth=1, linestyle='-')
+
+    for year, label in crisis_years.items():
+        if year in yearly['year'].values:
+            y_val = growth[yearly['year'] == year].values[0]
+            ax.annotate(label, xy=(year, y_val), xytext=(year, y_val + 5),
+                        fontsize=10, fontweight='bold', ha='center',
+                        bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.7))
+
+    ax.set_xlabel("Year", fontsize=14, fontweight='bold')
+    ax.set_ylabel("Year-over-Year Growth (%)", fontsize=14, fontweight='bold')
+    ax.set_title("Year-over-Year Business Licence Growth Rate", fontsize=16, fontweight='bold', pad=20)
+    ax.grid(True, alpha=0.3, axis='y')
+    fig.tight_layout()
+    return fig
+
+
+def crisis_comparison(crisis_df):
+    """Baseline vs crisis average monthly licences with % change labels"""
+    with sns.axes_style("whitegrid"):
+        fig, ax = plt.subplots(figsize=(12, 6))
+
+    x = np.arange(len(crisis_df))
+    width = 0.35
+    ax.bar(x - width/2, crisis_df['Baseline Avg'], width, label='2-Year Baseline',
+           color='lightblue', edgecolor='black')
+    ax.bar(x + width/2, crisis_df['Crisis Avg'], width, label='During Crisis',
+           color='coral', edgecolor='black')
+
+    # Add percentage labels
+    for i, (idx, row) in enumerate(crisis_df.iterrows()):
+        change = row['Change (%)']
+        color = 'red' if change < 0 else 'green'
+        ax.text(i, max(row['Baseline Avg'], row['Crisis Avg']) + 50,
+                f"{change:+.1f}%", ha='center', fontweight='bold', color=color, fontsize=11)
+
+    ax.set_xlabel("Economic Crisis", fontsize=14, fontweight='bold')
+    ax.set_ylabel("Average Monthly Business Licences", fontsize=14, fontweight='bold')
+    ax.set_title("Business Licence Activity: Baseline vs Crisis Period", fontsize=16, fontweight='bold', pad=20)
+    ax.set_xticks(x)
+    ax.set_xticklabels(crisis_df['Crisis'], rotation=15, ha='right')
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+    fig.tight_layout()
+    return fig
+
+
+def recovery_patterns(monthly, crises, colors):
+    """One panel per crisis: licences from 1 year before to 2 years after"""
+    with sns.axes_style("whitegrid"):
+        fig, axes = plt.subplots(2, 3, figsize=(18, 10))
+    axes = axes.flatten()
+
+    for idx, (crisis_name, (start, end)) in enumerate(crises.items()):
+        if idx >= len(axes):
+            break
+        ax = axes[idx]
+
+        plot_start = start - pd.DateOffset(years=1)
+        plot_end = end + pd.DateOffset(years=2)
+        crisis_window = monthly[(monthly['date'] >= plot_start) & (monthly['date'] <= plot_end)].copy()
+
+        if len(crisis_window) == 0:
+            ax.text(0.5, 0.5, 'No data available', ha='center', va='center', transform=ax.transAxes)
+            ax.set_title(crisis_name, fontsize=12, fontweight='bold')
+            continue
+
+        # Normalize to crisis start = 0
+        crisis_window['months_from_start'] = ((crisis_window['date'].dt.year - start.year) * 12 +
+                                              (crisis_window['date'].dt.month - start.month))
+
+        # Only plot if we have substantial data (more than 5 points)
+        if len(crisis_window[crisis_window['count'] > 0]) > 5:
+            ax.plot(crisis_window['months_from_start'], crisis_window['count'],
+                    linewidth=2, color='navy')
+        else:
+            # For sparse data, use scatter plot
+            ax.scatter(crisis_window['months_from_start'], crisis_window['count'],
+                       s=50, color='navy', alpha=0.6)
+            ax.plot(crisis_window['months_from_start'], crisis_window['count'],
+                    linewidth=1, color='navy', alpha=0.3, linestyle='--')
+
+        ax.axvspan(-12, (end.year - start.year)*12 + (end.month - start.month),
+                   alpha=0.3, color=colors[crisis_name])
+        ax.axvline(0, color='red', linestyle='--', linewidth=2, label='Crisis Start')
+        ax.set_title(f"{crisis_name}\n(n={len(crisis_window[crisis_window['count'] > 0])} months with data)",
+                     fontsize=11, fontweight='bold')
+        ax.set_xlabel("Months from Crisis Start", fontsize=10)
+        ax.set_ylabel("Licences Issued", fontsize=10)
+        ax.grid(True, alpha=0.3)
+
+    # Remove extra subplot
+    if len(crises) < len(axes):
+        fig.delaxes(axes[-1])
+
+    fig.suptitle("Recovery Patterns: Business Licences Before, During, and After Each Crisis",
+                 fontsize=16, fontweight='bold', y=1.00)
+    fig.tight_layout()
+    return fig
+
+
+# =============================================================================
+# viz.py
+# =============================================================================
+
+def crisis_heatmap(heat, title):
+    """Business type x crisis heatmap (high = green, low = red)"""
+    fig = plt.figure(figsize=(12, 14))
+    sns.heatmap(heat, cmap="RdYlGn", center=0, linewidths=0.5)
+    plt.title(title)
+    fig.tight_layout()
+    return fig
+
+
+# =============================================================================
+# crisis_train.py
+# =============================================================================
+
+def feature_importance(importance):
+    """Top 10 random-forest feature importances"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    top = importance.head(10)
+    ax.barh(top['feature'], top['importance'])
+    ax.set_xlabel('Importance Score', fontweight='bold')
+    ax.set_title('Top 10 Features Predicting Business Survival During Crises', fontweight='bold', pad=20)
+    ax.invert_yaxis()
+    fig.tight_layout()
+    return fig
+
+
+def business_vulnerability(vulnerability):
+    """Survival rate of the 20 most vulnerable business types"""
+    fig, ax = plt.subplots(figsize=(12, 8))
+    top_vulnerable = vulnerability.head(20)
+    colors = ['red' if x < 0.5 else 'orange' if x < 0.7 else 'green'
+              for x in top_vulnerable['actual_survival_rate']]
+    ax.barh(range(len(top_vulnerable)), top_vulnerable['actual_survival_rate'], color=colors, alpha=0.7)
+    ax.set_yticks(range(len(top_vulnerable)))
+    ax.set_yticklabels(top_vulnerable.index)
+    ax.set_xlabel('Survival Rate During Crises', fontweight='bold')
+    ax.set_title('Most Vulnerable Business Types During Economic Crises', fontweight='bold', pad=20)
+    ax.axvline(0.5, color='black', linestyle='--', linewidth=1, alpha=0.5)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,153 @@
+import pandas as pd
+import numpy as np
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# Grouped execution: partition rows once, run per-group work in a process pool.
+#
+#   forecasts = run_grouped(df, "sector", forecast_one, columns=["year"])
+#
+# Rows are factorized by the group key and stably sorted once, so every group
+# is a contiguous [start, end) slice instead of a boolean scan of the whole
+# frame. The selected columns are copied (in group order) into shared memory
+# blocks; workers attach to them by name and build each group's frame from
+# zero-copy slices. Text columns travel as integer codes plus their labels.
+# func(key, frame) may return None, a dict (one row), a list of dicts or a
+# DataFrame; all results are concatenated into one frame with the key column
+# first.
+
+
+def partition(keys, sort=False):
+    """(labels, order, offsets): rows order[offsets[i]:offsets[i + 1]] have key labels[i].
+
+    Missing keys are left out. Groups follow first appearance unless sort=True.
+    """
+    codes, labels = pd.factorize(pd.Series(keys), sort=sort, use_na_sentinel=True)
+    order = np.argsort(codes, kind="stable")
+    order = order[codes[order] >= 0]
+    offsets = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    return labels, order, offsets
+
+
+def _encode(values):
+    """Column -> (plain numpy array, decoding info)"""
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        values = values.dt.tz_convert(None)
+    if pd.api.types.is_datetime64_dtype(values):
+        array = values.to_numpy()
+        return array.view("int64"), ("datetime", array.dtype.str)
+    if pd.api.types.is_bool_dtype(values) and not values.isna().any():
+        return values.to_numpy(bool), ("plain", None)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy("float64", na_value=np.nan) if values.isna().any() else values.to_numpy(), ("plain", None)
+    codes, categories = pd.factorize(values, use_na_sentinel=True)
+    return codes.astype(np.int32), ("category", list(categories))
+
+
+def _decode(array, info):
+    kind, categories = info  # categories holds the datetime64 unit for datetimes
+    if kind == "datetime":
+        return array.view(categories)
+    if kind == "category":
+        return pd.Categorical.from_codes(array, categories)
+    return array
+
+
+class SharedColumns:
+    """Frame columns (already in group order) held in shared memory blocks"""
+
+    def __init__(self, frame):
+        self.blocks = []
+        self.specs = []
+        for name in frame.columns:
+            array, info = _encode(frame[name])
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+            self.blocks.append(block)
+            self.specs.append((name, block.name, array.dtype.str, array.shape, info))
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Per-worker state set by _init_worker
+_state = {}
+
+
+def _attach(specs):
+    blocks, columns = [], {}
+    for name, block_name, dtype, shape, info in specs:
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        columns[name] = (np.ndarray(shape, np.dtype(dtype), buffer=block.buf), info)
+    return blocks, columns
+
+
+def _init_worker(specs, offsets, labels, func):
+    blocks, columns = _attach(specs)
+    _state.update(blocks=blocks, columns=columns, offsets=offsets, labels=labels, func=func)
+
+
+def _group_frame(columns, start, end):
+    return pd.DataFrame({name: _decode(array[start:end], info) for name, (array, info) in columns.items()},
+                        copy=False)
+
+
+def _run_group(i, state=None):
+    state = state or _state
+    start, end = state["offsets"][i], state["offsets"][i + 1]
+    return state["func"](state["labels"][i], _group_frame(state["columns"], start, end))
+
+
+def _combine(results, labels, by):
+    frames = []
+    for key, result in zip(labels, results):
+        if result is None:
+            continue
+        if isinstance(result, dict):
+            result = [result]
+        frame = pd.DataFrame(result)
+        if by not in frame.columns:
+            frame.insert(0, by, key)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[by])
+
+
+def run_grouped(df, by, func, columns=None, max_workers=None, min_rows=1, sort=False):
+    """Apply func(key, group frame) to every group of df[by]; returns one DataFrame.
+
+    columns limits what each group frame carries (default: all but `by`);
+    groups smaller than min_rows are skipped. With one worker (or a single
+    group) everything runs in-process on the same sorted arrays.
+    """
+    labels, order, offsets = partition(df[by], sort=sort)
+    sizes = np.diff(offsets)
+    keep = np.flatnonzero(sizes >= min_rows)
+    columns = [c for c in (columns or df.columns) if c != by]
+    ordered = df[columns].iloc[order].reset_index(drop=True)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1 or len(keep) <= 1:
+        state = {"columns": {c: _encode(ordered[c]) for c in columns}, "offsets": offsets,
+                 "labels": labels, "func": func}
+        results = [_run_group(i, state) for i in keep]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        with SharedColumns(ordered) as shared:
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(shared.specs, offsets, labels, func)) as executor:
+                chunksize = max(1, len(keep) // (max_workers * 4))
+                results = list(executor.map(_run_group, keep, chunksize=chunksize))
+    return _combine(results, labels[keep], by)
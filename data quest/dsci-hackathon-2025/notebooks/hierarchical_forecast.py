@@ -0,0 +1,217 @@
+import pandas as pd
+import numpy as np
+import os
+import warnings
+from time import time
+from scipy import sparse
+from scipy.optimize import lsq_linear
+from scipy.sparse.linalg import LinearOperator, cg
+
+from licences import load_licences
+
+OUTPUT_FILE = "data/cleaned/business_forecast_hierarchical.csv"
+FUTURE_YEARS = np.arange(2025, 2030)
+
+RECONCILIATION_METHODS = ["bottom_up", "ols", "wls_struct", "wls_var"]
+
+
+def yearly_bottom_counts(df, levels):
+    """Yearly counts for each bottom-level series (unique combination of `levels`).
+
+    Returns (years, counts, bottom) where counts is a years x bottom array and
+    bottom a DataFrame with one row per bottom series.
+    """
+    dated = df[df["issued_date"].notna()]
+    keys = dated[levels].fillna("unknown").astype(str)
+    codes, bottom = pd.factorize(pd.MultiIndex.from_frame(keys), sort=True)
+    years = dated["issued_date"].dt.year.to_numpy()
+    all_years = np.arange(years.min(), years.max() + 1)
+    counts = sparse.coo_matrix(
+        (np.ones(len(codes)), (years - all_years[0], codes)),
+        shape=(len(all_years), len(bottom))
+    ).toarray()
+    return all_years, counts, bottom.to_frame(index=False, name=levels)
+
+
+def summing_matrix(bottom, levels):
+    """Sparse summing matrix S (nodes x bottom) and a node description frame.
+
+    One aggregation level per prefix of `levels`: total, then levels[:1],
+    levels[:2], ... with the last level being the bottom series themselves.
+    """
+    n_bottom = len(bottom)
+    blocks, nodes = [], []
+    for depth in range(len(levels) + 1):
+        if depth == 0:
+            codes = np.zeros(n_bottom, dtype=np.int64)
+            labels = pd.DataFrame(index=[0])
+        else:
+            codes, uniques = pd.factorize(pd.MultiIndex.from_frame(bottom[levels[:depth]]), sort=True)
+            labels = uniques.to_frame(index=False, name=levels[:depth])
+        blocks.append(sparse.csr_matrix(
+            (np.ones(n_bottom), (codes, np.arange(n_bottom))),
+            shape=(codes.max() + 1, n_bottom)
+        ))
+        labels["level"] = "total" if depth == 0 else "/".join(levels[:depth])
+        nodes.append(labels)
+    S = sparse.vstack(blocks, format="csr")
+    nodes = pd.concat(nodes, ignore_index=True).reindex(columns=["level"] + levels)
+    return S, nodes
+
+
+def linear_trend_forecast(years, Y, future_years):
+    """Linear trend per column of Y, matching crisis_analysis.py's per-type fits.
+
+    Like the existing forecasts, each series is fitted only on the years in
+    which it has licences and predictions are floored at zero. The fits are
+    weighted closed-form least squares for all columns at once, so base
+    forecasts are no longer additive across levels and need reconciling.
+    Returns (forecasts future x series, residual variance per series).
+    """
+    x = (years - years.mean())[:, None].astype(float)
+    m = (Y > 0).astype(float)
+    n = m.sum(axis=0)
+    sx, sy = (m * x).sum(axis=0), (m * Y).sum(axis=0)
+    sxx, sxy = (m * x * x).sum(axis=0), (m * x * Y).sum(axis=0)
+    denom = n * sxx - sx ** 2
+    slope = np.divide(n * sxy - sx * sy, denom, out=np.zeros_like(sy), where=denom > 0)
+    intercept = np.divide(sy - slope * sx, n, out=np.zeros_like(sy), where=n > 0)
+
+    residuals = m * (Y - (intercept + slope * x))
+    variance = (residuals ** 2).sum(axis=0) / np.maximum(n - 2, 1)
+    x_future = (future_years - years.mean())[:, None]
+    return np.maximum(intercept + slope * x_future, 0), variance
+
+
+def _weights(S, method, variance=None):
+    """Diagonal of W for a reconciliation method"""
+    if method == "ols":
+        return np.ones(S.shape[0])
+    if method == "wls_struct":
+        # Structural scaling: weight of a node = number of bottom series it sums
+        return np.asarray(S.sum(axis=1)).ravel()
+    if method == "wls_var":
+        if variance is None:
+            raise ValueError("wls_var reconciliation needs per-node residual variance")
+        return np.maximum(variance, 1e-8)
+    raise ValueError(f"Unknown reconciliation method: {method}")
+
+
+def reconcile(S, base, method="wls_struct", variance=None, nonnegative=False, tol=1e-12):
+    """Coherent forecasts S @ G @ base for every node.
+
+    `base` is nodes x horizon. G = (S' W^-1 S)^-1 S' W^-1 with a diagonal W.
+    S' W^-1 S is never formed: the total row alone would make it a dense
+    bottom x bottom matrix. It is solved by Jacobi-preconditioned conjugate
+    gradients on a LinearOperator whose matvec is two sparse products with S,
+    so each iteration costs O(nnz(S)).
+
+    The unconstrained solution can put small bottom series below zero. With
+    nonnegative=True the same weighted least-squares problem is solved with
+    bottom forecasts bounded at zero (scipy lsq_linear on the sparse W^-1/2 S),
+    which moves the totals far less than clipping and re-aggregating would.
+    """
+    n_nodes, n_bottom = S.shape
+    base = np.asarray(base, dtype=float)
+    if method == "bottom_up":
+        bottom = base[n_nodes - n_bottom:]
+        return S @ (np.maximum(bottom, 0) if nonnegative else bottom)
+
+    w_inv = 1.0 / _weights(S, method, variance)
+    if nonnegative:
+        scaled = (sparse.diags(np.sqrt(w_inv)) @ S).tocsr()
+        bottom = np.column_stack([
+            lsq_linear(scaled, np.sqrt(w_inv) * base[:, h], bounds=(0, np.inf),
+                       lsmr_tol="auto", tol=tol).x
+            for h in range(base.shape[1])
+        ])
+        return S @ bottom
+
+    St = S.T.tocsr()
+    lhs = LinearOperator((n_bottom, n_bottom), dtype=float,
+                         matvec=lambda x: St @ (w_inv * (S @ x)))
+    # Diagonal of S' W^-1 S: each bottom series' weighted count of ancestors
+    diagonal = St.multiply(St) @ w_inv
+    preconditioner = LinearOperator((n_bottom, n_bottom), dtype=float,
+                                    matvec=lambda x: x / diagonal)
+    rhs = St @ (w_inv[:, None] * base)
+    bottom = np.empty((n_bottom, base.shape[1]))
+    for h in range(base.shape[1]):
+        bottom[:, h], info = cg(lhs, rhs[:, h], rtol=tol, atol=0.0, M=preconditioner,
+                                maxiter=10 * n_bottom)
+        if info > 0:
+            warnings.warn(f"{method} reconciliation stopped after {info} CG iterations "
+                          f"for horizon {h} without reaching rtol={tol}")
+    return S @ bottom
+
+
+def hierarchical_forecast(df, levels=("businesstype", "businesssubtype"),
+                          future_years=FUTURE_YEARS, method="wls_struct", nonnegative=False):
+    """Base and reconciled yearly forecasts for every node of the hierarchy.
+
+    With nonnegative=True the reconciled forecasts are the non-negative
+    solution and the unconstrained one is kept as unconstrained_forecast, so
+    the shift the constraint causes can be reported.
+    """
+    levels = list(levels)
+    years, counts, bottom = yearly_bottom_counts(df, levels)
+    S, nodes = summing_matrix(bottom, levels)
+
+    history = np.asarray(S @ counts.T)          # nodes x years
+    base, variance = linear_trend_forecast(years, history.T, future_years)
+    reconciled = reconcile(S, base.T, method=method, variance=variance)
+    constrained = reconcile(S, base.T, method=method, variance=variance, nonnegative=True) if nonnegative else None
+
+    n_nodes = len(nodes)
+    out = nodes.loc[np.repeat(np.arange(n_nodes), len(future_years))].reset_index(drop=True)
+    out["year"] = np.tile(future_years, n_nodes)
+    out["base_forecast"] = base.T.ravel()
+    if nonnegative:
+        out["unconstrained_forecast"] = np.asarray(reconciled).ravel()
+        reconciled = constrained
+    out["reconciled_forecast"] = np.asarray(reconciled).ravel()
+    return out, S
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hierarchical reconciled licence forecasts")
+    parser.add_argument("--method", choices=RECONCILIATION_METHODS, default="wls_struct")
+    parser.add_argument("--by-area", action="store_true", help="add localarea below subtype")
+    parser.add_argument("--nonnegative", action="store_true", help="constrain bottom-level forecasts to >= 0")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"HIERARCHICAL FORECASTS ({args.method})")
+    print("=" * 70)
+
+    levels = ["businesstype", "businesssubtype"] + (["localarea"] if args.by_area else [])
+    start = time()
+    df = load_licences(columns=["issueddate"] + levels)
+    forecast, S = hierarchical_forecast(df, levels=levels, method=args.method, nonnegative=args.nonnegative)
+    print(f"Hierarchy: {S.shape[0]:,} nodes over {S.shape[1]:,} bottom series "
+          f"({S.nnz:,} non-zeros in S) ({time()-start:.1f}s)")
+
+    # Coherence check: each type equals the sum of its subtypes, total equals all types
+    type_level = forecast[forecast["level"] == "businesstype"]
+    total = forecast[forecast["level"] == "total"].set_index("year")
+    type_sum = type_level.groupby("year")[["base_forecast", "reconciled_forecast"]].sum()
+    print("\nTotal vs sum of business types:")
+    print(pd.DataFrame({
+        "total_base": total["base_forecast"],
+        "types_base": type_sum["base_forecast"],
+        "total_reconciled": total["reconciled_forecast"],
+        "types_reconciled": type_sum["reconciled_forecast"],
+    }).round(1).to_string())
+
+    if args.nonnegative:
+        shift = total["reconciled_forecast"] - total["unconstrained_forecast"]
+        negatives = (forecast["unconstrained_forecast"] < 0).sum()
+        print(f"\nNon-negative constraint: {negatives:,} negative unconstrained forecasts; "
+              f"total shifted by {shift.mean():+.1f}/year "
+              f"({100 * shift.mean() / total['unconstrained_forecast'].mean():+.1f}%)")
+
+    os.makedirs("data/cleaned", exist_ok=True)
+    forecast.to_csv(OUTPUT_FILE, index=False)
+    print(f"\n✓ Saved: {OUTPUT_FILE}")
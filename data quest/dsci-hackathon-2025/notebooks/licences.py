@@ -0,0 +1,159 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+from pandas.tseries.offsets import MonthEnd
+
+from partitions import PARTITION_DIR, UNKNOWN_YEAR, list_partitions, read_partitions, stored_cities
+
+# Shared loading and crisis tagging for the analysis scripts
+
+CLEANED_FILE = "data/cleaned/business_licences_1997_2024.csv"
+
+CURATED_CRISES = {
+    "Dot-Com Crash": ("2000-01", "2002-12"),
+    "Great Recession": ("2008-01", "2009-12"),
+    "Oil Price Crash": ("2014-07", "2016-12"),
+    "COVID-19": ("2020-03", "2021-12"),
+    "Interest Rate Shock": ("2022-01", "2023-12")
+}
+
+# Windows written by changepoint.py (same format as CURATED_CRISES)
+CRISES_FILE = "data/cleaned/detected_crises.json"
+
+
+def load_crises(source=None, path=CRISES_FILE):
+    """Crisis windows {name: ("YYYY-MM", "YYYY-MM")} from 'curated' or 'detected'.
+
+    The source defaults to the CRISIS_SOURCE environment variable ('curated'
+    when unset); 'detected' falls back to the curated windows if changepoint.py
+    has not been run yet.
+    """
+    source = source or os.environ.get("CRISIS_SOURCE", "curated")
+    if source == "curated":
+        return dict(CURATED_CRISES)
+    if source == "detected":
+        if not os.path.exists(path):
+            return dict(CURATED_CRISES)
+        with open(path) as f:
+            return {name: tuple(window) for name, window in json.load(f).items()}
+    raise ValueError(f"Unknown crisis source: {source} (expected 'curated' or 'detected')")
+
+
+CRISES = load_crises()
+
+# Status values (after clean.py normalization) that mean the business closed
+CLOSED_STATUSES = ["gone out of business", "cancelled", "inactive", "closed"]
+
+
+def crisis_bounds(crises=CRISES):
+    """Convert 'YYYY-MM' crisis ranges to (first day, last day) Timestamps"""
+    return {
+        name: (pd.to_datetime(start + "-01"), pd.to_datetime(end + "-01") + MonthEnd(0))
+        for name, (start, end) in crises.items()
+    }
+
+
+def parse_dates(values):
+    """Parse mixed plain/ISO 8601 dates to tz-naive Timestamps (NaT when invalid)"""
+    parsed = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+    return parsed.dt.tz_convert(None)
+
+
+def _add_dates(df):
+    if "issueddate" in df.columns:
+        df["issued_date"] = parse_dates(df["issueddate"])
+    if "expireddate" in df.columns:
+        df["expired_date"] = parse_dates(df["expireddate"])
+    return df
+
+
+def load_licences(path=CLEANED_FILE, columns=None):
+    """Load the cleaned licence table with parsed issued/expired dates"""
+    return _add_dates(pd.read_csv(path, usecols=columns, low_memory=False))
+
+
+def crisis_window(crisis, baseline_years=0, crises=CRISES):
+    """(start, end) Timestamps of a crisis, extended back by whole baseline years"""
+    start_ts, end_ts = crisis_bounds({crisis: crises[crisis]})[crisis]
+    if baseline_years:
+        start_ts = pd.Timestamp(year=start_ts.year - baseline_years, month=1, day=1)
+    return start_ts, end_ts
+
+
+def _window_bound(value, upper):
+    """Timestamp bound; 'YYYY' and 'YYYY-MM' upper bounds cover the whole year/month.
+
+    Upper bounds are exclusive (the day after the inclusive end date).
+    """
+    if value is None:
+        return None
+    if upper and isinstance(value, str) and len(value) == 4:
+        return pd.Timestamp(int(value) + 1, 1, 1)
+    if upper and isinstance(value, str) and len(value) == 7:
+        return pd.Timestamp(value + "-01") + pd.DateOffset(months=1)
+    value = pd.Timestamp(value)
+    return value.normalize() + pd.Timedelta(days=1) if upper else value
+
+
+def load_window(start=None, end=None, crisis=None, baseline_years=0, columns=None, cities=None,
+                directory=PARTITION_DIR, path=CLEANED_FILE):
+    """Licences issued between start and end (inclusive), or in a crisis window.
+
+    Only the issue-year partitions overlapping the window (partitions.py) and
+    the requested columns are read, so the cost follows the window rather than
+    the full history. Without a partitioned store the cleaned CSV is read and
+    filtered instead.
+    """
+    if crisis is not None:
+        start, end = crisis_window(crisis, baseline_years)
+    lower, upper = _window_bound(start, upper=False), _window_bound(end, upper=True)
+    usecols = None if columns is None else list(dict.fromkeys(list(columns) + ["issueddate"]))
+
+    if stored_cities(directory):
+        labels = {int(label) for _, label, _ in list_partitions(cities, None, directory) if label != UNKNOWN_YEAR}
+        years = [y for y in sorted(labels)
+                 if (lower is None or y >= lower.year) and (upper is None or y <= (upper - pd.Timedelta(days=1)).year)]
+        df = read_partitions(cities, years, usecols, directory)
+    else:
+        df = pd.read_csv(path, usecols=usecols, low_memory=False)
+
+    df = _add_dates(df)
+    mask = df["issued_date"].notna()
+    if lower is not None:
+        mask &= df["issued_date"] >= lower
+    if upper is not None:
+        mask &= df["issued_date"] < upper
+    return df[mask.to_numpy()].reset_index(drop=True)
+
+
+def tag_crises(dates, crises=CRISES):
+    """Label each date with the crisis it falls in ('Normal' otherwise)"""
+    dates = pd.Series(dates)
+    labels = np.full(len(dates), "Normal", dtype=object)
+    for name, (start_ts, end_ts) in crisis_bounds(crises).items():
+        labels[((dates >= start_ts) & (dates <= end_ts)).to_numpy()] = name
+    return pd.Series(labels, index=dates.index, name="crisis_period")
+
+
+def is_closed(status):
+    """Boolean mask of licences whose status means the business closed"""
+    return pd.Series(status).isin(CLOSED_STATUSES)
+
+
+def monthly_counts_by(df, column=None, date_col="issued_date"):
+    """Licence counts per month (rows, complete month range) and group (columns).
+
+    With column=None a single 'count' column is returned.
+    """
+    dated = df[df[date_col].notna()]
+    month_start = dated[date_col].dt.to_period("M").dt.to_timestamp()
+    if column is None:
+        counts = month_start.value_counts().sort_index().to_frame("count")
+    else:
+        groups = dated[column].fillna("unknown")
+        counts = pd.crosstab(month_start, groups)
+    months = pd.date_range(counts.index.min(), counts.index.max(), freq="MS", name="month_start")
+    counts = counts.reindex(months, fill_value=0)
+    counts.columns.name = column
+    return counts
@@ -0,0 +1,69 @@
+import pandas as pd
+import numpy as np
+
+# Label normalization on distinct values.
+#
+# Each column is factorized once; cleaning and the canonical-mapping tables
+# below run on the unique labels only, and the row codes are mapped back with
+# a single take. Cost grows with the number of distinct labels (a few hundred)
+# rather than the number of rows.
+
+# Era markers appended by the portal to retired categories, e.g.
+# "Duplex *Historic*" in the 1997-2012 and 2013-2024 extracts
+HISTORIC_MARKER = "*historic*"
+
+STATUS_CANONICAL = {
+    "expired": "closed",
+    "closed": "closed",
+    "active": "active",
+}
+
+# Legacy business type labels (after cleaning) renamed in later extracts.
+# Only one-to-one renames belong here; grouping related categories into
+# sectors is the taxonomy's job.
+BUSINESS_TYPE_CANONICAL = {
+    "ltd service food establishment": "limited service food establishment",
+    "contractor": "general contractor",
+    "contractor - special trades": "trade contractor",
+    "manufacturer": "non-food manufacturer assembler and processor",
+    "manufacturer - food": "food manufacturer assembler and processor",
+    "wholesale dealer": "wholesale dealer - non-food",
+    "secondhand dealer": "retail dealer - used goods",
+    "retail dealer - grocery": "grocery store",
+    "auto parking lot/parkade": "parking area / garage",
+    "community association": "association or society",
+    "rentals": "rental services",
+}
+
+# Strings that mean "no value" once cleaned
+MISSING_LABELS = {"", "nan", "none", "null"}
+
+
+def clean_labels(labels, drop_markers=(HISTORIC_MARKER,)):
+    """Lower-case, trim, collapse inner whitespace and remove era markers"""
+    labels = pd.Series(labels, dtype=object).astype(str).str.lower()
+    for marker in drop_markers:
+        labels = labels.str.replace(marker, " ", regex=False)
+    return labels.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def normalize_labels(values, canonical=None, drop_markers=(HISTORIC_MARKER,), categorical=False):
+    """Normalize a label column through its unique values.
+
+    Missing values (and labels that clean to 'nan'/empty) become NA. With
+    categorical=True the result is a Categorical over the canonical labels.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    cleaned = clean_labels(uniques, drop_markers)
+    if canonical:
+        cleaned = cleaned.replace(canonical)
+    cleaned = cleaned.where(~cleaned.isin(MISSING_LABELS))
+
+    # Re-factorize: several raw labels can share one canonical label
+    label_codes, labels = pd.factorize(cleaned, use_na_sentinel=True)
+    row_codes = np.where(codes >= 0, label_codes[codes], -1)
+    if categorical:
+        return pd.Series(pd.Categorical.from_codes(row_codes, labels), index=values.index, name=values.name)
+    lookup = np.append(np.asarray(labels, dtype=object), pd.NA)
+    return pd.Series(lookup[row_codes], index=values.index, name=values.name, dtype=object)
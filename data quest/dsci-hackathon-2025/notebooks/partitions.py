@@ -0,0 +1,118 @@
+import pandas as pd
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+# Cleaned licences partitioned by city and issue year.
+#
+#   data/cleaned/partitions/city=<city>/year=<yyyy>.csv
+#   data/cleaned/partitions/city=<city>/year=unknown.csv   (no issued date)
+#   data/cleaned/partitions/city=<city>/_manifest.json     columns and rows per year
+#
+# clean.py writes one city at a time (replacing that city's directory as a
+# whole), so cities are cleaned in parallel and readers only open the
+# partitions they ask for. CSV keeps the store readable without extra
+# dependencies.
+
+PARTITION_DIR = "data/cleaned/partitions"
+MANIFEST = "_manifest.json"
+UNKNOWN_YEAR = "unknown"
+
+
+def _city_dir(city, directory):
+    return os.path.join(directory, f"city={city}")
+
+
+def _year_label(year):
+    return UNKNOWN_YEAR if pd.isna(year) else str(int(year))
+
+
+def write_partitions(df, city, directory=PARTITION_DIR, year_col="year"):
+    """Replace a city's partitions with df split by year_col; returns the manifest"""
+    final_dir = _city_dir(city, directory)
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    labels = df[year_col].map(_year_label) if len(df) else pd.Series(dtype=object)
+    rows = {}
+    for label, part in df.groupby(labels, sort=True):
+        part.to_csv(os.path.join(tmp_dir, f"year={label}.csv"), index=False)
+        rows[label] = len(part)
+    manifest = {"city": city, "columns": list(df.columns), "rows": int(len(df)), "partitions": rows}
+    with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    return manifest
+
+
+def stored_cities(directory=PARTITION_DIR):
+    """Cities present in the store"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[len("city="):] for name in os.listdir(directory)
+                  if name.startswith("city=") and not name.endswith(".tmp"))
+
+
+def read_manifest(city, directory=PARTITION_DIR):
+    path = os.path.join(_city_dir(city, directory), MANIFEST)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found (run data/fetch/clean.py first)")
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_partitions(cities=None, years=None, directory=PARTITION_DIR):
+    """[(city, year label, path)] for the requested cities and years.
+
+    years=None selects every partition, including rows without an issue date;
+    otherwise only the listed years that exist are returned.
+    """
+    wanted = None if years is None else {str(int(y)) for y in years}
+    selected = []
+    for city in cities or stored_cities(directory):
+        for label in read_manifest(city, directory)["partitions"]:
+            if wanted is None or label in wanted:
+                selected.append((city, label, os.path.join(_city_dir(city, directory), f"year={label}.csv")))
+    return selected
+
+
+def read_partitions(cities=None, years=None, columns=None, directory=PARTITION_DIR):
+    """Concatenate the selected partitions, reading only the requested columns.
+
+    A 'city' column is added from the partition path.
+    """
+    frames = []
+    for city, _, path in list_partitions(cities, years, directory):
+        usecols = None
+        if columns is not None:
+            available = read_manifest(city, directory)["columns"]
+            usecols = [c for c in columns if c in available]
+        frames.append(pd.read_csv(path, usecols=usecols, low_memory=False).assign(city=city))
+    if not frames:
+        return pd.DataFrame(columns=list(columns or []) + ["city"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _city_task(task):
+    func, city, years, columns, directory = task
+    return city, func(read_partitions([city], years, columns, directory))
+
+
+def map_cities(func, cities=None, years=None, columns=None, max_workers=None, directory=PARTITION_DIR):
+    """Apply func to each city's licences in parallel; returns {city: result}.
+
+    Each worker reads only its own city's partitions, so the parent never
+    holds more than the per-city results.
+    """
+    tasks = [(func, city, years, columns, directory) for city in cities or stored_cities(directory)]
+    if len(tasks) <= 1 or max_workers == 1:
+        return dict(_city_task(task) for task in tasks)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork") if "fork" in methods else None
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        return dict(executor.map(_city_task, tasks))
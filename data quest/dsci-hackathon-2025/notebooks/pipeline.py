@@ -0,0 +1,245 @@
+import argparse
+import hashlib
+import json
+import os
+import runpy
+import sys
+from datetime import datetime
+
+# Single entry point for the pipeline, run from the project root:
+#
+#   python notebooks/pipeline.py fetch | clean | train | report [script args]
+#   python notebooks/pipeline.py analyze [crisis|impact|effects|recovery|survival|forecast] [script args]
+#   python notebooks/pipeline.py plot [overview|sectors]
+#   python notebooks/pipeline.py status
+#   python notebooks/pipeline.py query --type restaurant --from 2008-01 --to 2009-12
+#
+# Stage commands run the existing scripts unchanged (runpy, as __main__), so
+# pandas, sklearn, statsmodels and matplotlib are imported only by the stage
+# that needs them. status reads manifests and headers with the standard
+# library; query memory-maps the count_store openings/closures cube with
+# numpy alone. Both start in a fraction of a second.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = {
+    "fetch": "data/fetch/fetch.py",
+    "clean": "data/fetch/clean.py",
+    "train": "notebooks/crisis_train.py",
+    "report": "notebooks/crisis_report.py",
+}
+ANALYSES = {
+    "crisis": "notebooks/crisis_analysis.py",
+    "impact": "notebooks/crisis_impact.py",
+    "effects": "notebooks/crisis_effects.py",
+    "recovery": "notebooks/recovery.py",
+    "survival": "notebooks/survival.py",
+    "forecast": "notebooks/hierarchical_forecast.py",
+}
+PLOTS = {
+    "overview": "notebooks/visualization.py",
+    "sectors": "notebooks/viz.py",
+}
+
+# Outputs checked by status. Same locations as licences.py, partitions.py,
+# feature_store.py, count_store.py and crisis_report.py; those modules import
+# pandas, so the paths are repeated here.
+RAW_DIR = "data/raw"
+CLEANED_FILE = "data/cleaned/business_licences_1997_2024.csv"
+PARTITION_DIR = "data/cleaned/partitions"
+FEATURE_DIR = "data/cleaned/features"
+ARRAY_DIR = "data/cleaned/arrays"
+REPORT_FILE = "results/crisis_analysis/crisis_report.json"
+CUBE_NAMES = ("dashboard_openings", "dashboard_closures")
+
+
+def run_script(script, args):
+    """Run a pipeline script as __main__ with its own argv and import path"""
+    path = os.path.join(PROJECT_ROOT, script)
+    sys.argv = [path] + list(args)
+    sys.path.insert(0, os.path.dirname(path))
+    runpy.run_path(path, run_name="__main__")
+
+
+# =============================================================================
+# STATUS
+# =============================================================================
+
+def _describe_file(path):
+    stat = os.stat(path)
+    return f"{stat.st_size / 1024 ** 2:8.1f} MB  {datetime.fromtimestamp(stat.st_mtime):%Y-%m-%d %H:%M}"
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def show_status():
+    print("=" * 70)
+    print("PIPELINE STATUS")
+    print("=" * 70)
+
+    raw = sorted(f for f in os.listdir(RAW_DIR) if f.endswith(".csv")) if os.path.isdir(RAW_DIR) else []
+    print(f"\nRaw extracts ({RAW_DIR}):")
+    for name in raw:
+        print(f"  {name:40s} {_describe_file(os.path.join(RAW_DIR, name))}")
+    if not raw:
+        print("  none (run: pipeline.py fetch)")
+
+    print("\nCleaned data:")
+    if os.path.exists(CLEANED_FILE):
+        print(f"  {os.path.basename(CLEANED_FILE):40s} {_describe_file(CLEANED_FILE)}")
+    else:
+        print("  none (run: pipeline.py clean)")
+    cities = sorted(d for d in os.listdir(PARTITION_DIR) if d.startswith("city=") and not d.endswith(".tmp")) \
+        if os.path.isdir(PARTITION_DIR) else []
+    for city in cities:
+        with open(os.path.join(PARTITION_DIR, city, "_manifest.json")) as f:
+            manifest = json.load(f)
+        years = sorted(label for label in manifest["partitions"] if label.isdigit())
+        span = f"{years[0]}-{years[-1]}" if years else "no dated rows"
+        print(f"  partitions {city:29s} {manifest['rows']:8,} rows  {len(manifest['partitions'])} files ({span})")
+
+    print("\nFeature store:")
+    keys = sorted(k for k in os.listdir(FEATURE_DIR)
+                  if os.path.exists(os.path.join(FEATURE_DIR, k, "header.json"))) if os.path.isdir(FEATURE_DIR) else []
+    current = _sha256(CLEANED_FILE) if keys and os.path.exists(CLEANED_FILE) else None
+    for key in keys:
+        with open(os.path.join(FEATURE_DIR, key, "header.json")) as f:
+            header = json.load(f)
+        state = "current" if header["data_sha256"] == current else "stale (cleaned data changed)"
+        print(f"  {key:40s} {header['rows']:8,} rows  {state}")
+    if not keys:
+        print("  none (run: pipeline.py train)")
+
+    print("\nCount arrays:")
+    arrays = sorted(f[:-5] for f in os.listdir(ARRAY_DIR) if f.endswith(".json")) if os.path.isdir(ARRAY_DIR) else []
+    for name in arrays:
+        with open(os.path.join(ARRAY_DIR, f"{name}.json")) as f:
+            header = json.load(f)
+        print(f"  {name:40s} {' x '.join(map(str, header['shape']))} ({header['index_kind']}s "
+              f"{header['index'][0]}..{header['index'][-1]})")
+    if not arrays:
+        print("  none (run: pipeline.py analyze)")
+
+    print("\nCrisis report:")
+    if os.path.exists(REPORT_FILE):
+        with open(REPORT_FILE) as f:
+            report = json.load(f)
+        flagged = [name for name, entry in report.items() if entry["insufficient_data"]]
+        print(f"  {REPORT_FILE:40s} {len(report)} crises, {len(flagged)} with insufficient data")
+    else:
+        print("  none (run: pipeline.py report)")
+
+
+# =============================================================================
+# QUERY
+# =============================================================================
+
+def _matching(labels, wanted):
+    """Positions of labels equal to (or else containing) each wanted label, case-insensitively"""
+    lowered = [label.lower() for label in labels]
+    positions = []
+    for term in wanted:
+        term = term.lower()
+        exact = [i for i, label in enumerate(lowered) if label == term]
+        positions += exact or [i for i, label in enumerate(lowered) if term in label]
+    return sorted(set(positions))
+
+
+def query_counts(types=None, areas=None, start=None, end=None, by="year", directory=ARRAY_DIR):
+    """[(period, openings, closures)] from the memory-mapped type x area cube"""
+    import numpy as np
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from count_store import open_counts
+
+    cubes = [open_counts(name, directory) for name in CUBE_NAMES]
+    header = cubes[0][1]
+    months = header["index"]
+    levels = header["levels"]
+    type_pos = _matching(levels["businesstype"], types) if types else list(range(len(levels["businesstype"])))
+    area_pos = _matching(levels["localarea"], areas) if areas else list(range(len(levels["localarea"])))
+    if not type_pos or not area_pos:
+        raise SystemExit("No business type or local area matches the query")
+    # 'YYYY' bounds cover the whole year
+    start = start + "-01" if start and len(start) == 4 else start
+    end = end + "-12" if end and len(end) == 4 else end
+    rows = [i for i, month in enumerate(months) if (start is None or month >= start) and (end is None or month <= end)]
+    if not rows:
+        raise SystemExit("No months in the requested range")
+
+    shape = (len(months), len(levels["businesstype"]), len(levels["localarea"]))
+    totals = []
+    for values, _ in cubes:
+        block = values.reshape(shape)[rows[0]:rows[-1] + 1]
+        totals.append(block[:, type_pos][:, :, area_pos].sum(axis=(1, 2), dtype=np.int64))
+    periods = [months[i] if by == "month" else months[i][:4] for i in rows]
+
+    result = {}
+    for period, opened, closed in zip(periods, *totals):
+        o, c = result.get(period, (0, 0))
+        result[period] = (o + int(opened), c + int(closed))
+    matched = {"types": [levels["businesstype"][i] for i in type_pos],
+               "areas": [levels["localarea"][i] for i in area_pos]}
+    return [(period, o, c) for period, (o, c) in result.items()], matched
+
+
+def show_query(args):
+    if not all(os.path.exists(os.path.join(ARRAY_DIR, f"{name}.json")) for name in CUBE_NAMES):
+        raise SystemExit(f"No openings cube in {ARRAY_DIR} (run: pipeline.py report, or dashboard.py --build)")
+    rows, matched = query_counts(args.type, args.area, getattr(args, "from"), args.to, args.by)
+    if args.type:
+        types = matched["types"]
+        more = f" (+{len(types) - 10} more)" if len(types) > 10 else ""
+        print(f"Business types: {', '.join(types[:10])}{more}")
+    if args.area:
+        print(f"Local areas: {', '.join(matched['areas'])}")
+    print(f"{args.by:>8s} {'openings':>10s} {'closures':>10s}")
+    for period, opened, closed in rows:
+        if opened or closed or args.by == "month":
+            print(f"{period:>8s} {opened:10,} {closed:10,}")
+    print(f"{'total':>8s} {sum(r[1] for r in rows):10,} {sum(r[2] for r in rows):10,}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Business licence crisis pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, script in STAGES.items():
+        sub = commands.add_parser(name, help=f"run {script}")
+        sub.add_argument("args", nargs=argparse.REMAINDER, help="passed to the script")
+    sub = commands.add_parser("analyze", help="run an analysis script (default: crisis)")
+    sub.add_argument("target", nargs="?", default="crisis", choices=list(ANALYSES))
+    sub.add_argument("args", nargs=argparse.REMAINDER, help="passed to the script")
+    sub = commands.add_parser("plot", help="render figures (default: overview)")
+    sub.add_argument("target", nargs="?", default="overview", choices=list(PLOTS))
+    sub.add_argument("args", nargs=argparse.REMAINDER, help="passed to the script")
+    commands.add_parser("status", help="show which pipeline outputs exist and whether they are current")
+    sub = commands.add_parser("query", help="openings/closures from the precomputed count cube")
+    sub.add_argument("--type", action="append", help="business type (exact or substring; repeatable)")
+    sub.add_argument("--area", action="append", help="local area (exact or substring; repeatable)")
+    sub.add_argument("--from", default=None, metavar="YYYY[-MM]")
+    sub.add_argument("--to", default=None, metavar="YYYY[-MM]")
+    sub.add_argument("--by", default="year", choices=["year", "month"])
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "status":
+        show_status()
+    elif args.command == "query":
+        show_query(args)
+    elif args.command == "analyze":
+        run_script(ANALYSES[args.target], args.args)
+    elif args.command == "plot":
+        run_script(PLOTS[args.target], args.args)
+    else:
+        run_script(STAGES[args.command], args.args)
+
+
+if __name__ == "__main__":
+    main()
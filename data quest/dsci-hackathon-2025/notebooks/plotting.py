@@ -0,0 +1,146 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import numpy as np
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Headless batch rendering of figure specs.
+#
+# A figure spec is a dict:
+#   {"path": "results/yoy_growth_rate",   # output path without extension
+#    "render": figures.yoy_growth,         # module-level function returning a Figure
+#    "data": {"yearly": yearly}}           # keyword arguments for render
+# Each spec is rendered once per output format. A spec is skipped when its
+# data, render function source, DPI and format hash to the value recorded in
+# the directory's cache manifest and the output file still exists.
+
+FIGURE_DPI = int(os.environ.get("FIGURE_DPI", 300))
+FIGURE_FORMATS = os.environ.get("FIGURE_FORMAT", "png").split(",")
+SUPPORTED_FORMATS = ["png", "svg", "pdf"]
+CACHE_MANIFEST = ".figure_cache.json"
+
+
+def _hash_value(h, value):
+    """Feed a stable byte representation of value into hash h"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(repr(value.columns if isinstance(value, pd.DataFrame) else value.name).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Index):
+        h.update(pd.util.hash_pandas_object(value).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(str((value.dtype, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            h.update(repr(key).encode())
+            _hash_value(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(repr(value).encode())
+
+
+def spec_hash(spec, dpi, fmt):
+    """Hash of everything that determines a rendered figure file"""
+    h = hashlib.sha256()
+    render = spec["render"]
+    h.update(f"{render.__module__}.{render.__qualname__}|{dpi}|{fmt}".encode())
+    h.update(inspect.getsource(render).encode())
+    _hash_value(h, spec.get("data", {}))
+    return h.hexdigest()
+
+
+def _load_manifest(directory):
+    path = os.path.join(directory, CACHE_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(directory, manifest):
+    with open(os.path.join(directory, CACHE_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _render_task(task):
+    """Render one spec to every requested format (runs in a worker process)"""
+    spec, dpi, formats = task
+    fig = spec["render"](**spec.get("data", {}))
+    paths = []
+    for fmt in formats:
+        path = f"{spec['path']}.{fmt}"
+        fig.savefig(path, dpi=dpi, format=fmt, bbox_inches="tight")
+        paths.append(path)
+    plt.close(fig)
+    return paths
+
+
+def render_figures(specs, dpi=None, formats=None, max_workers=None, force=False):
+    """Render figure specs in a process pool, skipping unchanged figures.
+
+    `dpi` and `formats` default to FIGURE_DPI / FIGURE_FORMAT from the
+    environment (300, png). Workers are forked where the platform allows it,
+    so render functions may come from flat scripts. Returns a dict with the
+    'rendered' and 'skipped' output paths.
+    """
+    dpi = dpi or FIGURE_DPI
+    formats = list(formats or FIGURE_FORMATS)
+    unknown = set(formats) - set(SUPPORTED_FORMATS)
+    if unknown:
+        raise ValueError(f"Unsupported figure format(s): {sorted(unknown)} (expected {SUPPORTED_FORMATS})")
+
+    manifests, tasks, pending, skipped = {}, [], [], []
+    for spec in specs:
+        directory = os.path.dirname(spec["path"]) or "."
+        os.makedirs(directory, exist_ok=True)
+        manifest = manifests.setdefault(directory, _load_manifest(directory))
+        todo = []
+        for fmt in formats:
+            path = f"{spec['path']}.{fmt}"
+            key = os.path.basename(path)
+            digest = spec_hash(spec, dpi, fmt)
+            if not force and manifest.get(key) == digest and os.path.exists(path):
+                skipped.append(path)
+            else:
+                todo.append(fmt)
+                pending.append((directory, key, digest))
+        if todo:
+            tasks.append((spec, dpi, todo))
+
+    rendered = []
+    if len(tasks) == 1 or max_workers == 1:
+        for task in tasks:
+            rendered.extend(_render_task(task))
+    elif tasks:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            for paths in executor.map(_render_task, tasks):
+                rendered.extend(paths)
+
+    for directory, key, digest in pending:
+        manifests[directory][key] = digest
+    for directory in {directory for directory, _, _ in pending}:
+        _save_manifest(directory, manifests[directory])
+    return {"rendered": rendered, "skipped": skipped}
+
+
+def report(result, start=None):
+    """Print the repo's usual save lines for a render_figures() result"""
+    for path in result["rendered"]:
+        print(f"✓ Saved: {path}")
+    for path in result["skipped"]:
+        print(f"- Unchanged: {path}")
+    if start is not None:
+        print(f"Rendered {len(result['rendered'])} file(s), skipped {len(result['skipped'])} "
+              f"in {time()-start:.1f}s")
@@ -0,0 +1,247 @@
+import atexit
+import csv
+import json
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+from time import perf_counter, process_time
+
+# Stage-level profiling spans.
+#
+#   with span("load") as s:
+#       df = pd.read_csv(...)
+#       s.rows = len(df)
+#
+#   @traced("bootstrap")
+#   def bootstrap_crisis_impact(data, ...): ...
+#
+#   stage = span("parse dates").start()     # flat script sections
+#   ...
+#   stage.stop(rows=len(df))
+#
+# Spans are recorded only when PROFILE=1 is set. Each records wall time, CPU
+# time, rows processed and peak memory; at exit a Chrome trace file
+# (chrome://tracing or ui.perfetto.dev) and a per-stage summary CSV are written
+# to PROFILE_DIR and the summary table is printed. Peak memory is the growth of
+# the process RSS high-water mark during the span; PROFILE_MEMORY=1 switches to
+# tracemalloc's per-span Python allocation peak (exact, but several times slower).
+#
+# When disabled, span() returns a shared no-op object and @traced returns the
+# function unchanged, so instrumented scripts run at full speed.
+
+ENABLED = os.environ.get("PROFILE", "") not in ("", "0")
+TRACE_MEMORY = ENABLED and os.environ.get("PROFILE_MEMORY", "") not in ("", "0")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "results/profiles")
+
+_records = []
+_local = threading.local()
+_origin = perf_counter()
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+class Span:
+    """One timed stage; use as a context manager or via start()/stop()"""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self._max_traced = 0
+
+    def start(self):
+        stack = _stack()
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        if TRACE_MEMORY:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._max_traced = max(stack[-1]._max_traced, peak)
+            self._traced_start = current
+            tracemalloc.reset_peak()
+        self._rss_start = _peak_rss_mb()
+        stack.append(self)
+        self._cpu_start = process_time()
+        self._wall_start = perf_counter()
+        return self
+
+    def stop(self, rows=None):
+        wall = perf_counter() - self._wall_start
+        cpu = process_time() - self._cpu_start
+        if rows is not None:
+            self.rows = rows
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        peak_rss = _peak_rss_mb()
+        if TRACE_MEMORY:
+            peak = max(tracemalloc.get_traced_memory()[1], self._max_traced)
+            peak_mb = (peak - self._traced_start) / 1024 ** 2
+            if stack:
+                stack[-1]._max_traced = max(stack[-1]._max_traced, peak)
+        else:
+            peak_mb = peak_rss - self._rss_start
+        _records.append({
+            "name": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            "start_s": self._wall_start - _origin,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "rows": self.rows,
+            "peak_mb": peak_mb,
+            "peak_rss_mb": peak_rss,
+            "thread": threading.get_ident(),
+        })
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class _NullSpan:
+    """Shared stand-in returned while profiling is disabled"""
+
+    rows = None
+
+    def start(self):
+        return self
+
+    def stop(self, rows=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, rows=None):
+    """Time a stage; a no-op unless PROFILE=1"""
+    if not ENABLED:
+        return _NULL_SPAN
+    return Span(name, rows)
+
+
+def traced(name=None):
+    """Decorator form of span(); rows default to len() of the first argument when it has one"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            rows = len(args[0]) if args and hasattr(args[0], "__len__") else None
+            with Span(label, rows):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+def summarize(records=None):
+    """Per-stage totals in order of first start"""
+    stages = {}
+    records = records if records is not None else _records
+    for r in sorted(records, key=lambda r: r["start_s"]):
+        s = stages.setdefault(r["name"], {"stage": r["name"], "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                          "rows": None, "peak_mb": 0.0, "depth": r["depth"]})
+        s["calls"] += 1
+        s["wall_s"] += r["wall_s"]
+        s["cpu_s"] += r["cpu_s"]
+        s["peak_mb"] = max(s["peak_mb"], r["peak_mb"])
+        s["depth"] = min(s["depth"], r["depth"])
+        if r["rows"] is not None:
+            s["rows"] = (s["rows"] or 0) + r["rows"]
+    for s in stages.values():
+        s["rows_per_s"] = s["rows"] / s["wall_s"] if s["rows"] and s["wall_s"] > 0 else None
+    return list(stages.values())
+
+
+def format_summary(summary):
+    lines = [f"{'stage':32s} {'calls':>6s} {'wall s':>9s} {'cpu s':>9s} {'rows':>12s} "
+             f"{'rows/s':>12s} {'peak MB':>9s}"]
+    for s in summary:
+        label = ("  " * s["depth"] + s["stage"])[:32]
+        rows = f"{s['rows']:,}" if s["rows"] is not None else "-"
+        rate = f"{s['rows_per_s']:,.0f}" if s["rows_per_s"] is not None else "-"
+        lines.append(f"{label:32s} {s['calls']:6d} {s['wall_s']:9.3f} {s['cpu_s']:9.3f} {rows:>12s} "
+                     f"{rate:>12s} {s['peak_mb']:9.1f}")
+    return "\n".join(lines)
+
+
+def write_trace(path, records=None):
+    """Chrome trace-event JSON (complete 'X' events, microseconds)"""
+    records = records if records is not None else _records
+    events = [{
+        "name": r["name"],
+        "cat": "stage",
+        "ph": "X",
+        "ts": round(r["start_s"] * 1e6, 1),
+        "dur": round(r["wall_s"] * 1e6, 1),
+        "pid": os.getpid(),
+        "tid": r["thread"],
+        "args": {"cpu_s": round(r["cpu_s"], 6), "rows": r["rows"], "peak_mb": round(r["peak_mb"], 2),
+                 "peak_rss_mb": round(r["peak_rss_mb"], 1)},
+    } for r in records]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                   "otherData": {"script": sys.argv[0], "memory": "tracemalloc" if TRACE_MEMORY else "rss"}}, f)
+    return path
+
+
+def write_summary(path, summary):
+    fields = ["stage", "calls", "wall_s", "cpu_s", "rows", "rows_per_s", "peak_mb"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(summary)
+    return path
+
+
+def _report():
+    if not _records:
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    script = os.path.splitext(os.path.basename(sys.argv[0]))[0] or "interactive"
+    stem = os.path.join(PROFILE_DIR, f"{script}_{datetime.now():%Y%m%d-%H%M%S}_{os.getpid()}")
+    summary = summarize()
+    print("\n" + "=" * 70)
+    print(f"PROFILE: {script}")
+    print("=" * 70)
+    print(format_summary(summary))
+    print(f"\n✓ Saved: {write_trace(stem + '.trace.json')}")
+    print(f"✓ Saved: {write_summary(stem + '.summary.csv', summary)}")
+
+
+if ENABLED:
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    atexit.register(_report)
@@ -0,0 +1,147 @@
+import pandas as pd
+import numpy as np
+import os
+from time import time
+
+from licences import CRISES, crisis_bounds, load_licences
+from crisis_effects import sector_panel
+
+OUTPUT_FILE = "data/cleaned/recovery_times.csv"
+
+BASELINE_MONTHS = 12       # months before the crisis used as the baseline level
+FOLLOW_UP_MONTHS = 36      # months after the crisis ends searched for recovery
+SMOOTHING_MONTHS = 3       # trailing moving average applied before comparisons
+MAX_GAP_SHARE = 0.25       # windows with more missing months than this are skipped
+
+
+def trailing_mean(values, window):
+    """Trailing moving average along axis -2 via cumulative sums.
+
+    NaN entries (data gaps) are skipped; a month whose whole window is missing
+    stays NaN.
+    """
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=-2)
+    ccount = np.cumsum(valid, axis=-2)
+
+    def lagged(c):
+        return np.concatenate([np.zeros_like(c[..., :window, :]), c[..., :-window, :]], axis=-2)
+
+    total = csum - lagged(csum)
+    count = ccount - lagged(ccount)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def recovery_metrics(window, baseline_months=BASELINE_MONTHS, smoothing=SMOOTHING_MONTHS):
+    """Recovery metrics for counts shaped (..., months, series).
+
+    The first `baseline_months` rows are the pre-crisis baseline; row
+    `baseline_months` is the first crisis month. NaN rows are data gaps and
+    are ignored. Returns a dict of arrays shaped (..., series):
+      baseline            mean monthly licences before the crisis
+      trough_depth_pct    lowest smoothed level vs baseline (%)
+      months_to_trough    months from crisis start to the trough
+      months_to_baseline  months from crisis start until the smoothed series is
+                          back at baseline after the trough (NaN = not recovered)
+      area_under_loss     licence-months lost below baseline until recovery
+    """
+    window = np.asarray(window, dtype=float)
+    with np.errstate(invalid="ignore"):
+        baseline = np.nanmean(window[..., :baseline_months, :], axis=-2)
+    smooth = trailing_mean(window, smoothing)[..., baseline_months:, :]
+    n_after = smooth.shape[-2]
+    months = np.arange(n_after)[:, None]
+
+    trough_at = np.where(np.isnan(smooth), np.inf, smooth).argmin(axis=-2)
+    trough = np.take_along_axis(smooth, trough_at[..., None, :], axis=-2)[..., 0, :]
+
+    base = baseline[..., None, :]
+    back = (smooth >= base) & (months >= trough_at[..., None, :])
+    recovered = back.any(axis=-2)
+    recovery_at = np.where(recovered, back.argmax(axis=-2), n_after)
+
+    shortfall = np.nan_to_num(np.clip(base - smooth, 0, None))
+    loss = np.where(months < recovery_at[..., None, :], shortfall, 0).sum(axis=-2)
+
+    has_baseline = baseline > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        depth = np.where(has_baseline, 100.0 * (trough / baseline - 1), np.nan)
+    return {
+        "baseline": baseline,
+        "trough_depth_pct": depth,
+        "months_to_trough": trough_at.astype(float),
+        "months_to_baseline": np.where(recovered & has_baseline, recovery_at, np.nan),
+        "area_under_loss": np.where(has_baseline, loss, np.nan),
+    }
+
+
+def recovery_table(panel, crises=CRISES, n_bootstrap=1000, random_state=0):
+    """Recovery metrics with Poisson-bootstrap 95% intervals for every crisis x series.
+
+    `panel` is a months x series count frame (e.g. sector_panel()). All series
+    and all bootstrap replicates of a crisis are evaluated in one array pass.
+    Months with no licences of any type are treated as gaps between extracts.
+    """
+    rng = np.random.default_rng(random_state)
+    gaps = panel.sum(axis=1) == 0
+    rows = []
+    for name, (start_ts, end_ts) in crisis_bounds(crises).items():
+        first = start_ts - pd.DateOffset(months=BASELINE_MONTHS)
+        last = end_ts.to_period("M").to_timestamp() + pd.DateOffset(months=FOLLOW_UP_MONTHS)
+        window = panel.loc[first:last]
+        expected = len(pd.date_range(first, last, freq="MS"))
+        gap_share = 1 - (len(window) - gaps.loc[first:last].sum()) / expected
+        if len(window) <= BASELINE_MONTHS or gap_share > MAX_GAP_SHARE:
+            for series in panel.columns:
+                rows.append({"crisis": name, "series": series, "insufficient_data": True})
+            continue
+
+        counts = window.to_numpy(dtype=float)
+        counts[gaps.loc[first:last].to_numpy()] = np.nan
+        point = recovery_metrics(counts)
+        draws = rng.poisson(np.nan_to_num(counts), size=(n_bootstrap,) + counts.shape).astype(float)
+        draws[:, np.isnan(counts)] = np.nan
+        boot = recovery_metrics(draws)
+
+        for k, series in enumerate(panel.columns):
+            row = {"crisis": name, "series": series, "insufficient_data": False}
+            for metric, values in point.items():
+                row[metric] = values[k]
+                if metric == "baseline":
+                    continue
+                samples = boot[metric][:, k]
+                finite = samples[np.isfinite(samples)]
+                row[f"{metric}_ci_lower"] = np.percentile(finite, 2.5) if len(finite) else np.nan
+                row[f"{metric}_ci_upper"] = np.percentile(finite, 97.5) if len(finite) else np.nan
+            row["recovery_probability"] = np.isfinite(boot["months_to_baseline"][:, k]).mean()
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("RECOVERY TIME ANALYSIS")
+    print("=" * 70)
+
+    start = time()
+    df = load_licences(columns=["issueddate", "businesstype"])
+    panel = sector_panel(df)
+    table = recovery_table(panel)
+    print(f"Computed {len(table):,} crisis x series rows in {time()-start:.1f}s")
+
+    overall = table[table["series"] == "all"]
+    print("\nAll licences:")
+    for _, row in overall.iterrows():
+        if row["insufficient_data"]:
+            print(f"  {row['crisis']}: insufficient data (window overlaps a data gap)")
+            continue
+        months = row["months_to_baseline"]
+        recovery = f"{months:.0f} months" if np.isfinite(months) else "not recovered"
+        print(f"  {row['crisis']}: trough {row['trough_depth_pct']:+.1f}% after "
+              f"{row['months_to_trough']:.0f} months, back to baseline: {recovery} "
+              f"(P(recovered)={row['recovery_probability']:.2f})")
+
+    os.makedirs("data/cleaned", exist_ok=True)
+    table.to_csv(OUTPUT_FILE, index=False)
+    print(f"\n✓ Saved: {OUTPUT_FILE}")
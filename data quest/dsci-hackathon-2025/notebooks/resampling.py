@@ -0,0 +1,99 @@
+import numpy as np
+
+# Time-series bootstrap index generators.
+#
+# Every generator returns an int array of shape (n_replicates, n): row r holds
+# the positions to take from the original series for replicate r. Indices for
+# all replicates are drawn at once, so callers can gather with y[idx].
+#
+# Series with data gaps pass `runs`, a label per position that changes
+# wherever the series is broken. Blocks then never cross a break: moving
+# blocks start only where a whole block fits inside one run, and circular
+# and stationary blocks wrap around within their own run.
+
+BOOTSTRAP_METHODS = ["iid", "moving", "circular", "stationary"]
+
+
+def default_block_length(n):
+    """Rule-of-thumb block length ~ n^(1/3) (at least 2 when n allows)"""
+    return int(min(n, max(2, round(n ** (1 / 3)))))
+
+
+def run_bounds(runs):
+    """(begin, length) of the contiguous run containing each position"""
+    runs = np.asarray(runs)
+    change = np.r_[True, runs[1:] != runs[:-1]]
+    first = np.flatnonzero(change)
+    lengths = np.diff(np.r_[first, len(runs)])
+    which = np.cumsum(change) - 1
+    return first[which], lengths[which]
+
+
+def _wrap(starts, offsets, runs):
+    """Position `offsets` steps after `starts`, wrapping at the end of the series or of its run"""
+    if runs is None:
+        return starts + offsets
+    begin, length = run_bounds(runs)
+    return begin[starts] + (starts - begin[starts] + offsets) % length[starts]
+
+
+def iid_indices(n, n_replicates, rng):
+    """Classic i.i.d. resampling of individual observations"""
+    return rng.integers(0, n, size=(n_replicates, n))
+
+
+def moving_block_indices(n, block_length, n_replicates, rng, runs=None):
+    """Moving-block bootstrap: concatenated blocks starting anywhere in [0, n - L]"""
+    if runs is None:
+        block_length = min(block_length, n)
+        valid = np.arange(n - block_length + 1)
+    else:
+        begin, length = run_bounds(runs)
+        block_length = min(block_length, length.max())
+        valid = np.flatnonzero(np.arange(n) - begin + block_length <= length)
+    n_blocks = -(-n // block_length)
+    starts = valid[rng.integers(0, len(valid), size=(n_replicates, n_blocks))]
+    idx = starts[:, :, None] + np.arange(block_length)
+    return idx.reshape(n_replicates, -1)[:, :n]
+
+
+def circular_block_indices(n, block_length, n_replicates, rng, runs=None):
+    """Circular-block bootstrap: blocks may wrap around the end of the series"""
+    block_length = min(block_length, n)
+    n_blocks = -(-n // block_length)
+    starts = rng.integers(0, n, size=(n_replicates, n_blocks))
+    idx = _wrap(starts[:, :, None], np.arange(block_length), runs) % n
+    return idx.reshape(n_replicates, -1)[:, :n]
+
+
+def stationary_indices(n, mean_block_length, n_replicates, rng, runs=None):
+    """Stationary bootstrap (Politis & Romano): geometric block lengths, wrapping"""
+    positions = np.arange(n)
+    new_block = rng.random((n_replicates, n)) < 1.0 / mean_block_length
+    new_block[:, 0] = True
+    starts = rng.integers(0, n, size=(n_replicates, n))
+    # Position in the replicate where the current block began
+    block_begin = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+    block_start = np.take_along_axis(starts, block_begin, axis=1)
+    return _wrap(block_start, positions - block_begin, runs) % n
+
+
+def bootstrap_indices(n, n_replicates, method="moving", block_length=None, random_state=None, runs=None):
+    """Resampling indices of shape (n_replicates, n) for the chosen method.
+
+    `random_state` may be a seed or a numpy Generator. `block_length` defaults
+    to default_block_length(n) (the mean block length for 'stationary').
+    `runs` (length n) keeps blocks inside contiguous stretches of the series.
+    """
+    rng = random_state if isinstance(random_state, np.random.Generator) \
+        else np.random.default_rng(random_state)
+    if method == "iid":
+        return iid_indices(n, n_replicates, rng)
+    block_length = block_length or default_block_length(n)
+    if method == "moving":
+        return moving_block_indices(n, block_length, n_replicates, rng, runs)
+    if method == "circular":
+        return circular_block_indices(n, block_length, n_replicates, rng, runs)
+    if method == "stationary":
+        return stationary_indices(n, block_length, n_replicates, rng, runs)
+    raise ValueError(f"Unknown bootstrap method: {method} (expected one of {BOOTSTRAP_METHODS})")
@@ -0,0 +1,204 @@
+import pandas as pd
+import numpy as np
+import os
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
+
+from licences import CRISES, crisis_bounds, load_licences, is_closed
+from normalize import BUSINESS_TYPE_CANONICAL, STATUS_CANONICAL, normalize_labels
+
+CURRENT_FILE = "data/raw/current_2024_plus.csv"
+OUTPUT_PREFIX = "data/cleaned/scenario_closures"
+
+# Pseudo-count pulling sparse business types towards the crisis-wide closure rate
+SHRINKAGE = 20.0
+
+# Monte Carlo draws are generated in chunks of this many to bound memory
+CHUNK_DRAWS = 10_000
+
+
+def shock_profile(history, crisis_name, crises=CRISES, shrinkage=SHRINKAGE):
+    """Per-businesstype closure probability observed during a historical crisis.
+
+    A licence is exposed if it was active at some point in the crisis window
+    and counts as a closure if it has a closed status and expired inside the
+    window. Rates are shrunk towards the crisis-wide rate. Returns
+    (rates by type, overall rate).
+    """
+    start_ts, end_ts = crisis_bounds(crises)[crisis_name]
+    issued, expired = history["issued_date"], history["expired_date"]
+    exposed = (issued <= end_ts) & (expired.isna() | (expired >= start_ts))
+    closed = exposed & is_closed(history["status"]) & (expired <= end_ts)
+
+    by_type = pd.DataFrame({
+        "businesstype": history["businesstype"],
+        "exposed": exposed,
+        "closed": closed,
+    }).groupby("businesstype")[["exposed", "closed"]].sum()
+    overall = closed.sum() / max(exposed.sum(), 1)
+    rates = (by_type["closed"] + shrinkage * overall) / (by_type["exposed"] + shrinkage)
+    return rates, float(overall)
+
+
+def active_licence_groups(current):
+    """Count active licences per (businesstype, localarea)"""
+    active = current[current["status"] == "issued"]
+    return (
+        active.assign(businesstype=active["businesstype"].fillna("unknown"),
+                      localarea=active["localarea"].fillna("unknown"))
+        .groupby(["businesstype", "localarea"])
+        .size()
+        .rename("active")
+        .reset_index()
+    )
+
+
+def simulate_closures(groups, probabilities, n_draws=100_000, seed=0):
+    """Binomial Monte Carlo of closures for every (type, area) group.
+
+    Returns per-draw totals by type (draws x types) and by area (draws x areas)
+    together with the type and area labels.
+    """
+    rng = np.random.default_rng(seed)
+    type_codes, types = pd.factorize(groups["businesstype"], sort=True)
+    area_codes, areas = pd.factorize(groups["localarea"], sort=True)
+    n_groups = len(groups)
+    to_type = sparse.csr_matrix((np.ones(n_groups), (np.arange(n_groups), type_codes)),
+                                shape=(n_groups, len(types)))
+    to_area = sparse.csr_matrix((np.ones(n_groups), (np.arange(n_groups), area_codes)),
+                                shape=(n_groups, len(areas)))
+
+    n = groups["active"].to_numpy()
+    p = np.asarray(probabilities, dtype=float)
+    by_type = np.empty((n_draws, len(types)), dtype=np.int32)
+    by_area = np.empty((n_draws, len(areas)), dtype=np.int32)
+    for lo in range(0, n_draws, CHUNK_DRAWS):
+        hi = min(lo + CHUNK_DRAWS, n_draws)
+        draws = rng.binomial(n, p, size=(hi - lo, n_groups))
+        by_type[lo:hi] = (to_type.T @ draws.T).T
+        by_area[lo:hi] = (to_area.T @ draws.T).T
+    return by_type, list(types), by_area, list(areas)
+
+
+def summarize_draws(draws, labels, exposure, label_name):
+    """Mean and percentile summary of simulated closures per label"""
+    return pd.DataFrame({
+        label_name: labels,
+        "active": exposure,
+        "mean_closures": draws.mean(axis=0),
+        "p05": np.percentile(draws, 5, axis=0),
+        "p50": np.percentile(draws, 50, axis=0),
+        "p95": np.percentile(draws, 95, axis=0),
+        "closure_rate": draws.mean(axis=0) / np.maximum(exposure, 1),
+    })
+
+
+def run_scenario(scenario):
+    """Simulate one scenario dict: groups, rates, overall, crisis, intensity, n_draws, seed"""
+    groups = scenario["groups"]
+    rates = scenario["rates"]
+    p = groups["businesstype"].map(rates).fillna(scenario["overall"]).to_numpy()
+    p = np.clip(p * scenario["intensity"], 0.0, 1.0)
+
+    by_type, types, by_area, areas = simulate_closures(
+        groups, p, n_draws=scenario["n_draws"], seed=scenario["seed"]
+    )
+    type_exposure = groups.groupby("businesstype")["active"].sum().reindex(types).to_numpy()
+    area_exposure = groups.groupby("localarea")["active"].sum().reindex(areas).to_numpy()
+    label = {"crisis": scenario["crisis"], "intensity": scenario["intensity"]}
+    type_summary = summarize_draws(by_type, types, type_exposure, "businesstype").assign(**label)
+    area_summary = summarize_draws(by_area, areas, area_exposure, "localarea").assign(**label)
+    total = by_type.sum(axis=1)
+    overall = pd.DataFrame([{
+        **label,
+        "active": int(groups["active"].sum()),
+        "mean_closures": total.mean(),
+        "p05": np.percentile(total, 5),
+        "p95": np.percentile(total, 95),
+    }])
+    return type_summary, area_summary, overall
+
+
+def run_scenario_grid(history, current, crises=CRISES, intensities=(1.0,), custom_profiles=None,
+                      n_draws=100_000, seed=0, max_workers=None):
+    """Run every crisis (and custom profile) x intensity scenario in a process pool.
+
+    `custom_profiles` maps a scenario name to {businesstype: closure probability};
+    types missing from a custom profile fall back to its mean probability.
+    """
+    groups = active_licence_groups(current)
+    profiles = {name: shock_profile(history, name, crises) for name in crises}
+    for name, profile in (custom_profiles or {}).items():
+        rates = pd.Series(profile, dtype=float)
+        profiles[name] = (rates, float(rates.mean()))
+
+    seeds = np.random.SeedSequence(seed).spawn(len(profiles) * len(intensities))
+    scenarios = [
+        {"groups": groups, "rates": rates, "overall": overall, "crisis": name,
+         "intensity": intensity, "n_draws": n_draws, "seed": seeds[i * len(intensities) + j]}
+        for i, (name, (rates, overall)) in enumerate(profiles.items())
+        for j, intensity in enumerate(intensities)
+    ]
+
+    if len(scenarios) == 1:
+        results = [run_scenario(scenarios[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(run_scenario, scenarios))
+    by_type, by_area, totals = (pd.concat(parts, ignore_index=True) for parts in zip(*results))
+    return by_type, by_area, totals
+
+
+def load_current_licences(path=CURRENT_FILE):
+    """Current licences from the raw extract, normalized the way clean.py does"""
+    current = pd.read_csv(path, usecols=["status", "businesstype", "localarea"], low_memory=False)
+    current["status"] = normalize_labels(current["status"], STATUS_CANONICAL, drop_markers=())
+    current["businesstype"] = normalize_labels(current["businesstype"], BUSINESS_TYPE_CANONICAL)
+    return current
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay historical crisis shocks on current licences")
+    parser.add_argument("--crisis", choices=list(CRISES), action="append",
+                        help="crisis to replay (repeatable; default: all)")
+    parser.add_argument("--intensity", type=float, action="append",
+                        help="multiplier on closure probabilities (repeatable; default: 1.0)")
+    parser.add_argument("--draws", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    crises = {name: CRISES[name] for name in (args.crisis or CRISES)}
+    intensities = tuple(args.intensity or [1.0])
+
+    print("=" * 70)
+    print("CRISIS SCENARIO SIMULATION ON CURRENT LICENCES")
+    print("=" * 70)
+
+    start = time()
+    history = load_licences(columns=["status", "issueddate", "expireddate", "businesstype"])
+    current = load_current_licences()
+    by_type, by_area, totals = run_scenario_grid(
+        history, current, crises=crises, intensities=intensities,
+        n_draws=args.draws, max_workers=args.workers
+    )
+    print(f"Simulated {len(totals)} scenarios x {args.draws:,} draws in {time()-start:.1f}s")
+
+    print("\nExpected closures among currently active licences:")
+    for _, row in totals.iterrows():
+        print(f"  {row['crisis']} (x{row['intensity']:g}): {row['mean_closures']:.0f} "
+              f"[{row['p05']:.0f}, {row['p95']:.0f}] of {row['active']:,}")
+
+    worst = by_type[by_type["active"] >= 10].sort_values("closure_rate", ascending=False)
+    print("\nMost exposed business types (any scenario):")
+    print(worst.drop_duplicates("businesstype").head(10)[
+        ["businesstype", "crisis", "active", "mean_closures", "closure_rate"]
+    ].round(3).to_string(index=False))
+
+    os.makedirs("data/cleaned", exist_ok=True)
+    by_type.to_csv(f"{OUTPUT_PREFIX}_by_type.csv", index=False)
+    by_area.to_csv(f"{OUTPUT_PREFIX}_by_area.csv", index=False)
+    totals.to_csv(f"{OUTPUT_PREFIX}_totals.csv", index=False)
+    print(f"\n✓ Saved: {OUTPUT_PREFIX}_by_type.csv, _by_area.csv, _totals.csv")
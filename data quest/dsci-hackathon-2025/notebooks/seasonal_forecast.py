@@ -0,0 +1,245 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+import pickle
+import warnings
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+
+from licences import load_licences, monthly_counts_by
+
+CACHE_FILE = "data/cleaned/models/seasonal_cache.pkl"
+OUTPUT_FILE = "data/cleaned/business_forecast_seasonal_with_ci.csv"
+
+FUTURE_YEARS = np.arange(2025, 2030)
+
+# Seasonal model specifications on monthly counts. Both are state-space
+# models, so months missing between extracts can be passed as NaN.
+MODEL_SPECS = {
+    "sarima": {"order": (1, 0, 1), "seasonal_order": (1, 0, 0, 12), "trend": "c"},
+    "ets": {"trend": True, "damped_trend": True, "seasonal": 12, "initialization_method": "simple"},
+}
+
+# Minimum history before a business type gets its own seasonal model
+MIN_ACTIVE_MONTHS = 12
+MIN_LICENCES = 60
+
+# Cached parameters are re-used (filter only) until this many new months arrive
+REFIT_AFTER_MONTHS = 12
+
+
+def make_model(kind, y):
+    """Build an unfitted statsmodels state-space model for a monthly series"""
+    if kind == "sarima":
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+        return SARIMAX(y, **MODEL_SPECS["sarima"])
+    if kind == "ets":
+        # Additive-error Holt-Winters in state-space form
+        from statsmodels.tsa.statespace.exponential_smoothing import ExponentialSmoothing
+        return ExponentialSmoothing(y, **MODEL_SPECS["ets"])
+    raise ValueError(f"Unknown model kind: {kind}")
+
+
+def history_hash(y):
+    """SHA-256 of a monthly series (NaN gaps included)"""
+    return hashlib.sha256(np.ascontiguousarray(y, dtype=np.float64).tobytes()).hexdigest()
+
+
+def fit_or_update(y, cached, kind, first_month=None):
+    """Fit a model, or re-filter the cached parameters if the cache is still fresh.
+
+    The cache is fresh when it was fitted on the same first month and the
+    months it was fitted on are unchanged (a re-clean that revises history
+    forces a refit), and fewer than REFIT_AFTER_MONTHS months have been added
+    since. Returns (results, cache_entry, action) with action in
+    {'fit', 'update', 'reuse'}.
+    """
+    model = make_model(kind, y)
+    n_obs = len(y)
+    first_month = None if first_month is None else str(pd.Timestamp(first_month).date())
+    if cached is not None and cached["kind"] == kind and cached["n_obs"] <= n_obs \
+            and n_obs - cached["fitted_n_obs"] < REFIT_AFTER_MONTHS \
+            and cached.get("first_month") == first_month \
+            and cached.get("history_sha256") == history_hash(y[:cached["fitted_n_obs"]]):
+        # New months only run the Kalman filter with the stored parameters
+        results = model.filter(cached["params"])
+        action = "reuse" if cached["n_obs"] == n_obs else "update"
+        entry = dict(cached, n_obs=n_obs)
+        return results, entry, action
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        results = model.fit(disp=False)
+    entry = {"kind": kind, "params": np.asarray(results.params), "n_obs": n_obs, "fitted_n_obs": n_obs,
+             "first_month": first_month, "history_sha256": history_hash(y)}
+    return results, entry, "fit"
+
+
+def _psd_sqrt(matrix):
+    """M with M @ M.T == matrix for a (possibly singular) covariance matrix"""
+    values, vectors = np.linalg.eigh(matrix)
+    return vectors * np.sqrt(np.clip(values, 0, None))
+
+
+def simulate_paths(results, steps, repetitions, rng):
+    """Future observations (steps x repetitions) simulated from the end of a state-space fit.
+
+    Same distribution as results.simulate(anchor="end", repetitions=...), but
+    all paths advance together with one matrix product per step rather than
+    one simulation-smoother pass per repetition (which was most of a cached
+    rerun's time).
+    """
+    ssm = results.filter_results
+    # SARIMAX stores its constant trend as a per-month state intercept
+    constant_intercept = (ssm.state_intercept == ssm.state_intercept[:, :1]).all()
+    time_invariant = constant_intercept and all(
+        getattr(ssm, name).shape[-1] == 1
+        for name in ["design", "obs_intercept", "obs_cov", "transition", "selection", "state_cov"])
+    if not time_invariant:
+        try:
+            return np.asarray(results.simulate(steps, anchor="end", repetitions=repetitions, rng=rng))
+        except TypeError:
+            # statsmodels < 0.15 names the generator argument random_state
+            return np.asarray(results.simulate(steps, anchor="end", repetitions=repetitions, random_state=rng))
+    design, obs_intercept = ssm.design[..., 0], ssm.obs_intercept[:, 0]
+    transition, state_intercept = ssm.transition[..., 0], ssm.state_intercept[:, 0]
+    state_shock = ssm.selection[..., 0] @ _psd_sqrt(ssm.state_cov[..., 0])
+    obs_shock = _psd_sqrt(ssm.obs_cov[..., 0])
+
+    start = _psd_sqrt(ssm.predicted_state_cov[..., -1])
+    state = ssm.predicted_state[:, -1] + rng.standard_normal((repetitions, start.shape[1])) @ start.T
+    paths = np.empty((steps, repetitions))
+    for t in range(steps):
+        noise = rng.standard_normal((repetitions, obs_shock.shape[1])) @ obs_shock.T
+        paths[t] = (state @ design.T + obs_intercept + noise)[:, 0]
+        state = state @ transition.T + state_intercept \
+            + rng.standard_normal((repetitions, state_shock.shape[1])) @ state_shock.T
+    return paths
+
+
+def simulate_yearly(results, last_month, observed, future_years=FUTURE_YEARS,
+                    n_simulations=1000, random_state=0):
+    """Yearly totals (mean, 2.5%, 97.5%) from simulated monthly paths.
+
+    Months already observed in a forecast year are added to every path so a
+    partially observed year is not undercounted.
+    """
+    end = pd.Timestamp(f"{future_years.max()}-12-01")
+    future_months = pd.date_range(last_month + pd.DateOffset(months=1), end, freq="MS")
+    if len(future_months) == 0:
+        return []
+    rng = np.random.default_rng(random_state)
+    paths = simulate_paths(results, len(future_months), n_simulations, rng)
+    paths = np.clip(paths.reshape(len(future_months), -1), 0, None)
+
+    rows = []
+    years = future_months.year.to_numpy()
+    for year in future_years:
+        totals = paths[years == year].sum(axis=0) + observed.get(int(year), 0)
+        rows.append({
+            "year": int(year),
+            "predicted_count": float(totals.mean()),
+            "ci_lower": float(np.percentile(totals, 2.5)),
+            "ci_upper": float(np.percentile(totals, 97.5)),
+        })
+    return rows
+
+
+def _forecast_task(task):
+    """Worker: fit/update one business type and return its forecast rows"""
+    btype, values, first_month, cached, kind, n_simulations = task
+    months = pd.date_range(first_month, periods=len(values), freq="MS")
+    y = pd.Series(values.astype(float), index=months)
+    results, entry, action = fit_or_update(y.to_numpy(), cached, kind, first_month)
+    observed = y.groupby(y.index.year).sum().to_dict()
+    rows = simulate_yearly(results, months[-1], observed, n_simulations=n_simulations)
+    for row in rows:
+        row["businesstype"] = btype
+    return btype, entry, action, rows
+
+
+def load_cache(path=CACHE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_cache(cache, path=CACHE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(cache, f)
+
+
+def forecast_all_types(monthly, kind="sarima", cache=None, max_workers=None, n_simulations=1000):
+    """Seasonal forecasts for every business type with enough history.
+
+    `monthly` is a month x businesstype count frame (see monthly_counts_by).
+    Months with no licences of any type are gaps between extracts (as in
+    recovery.py and crisis_report.py) and are passed to the models as missing.
+    Types are fitted in a process pool. Returns (forecast_df, cache, actions).
+    """
+    cache = {} if cache is None else cache
+    eligible = [c for c in monthly.columns
+                if monthly[c].sum() >= MIN_LICENCES and (monthly[c] > 0).sum() >= MIN_ACTIVE_MONTHS]
+    first_month = monthly.index[0]
+    gaps = (monthly.sum(axis=1) == 0).to_numpy()
+    tasks = []
+    for btype in eligible:
+        values = monthly[btype].to_numpy(dtype=float)
+        values[gaps] = np.nan
+        tasks.append((btype, values, first_month, cache.get((kind, btype)), kind, n_simulations))
+
+    rows, actions = [], {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for btype, entry, action, type_rows in executor.map(_forecast_task, tasks):
+            cache[(kind, btype)] = entry
+            actions[btype] = action
+            rows.extend(type_rows)
+
+    columns = ["businesstype", "year", "predicted_count", "ci_lower", "ci_upper"]
+    return pd.DataFrame(rows, columns=columns), cache, actions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seasonal per-type licence forecasts")
+    parser.add_argument("--model", choices=sorted(MODEL_SPECS), default="sarima")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--simulations", type=int, default=1000)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"SEASONAL FORECASTS ({args.model.upper()}) BY BUSINESS TYPE")
+    print("=" * 70)
+
+    start = time()
+    df = load_licences(columns=["issueddate", "businesstype"])
+    monthly = monthly_counts_by(df, "businesstype")
+    print(f"Monthly series: {monthly.shape[1]} types x {monthly.shape[0]} months "
+          f"({monthly.index[0]:%Y-%m} to {monthly.index[-1]:%Y-%m})")
+
+    cache = load_cache()
+    forecast_df, cache, actions = forecast_all_types(
+        monthly, kind=args.model, cache=cache, max_workers=args.workers,
+        n_simulations=args.simulations
+    )
+    save_cache(cache)
+
+    counts = pd.Series(actions).value_counts()
+    print(f"\nModels: {len(actions)} "
+          f"(fitted {counts.get('fit', 0)}, updated {counts.get('update', 0)}, reused {counts.get('reuse', 0)})")
+
+    forecast_df.to_csv(OUTPUT_FILE, index=False)
+    if not forecast_df.empty:
+        top = forecast_df[forecast_df["year"] == FUTURE_YEARS.max()].nlargest(5, "predicted_count")
+        print(f"\nTop 5 business types forecasted for {FUTURE_YEARS.max()} (with 95% CI):")
+        for _, row in top.iterrows():
+            print(f"  {row['businesstype']}: {row['predicted_count']:.0f} "
+                  f"[{row['ci_lower']:.0f}, {row['ci_upper']:.0f}]")
+
+    print(f"\n✓ Saved: {OUTPUT_FILE}")
+    print(f"✓ Cache: {CACHE_FILE}")
+    print(f"Total time: {time()-start:.1f}s")
@@ -0,0 +1,174 @@
+import pandas as pd
+import numpy as np
+import os
+from time import time
+from scipy.spatial import cKDTree
+
+from licences import CRISES, crisis_bounds, load_licences, is_closed
+
+EARTH_RADIUS_M = 6_371_000.0
+
+# geo_point_2d looks like "{'lon': -123.11, 'lat': 49.28}"; geom is a GeoJSON
+# Feature string with "'coordinates': [lon, lat]"
+GEO_POINT_PATTERN = r"'lon':\s*(?P<lon>-?\d+(?:\.\d+)?),\s*'lat':\s*(?P<lat>-?\d+(?:\.\d+)?)"
+GEOM_PATTERN = r"'coordinates':\s*\[(?P<lon>-?\d+(?:\.\d+)?),\s*(?P<lat>-?\d+(?:\.\d+)?)\]"
+
+# Approximate SkyTrain station locations inside the City of Vancouver (lon, lat)
+SKYTRAIN_STATIONS = {
+    "Waterfront": (-123.1116, 49.2859),
+    "Burrard": (-123.1200, 49.2856),
+    "Granville": (-123.1162, 49.2833),
+    "Stadium-Chinatown": (-123.1094, 49.2794),
+    "Main Street-Science World": (-123.1004, 49.2732),
+    "Commercial-Broadway": (-123.0692, 49.2626),
+    "Nanaimo": (-123.0559, 49.2483),
+    "29th Avenue": (-123.0460, 49.2442),
+    "Joyce-Collingwood": (-123.0318, 49.2384),
+    "VCC-Clark": (-123.0789, 49.2658),
+    "Renfrew": (-123.0453, 49.2589),
+    "Rupert": (-123.0329, 49.2608),
+    "Vancouver City Centre": (-123.1190, 49.2824),
+    "Yaletown-Roundhouse": (-123.1219, 49.2745),
+    "Olympic Village": (-123.1156, 49.2665),
+    "Broadway-City Hall": (-123.1146, 49.2629),
+    "King Edward": (-123.1154, 49.2492),
+    "Oakridge-41st Avenue": (-123.1164, 49.2334),
+    "Langara-49th Avenue": (-123.1165, 49.2264),
+    "Marine Drive": (-123.1170, 49.2097),
+}
+
+
+def parse_coordinates(df):
+    """Extract lon/lat float arrays from geo_point_2d (falling back to geom).
+
+    Rows without a usable point get NaN. Parsing is a single regex pass per column.
+    """
+    lon = np.full(len(df), np.nan)
+    lat = np.full(len(df), np.nan)
+    for col, pattern in [("geo_point_2d", GEO_POINT_PATTERN), ("geom", GEOM_PATTERN)]:
+        if col not in df.columns:
+            continue
+        missing = np.isnan(lon)
+        if not missing.any():
+            break
+        coords = df[col].astype("string").str.extract(pattern).astype(float)
+        fill = missing & coords["lon"].notna().to_numpy()
+        lon[fill] = coords["lon"].to_numpy()[fill]
+        lat[fill] = coords["lat"].to_numpy()[fill]
+    return lon, lat
+
+
+class SpatialIndex:
+    """KD-tree over licence points projected to local metres.
+
+    Query results are row positions into the lon/lat arrays the index was
+    built from, so they can be used directly with ``df.iloc`` or numpy masks.
+    """
+
+    def __init__(self, lon, lat):
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        self.rows = np.flatnonzero(~np.isnan(lon) & ~np.isnan(lat))
+        self.lon = lon[self.rows]
+        self.lat = lat[self.rows]
+        self.lon0 = float(self.lon.mean()) if len(self.rows) else 0.0
+        self.lat0 = float(self.lat.mean()) if len(self.rows) else 0.0
+        self.xy = self.project(self.lon, self.lat)
+        self.tree = cKDTree(self.xy)
+        self._lon_order = np.argsort(self.lon, kind="stable")
+
+    def project(self, lon, lat):
+        """Equirectangular projection to metres around the index centre"""
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        x = np.radians(lon - self.lon0) * np.cos(np.radians(self.lat0)) * EARTH_RADIUS_M
+        y = np.radians(lat - self.lat0) * EARTH_RADIUS_M
+        return np.column_stack([x, y])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def radius(self, lon, lat, meters):
+        """Rows within `meters` of each query point (list of arrays, one per point)"""
+        hits = self.tree.query_ball_point(self.project(lon, lat), r=meters)
+        return [self.rows[np.asarray(h, dtype=np.int64)] for h in hits]
+
+    def count_within(self, lon, lat, meters, weights=None):
+        """Number (or weighted sum) of points within `meters` of each query point"""
+        hits = self.tree.query_ball_point(self.project(lon, lat), r=meters)
+        sizes = np.array([len(h) for h in hits])
+        if weights is None:
+            return sizes
+        flat = np.concatenate([np.asarray(h, dtype=np.int64) for h in hits] + [np.empty(0, dtype=np.int64)])
+        owner = np.repeat(np.arange(len(hits)), sizes)
+        w = np.asarray(weights, dtype=float)[self.rows]
+        return np.bincount(owner, weights=w[flat], minlength=len(hits))
+
+    def bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Rows inside a lon/lat bounding box"""
+        sorted_lon = self.lon[self._lon_order]
+        lo = np.searchsorted(sorted_lon, min_lon, side="left")
+        hi = np.searchsorted(sorted_lon, max_lon, side="right")
+        candidates = self._lon_order[lo:hi]
+        inside = (self.lat[candidates] >= min_lat) & (self.lat[candidates] <= max_lat)
+        return np.sort(self.rows[candidates[inside]])
+
+    def nearest(self, lon, lat, k=1):
+        """Distances (metres) and rows of the k nearest points to each query point.
+
+        k is capped at the number of indexed points (cKDTree pads missing
+        neighbours with an out-of-range index).
+        """
+        dist, idx = self.tree.query(self.project(lon, lat), k=min(k, len(self.rows)))
+        return dist, self.rows[idx]
+
+
+def closure_density_by_crisis(df, index, points, meters=500, crises=CRISES):
+    """Closures within `meters` of each point for every crisis window.
+
+    A closure is a licence with a closed status whose expiry falls inside the
+    crisis window. Returns one row per point x crisis.
+    """
+    closed = is_closed(df["status"]).to_numpy()
+    expired = df["expired_date"]
+    names = list(points)
+    lon = np.array([points[n][0] for n in names])
+    lat = np.array([points[n][1] for n in names])
+    area_km2 = np.pi * (meters / 1000.0) ** 2
+
+    licences_within = index.count_within(lon, lat, meters)
+    rows = []
+    for crisis_name, (start_ts, end_ts) in crisis_bounds(crises).items():
+        in_window = ((expired >= start_ts) & (expired <= end_ts)).to_numpy()
+        closures = index.count_within(lon, lat, meters, weights=closed & in_window)
+        for i, name in enumerate(names):
+            rows.append({
+                "point": name,
+                "crisis": crisis_name,
+                "licences_within": int(licences_within[i]),
+                "closures": int(closures[i]),
+                "closures_per_km2": closures[i] / area_km2,
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("SPATIAL INDEX: CLOSURES NEAR SKYTRAIN STATIONS")
+    print("=" * 70)
+
+    start = time()
+    df = load_licences(columns=["licencenumber", "status", "issueddate", "expireddate",
+                                "businesstype", "localarea", "geom", "geo_point_2d"])
+    lon, lat = parse_coordinates(df)
+    index = SpatialIndex(lon, lat)
+    print(f"Indexed {len(index):,} / {len(df):,} geocoded licences ({time()-start:.1f}s)")
+
+    density = closure_density_by_crisis(df, index, SKYTRAIN_STATIONS, meters=500)
+    table = density.pivot(index="point", columns="crisis", values="closures_per_km2")
+    print("\nClosures per km² within 500 m of each station:")
+    print(table.round(1).to_string())
+
+    os.makedirs("data/cleaned", exist_ok=True)
+    density.to_csv("data/cleaned/station_closure_density.csv", index=False)
+    print("\n✓ Saved: data/cleaned/station_closure_density.csv")
@@ -0,0 +1,217 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+from time import time
+from scipy import sparse
+
+from licences import CRISES, crisis_bounds, load_licences, is_closed
+from spatial import EARTH_RADIUS_M, parse_coordinates
+
+CUBE_DIR = "data/cleaned/hex_cube"
+MEASURES = ["openings", "closures"]
+
+# Fixed projection origin so cell ids stay stable between rebuilds (downtown Vancouver)
+ORIGIN = (-123.1207, 49.2827)
+
+
+def project(lon, lat, origin=ORIGIN):
+    """Equirectangular projection of lon/lat to metres around `origin`"""
+    lon0, lat0 = origin
+    x = np.radians(np.asarray(lon, dtype=float) - lon0) * np.cos(np.radians(lat0)) * EARTH_RADIUS_M
+    y = np.radians(np.asarray(lat, dtype=float) - lat0) * EARTH_RADIUS_M
+    return x, y
+
+
+def unproject(x, y, origin=ORIGIN):
+    """Inverse of project()"""
+    lon0, lat0 = origin
+    lon = lon0 + np.degrees(np.asarray(x) / (EARTH_RADIUS_M * np.cos(np.radians(lat0))))
+    lat = lat0 + np.degrees(np.asarray(y) / EARTH_RADIUS_M)
+    return lon, lat
+
+
+def hex_cells(x, y, size):
+    """Axial (q, r) coordinates of the pointy-top hexagon containing each point.
+
+    `size` is the hexagon circumradius in metres. Uses cube-coordinate rounding,
+    fully vectorized.
+    """
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def hex_centers(q, r, size):
+    """Projected centre (x, y) in metres of axial hex cells"""
+    x = size * np.sqrt(3) * (np.asarray(q) + np.asarray(r) / 2)
+    y = size * 1.5 * np.asarray(r)
+    return x, y
+
+
+def month_index(dates, first_month):
+    """Whole months between each date and `first_month` (NaN dates -> -1)"""
+    months = dates.dt.year * 12 + dates.dt.month - (first_month.year * 12 + first_month.month)
+    return months.fillna(-1).astype(np.int64).to_numpy()
+
+
+def build_hex_cube(df, size=500):
+    """Aggregate openings and closures per hex cell x month x businesstype.
+
+    Openings are counted in the month a licence was issued; closures in the
+    month a closed licence expired. Each measure is stored as a sparse CSC
+    matrix of shape (cells, months * types) with month-major columns, so a
+    date range is one contiguous column slice.
+    """
+    lon, lat = parse_coordinates(df)
+    located = ~np.isnan(lon)
+    x, y = project(lon[located], lat[located])
+    q, r = hex_cells(x, y, size)
+
+    cell_keys = pd.MultiIndex.from_arrays([q, r])
+    cell_codes, cells = pd.factorize(cell_keys, sort=True)
+    type_codes, types = pd.factorize(df["businesstype"].fillna("unknown").to_numpy()[located], sort=True)
+
+    issued = df["issued_date"][located]
+    expired = df["expired_date"].where(is_closed(df["status"]))[located]
+    all_dates = pd.concat([issued, expired])
+    first_month = all_dates.min().to_period("M").to_timestamp()
+    last_month = all_dates.max().to_period("M").to_timestamp()
+    months = pd.date_range(first_month, last_month, freq="MS")
+    n_cells, n_months, n_types = len(cells), len(months), len(types)
+
+    cube = {
+        "size": size,
+        "origin": ORIGIN,
+        "cells": np.array([list(c) for c in cells], dtype=np.int64).reshape(-1, 2),
+        "months": months,
+        "types": list(types),
+    }
+    for measure, dates in [("openings", issued), ("closures", expired)]:
+        m = month_index(dates, first_month)
+        keep = m >= 0
+        cols = m[keep] * n_types + type_codes[keep]
+        cube[measure] = sparse.csc_matrix(
+            (np.ones(keep.sum(), dtype=np.int32), (cell_codes[keep], cols)),
+            shape=(n_cells, n_months * n_types)
+        )
+    return cube
+
+
+def save_cube(cube, directory=CUBE_DIR):
+    """Write each measure as .npz plus a JSON header describing the axes"""
+    os.makedirs(directory, exist_ok=True)
+    for measure in MEASURES:
+        sparse.save_npz(os.path.join(directory, f"{measure}.npz"), cube[measure])
+    header = {
+        "size": cube["size"],
+        "origin": list(cube["origin"]),
+        "cells": cube["cells"].tolist(),
+        "months": [m.strftime("%Y-%m") for m in cube["months"]],
+        "types": cube["types"],
+    }
+    with open(os.path.join(directory, "header.json"), "w") as f:
+        json.dump(header, f)
+
+
+def load_cube(directory=CUBE_DIR):
+    """Load a cube written by save_cube()"""
+    with open(os.path.join(directory, "header.json")) as f:
+        header = json.load(f)
+    cube = {
+        "size": header["size"],
+        "origin": tuple(header["origin"]),
+        "cells": np.array(header["cells"], dtype=np.int64).reshape(-1, 2),
+        "months": pd.to_datetime([m + "-01" for m in header["months"]]),
+        "types": header["types"],
+    }
+    for measure in MEASURES:
+        cube[measure] = sparse.load_npz(os.path.join(directory, f"{measure}.npz")).tocsc()
+    return cube
+
+
+def slice_window(cube, measure, start, end, types=None):
+    """Cell x type counts summed over months in [start, end] (dense array)"""
+    n_types = len(cube["types"])
+    months = cube["months"]
+    m0 = months.searchsorted(pd.Timestamp(start).to_period("M").to_timestamp())
+    m1 = months.searchsorted(pd.Timestamp(end).to_period("M").to_timestamp(), side="right")
+    block = cube[measure][:, m0 * n_types:m1 * n_types]
+    # Columns are month-major: fold months onto the type axis
+    folded = block.tocoo()
+    per_type = sparse.coo_matrix(
+        (folded.data, (folded.row, folded.col % n_types)), shape=(block.shape[0], n_types)
+    ).toarray()
+    if types is not None:
+        per_type = per_type[:, [cube["types"].index(t) for t in types]]
+    return per_type
+
+
+def crisis_cell_totals(cube, crises=CRISES):
+    """Openings, closures and net change per cell for each crisis window"""
+    x, y = hex_centers(cube["cells"][:, 0], cube["cells"][:, 1], cube["size"])
+    lon, lat = unproject(x, y, cube["origin"])
+    frames = []
+    for name, (start_ts, end_ts) in crisis_bounds(crises).items():
+        openings = slice_window(cube, "openings", start_ts, end_ts).sum(axis=1)
+        closures = slice_window(cube, "closures", start_ts, end_ts).sum(axis=1)
+        frames.append(pd.DataFrame({
+            "crisis": name,
+            "q": cube["cells"][:, 0],
+            "r": cube["cells"][:, 1],
+            "lon": lon,
+            "lat": lat,
+            "openings": openings,
+            "closures": closures,
+            "net_change": openings - closures,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    print("=" * 70)
+    print("HEX-BIN SPATIAL CUBE")
+    print("=" * 70)
+
+    start = time()
+    df = load_licences(columns=["status", "issueddate", "expireddate", "businesstype",
+                                "geom", "geo_point_2d"])
+    cube = build_hex_cube(df, size=500)
+    save_cube(cube)
+    n_cells, n_cols = cube["openings"].shape
+    print(f"Cells: {n_cells:,}, months: {len(cube['months'])}, types: {len(cube['types'])}")
+    print(f"Non-zero entries: openings {cube['openings'].nnz:,}, closures {cube['closures'].nnz:,}")
+    print(f"✓ Saved cube → {CUBE_DIR} ({time()-start:.1f}s)")
+
+    totals = crisis_cell_totals(cube)
+    totals.to_csv("data/cleaned/hex_crisis_totals.csv", index=False)
+    print("✓ Saved: data/cleaned/hex_crisis_totals.csv")
+
+    fig, axes = plt.subplots(2, 3, figsize=(18, 11))
+    axes = axes.flatten()
+    limit = max(1, np.abs(totals["net_change"]).max())
+    for ax, (name, group) in zip(axes, totals.groupby("crisis", sort=False)):
+        active = group[(group["openings"] > 0) | (group["closures"] > 0)]
+        sc = ax.scatter(active["lon"], active["lat"], c=active["net_change"], cmap="RdYlGn",
+                        vmin=-limit, vmax=limit, marker="h", s=120, edgecolors="grey", linewidths=0.3)
+        ax.set_title(name, fontsize=12, fontweight="bold")
+        ax.set_xticks([])
+        ax.set_yticks([])
+    for ax in axes[len(CRISES):]:
+        fig.delaxes(ax)
+    fig.colorbar(sc, ax=axes[:len(CRISES)].tolist(), label="Openings - closures")
+    plt.suptitle("Net Licence Change per 500 m Hex Cell During Each Crisis", fontsize=16, fontweight="bold")
+    plt.savefig("results/crisis_hex_maps.png", dpi=300, bbox_inches="tight")
+    plt.close(fig)
+    print("✓ Saved: results/crisis_hex_maps.png")
@@ -0,0 +1,292 @@
+import pandas as pd
+import numpy as np
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+from statsmodels.duration.hazard_regression import PHReg
+
+from grouped import run_grouped
+from licences import CRISES, is_closed, load_licences, parse_dates, tag_crises
+from profiling import span, traced
+
+# Licence survival with right-censoring, per group x crisis period.
+#
+# The event is closure: a licence with a closed status (licences.py
+# CLOSED_STATUSES) closes at its expiry date. Every other licence is censored
+# at its expiry date, or at the extract date if it had not expired by then.
+# An expired licence without a closed status may be renewed under a new
+# record, so it is not counted as a closure. Closed licences with no expiry
+# date have no known closure time and are dropped.
+#
+# Kaplan-Meier curves are computed on a grid of BIN_DAYS-wide bins for every
+# group at once: event and censoring counts come from one bincount over
+# (group, bin), and at-risk counts, hazards and survival are cumulative sums
+# and products along the bin axis. Bootstrap bands resample each group's
+# (bin, event/censored) counts with Poisson draws, the same scheme as the
+# crisis impact bootstrap; blocks of groups run in a process pool.
+# Cox proportional-hazards fits (statsmodels PHReg) give the hazard ratio of
+# each crisis period against licences issued in normal times.
+
+CURVES_FILE = "data/cleaned/survival_curves.csv"
+COX_FILE = "data/cleaned/survival_cox.csv"
+
+BIN_DAYS = 7
+MIN_LICENCES = 30          # smaller group x crisis cells get no curve
+MIN_EVENTS = 10            # Cox fits need at least this many closures
+REFERENCE_PERIOD = "Normal"
+GROUPS_PER_TASK = 16       # bootstrap work unit (fixed, so results don't depend on workers)
+
+
+def lifetimes(df, crises=CRISES):
+    """Per licence: crisis_period, duration_days and event (1 = closed, 0 = censored).
+
+    Licences without a valid issue date, closed licences without an expiry
+    date, and licences that expire before they are issued are dropped.
+    """
+    issued = df["issued_date"] if "issued_date" in df.columns else parse_dates(df["issueddate"])
+    expired = df["expired_date"] if "expired_date" in df.columns else parse_dates(df["expireddate"])
+    observed_until = parse_dates(df["extractdate"]) if "extractdate" in df.columns \
+        else pd.Series(issued.max(), index=df.index)
+    observed_until = observed_until.fillna(observed_until.max())
+
+    closed = is_closed(df["status"])
+    ended = expired.notna() & (expired <= observed_until)
+    end = expired.where(ended, observed_until)
+    duration = (end - issued).dt.days.astype(float)
+    event = (closed & ended).to_numpy().astype(np.int8)
+
+    out = df.assign(crisis_period=tag_crises(issued.dt.normalize(), crises), duration_days=duration, event=event)
+    valid = (issued.notna() & (duration >= 0) & ~(closed & expired.isna())).to_numpy()
+    return out[valid].reset_index(drop=True)
+
+
+def km_from_counts(events, censored):
+    """Kaplan-Meier survival and Greenwood standard error along the last axis.
+
+    events/censored hold counts per time bin, shaped (..., bins); censoring in
+    a bin is applied after that bin's events. Returns (survival, se, at_risk).
+    """
+    leaving = events + censored
+    at_risk = leaving.sum(axis=-1, keepdims=True) - np.cumsum(leaving, axis=-1) + leaving
+    hazard = np.divide(events, at_risk, out=np.zeros_like(events, dtype=float), where=at_risk > 0)
+    survival = np.cumprod(1.0 - hazard, axis=-1)
+    excess = at_risk * (at_risk - events)
+    greenwood = np.cumsum(np.divide(events, excess, out=np.zeros_like(hazard), where=excess > 0), axis=-1)
+    return survival, survival * np.sqrt(greenwood), at_risk
+
+
+def bin_counts(codes, n_groups, duration_days, event, bin_days=BIN_DAYS):
+    """(events, censored) count arrays of shape (groups, bins up to the longest lifetime)"""
+    bins = (np.asarray(duration_days) // bin_days).astype(np.intp)
+    n_bins = int(bins.max()) + 1 if len(bins) else 1
+    flat = np.asarray(codes) * n_bins + bins
+    event = np.asarray(event, dtype=float)
+    size = n_groups * n_bins
+    events = np.bincount(flat, weights=event, minlength=size).reshape(n_groups, n_bins)
+    censored = np.bincount(flat, weights=1.0 - event, minlength=size).reshape(n_groups, n_bins)
+    return events, censored
+
+
+def _bootstrap_task(task):
+    events, censored, n_bootstrap, seed = task
+    rng = np.random.default_rng(seed)
+    draws_e = rng.poisson(events, size=(n_bootstrap,) + events.shape).astype(float)
+    draws_c = rng.poisson(censored, size=(n_bootstrap,) + censored.shape).astype(float)
+    survival, _, _ = km_from_counts(draws_e, draws_c)
+    return np.percentile(survival, [2.5, 97.5], axis=0)
+
+
+@traced("bootstrap survival")
+def bootstrap_bands(events, censored, n_bootstrap=1000, random_state=0, max_workers=None):
+    """95% percentile bands (lower, upper), each shaped (groups, bins)"""
+    starts = range(0, len(events), GROUPS_PER_TASK)
+    seeds = np.random.SeedSequence(random_state).spawn(len(starts))
+    tasks = [(events[s:s + GROUPS_PER_TASK], censored[s:s + GROUPS_PER_TASK], n_bootstrap, seed)
+             for s, seed in zip(starts, seeds)]
+    if len(tasks) <= 1 or max_workers == 1:
+        bands = [_bootstrap_task(task) for task in tasks]
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            bands = list(executor.map(_bootstrap_task, tasks))
+    if not bands:
+        empty = np.empty((0, events.shape[1]))
+        return empty, empty
+    bands = np.concatenate(bands, axis=1)
+    return bands[0], bands[1]
+
+
+def median_survival(survival, bin_days=BIN_DAYS):
+    """Days until survival first drops to 0.5 or below (NaN if it never does)"""
+    below = survival <= 0.5
+    return np.where(below.any(axis=-1), below.argmax(axis=-1) * bin_days, np.nan)
+
+
+def kaplan_meier_curves(life, by="businesstype", min_licences=MIN_LICENCES, n_bootstrap=1000,
+                        random_state=0, max_workers=None):
+    """Kaplan-Meier curves for every (by, crisis_period) cell with min_licences rows.
+
+    Returns (curves, summary): curves has one row per cell and bin while
+    anyone is at risk; summary has one row per cell with its size, events,
+    median survival and survival at one year.
+    """
+    keys = (life[by].astype(str) + "|" + life["crisis_period"].astype(str)).where(life[by].notna())
+    codes, labels = pd.factorize(keys, sort=True)
+    sizes = np.bincount(codes[codes >= 0], minlength=len(labels))
+    kept = np.flatnonzero(sizes >= min_licences)
+    remap = np.full(len(labels), -1)
+    remap[kept] = np.arange(len(kept))
+    rows = np.flatnonzero((codes >= 0) & (remap[np.maximum(codes, 0)] >= 0))
+
+    events, censored = bin_counts(remap[codes[rows]], len(kept), life["duration_days"].to_numpy()[rows],
+                                  life["event"].to_numpy()[rows])
+    survival, se, at_risk = km_from_counts(events, censored)
+    lower, upper = bootstrap_bands(events, censored, n_bootstrap, random_state, max_workers)
+
+    cells = pd.Series(labels[kept]).str.split("|", n=1, expand=True)
+    n_groups, n_bins = survival.shape
+    curves = pd.DataFrame({
+        by: np.repeat(cells[0].to_numpy(), n_bins),
+        "crisis_period": np.repeat(cells[1].to_numpy(), n_bins),
+        "day": np.tile(np.arange(n_bins) * BIN_DAYS, n_groups),
+        "at_risk": at_risk.ravel().astype(int),
+        "events": events.ravel().astype(int),
+        "censored": censored.ravel().astype(int),
+        "survival": survival.ravel(),
+        "se": se.ravel(),
+        "ci_lower": lower.ravel(),
+        "ci_upper": upper.ravel(),
+    })
+    curves = curves[curves["at_risk"] > 0].reset_index(drop=True)
+
+    year_bin = min(365 // BIN_DAYS, n_bins - 1)
+    summary = pd.DataFrame({
+        by: cells[0].to_numpy(),
+        "crisis_period": cells[1].to_numpy(),
+        "licences": sizes[kept],
+        "events": events.sum(axis=1).astype(int),
+        "censored": censored.sum(axis=1).astype(int),
+        "median_days": median_survival(survival),
+        "survival_1y": survival[:, year_bin],
+        "survival_1y_ci_lower": lower[:, year_bin],
+        "survival_1y_ci_upper": upper[:, year_bin],
+    })
+    return curves, summary
+
+
+def _crisis_design(periods, reference=REFERENCE_PERIOD):
+    """Crisis indicator columns (reference period dropped, empty columns removed)"""
+    dummies = pd.get_dummies(periods, dtype=float).drop(columns=reference, errors="ignore")
+    return dummies.loc[:, dummies.sum() > 0]
+
+
+def cox_hazard_ratios(life, strata=None, min_events=MIN_EVENTS):
+    """Hazard ratio of each crisis period vs REFERENCE_PERIOD from one PHReg fit.
+
+    strata (e.g. business type) gives every stratum its own baseline hazard.
+    Returns one row per crisis period, or None when there is too little data.
+    """
+    if life["event"].sum() < min_events or life["crisis_period"].nunique() < 2 \
+            or REFERENCE_PERIOD not in set(life["crisis_period"]):
+        return None
+    exog = _crisis_design(life["crisis_period"])
+    if exog.empty:
+        return None
+    model = PHReg(life["duration_days"].to_numpy(float), exog.to_numpy(), status=life["event"].to_numpy(),
+                  strata=None if strata is None else np.asarray(strata), ties="breslow")
+    try:
+        # Separated cells (e.g. every licence of a period closes first) don't
+        # converge; they are kept and flagged rather than warned about
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fit = model.fit(disp=False)
+            params, bse, pvalues = np.asarray(fit.params), np.asarray(fit.bse), np.asarray(fit.pvalues)
+    except (np.linalg.LinAlgError, ValueError):
+        return None
+    converged = bool(getattr(fit, "mle_retvals", {}).get("converged", True))
+    with np.errstate(over="ignore"):
+        low, high = np.exp(params - 1.96 * bse), np.exp(params + 1.96 * bse)
+    events = life.groupby("crisis_period")["event"].sum()
+    counts = life["crisis_period"].value_counts()
+    return [{
+        "crisis_period": crisis,
+        "licences": int(counts[crisis]),
+        "events": int(events[crisis]),
+        "hazard_ratio": np.exp(params[i]),
+        "ci_lower": low[i],
+        "ci_upper": high[i],
+        "p_value": pvalues[i],
+        "converged": converged,
+    } for i, crisis in enumerate(exog.columns)]
+
+
+def _cox_group(key, group):
+    return cox_hazard_ratios(group)
+
+
+def cox_table(life, by="businesstype", min_events=MIN_EVENTS, max_workers=None):
+    """Crisis hazard ratios pooled over all licences (stratified by `by`) and per group"""
+    with span("cox pooled", rows=len(life)):
+        dated = life[life[by].notna()]
+        pooled = pd.DataFrame(cox_hazard_ratios(dated, strata=dated[by], min_events=min_events) or [])
+    pooled.insert(0, by, "all (stratified)")
+    with span("cox per group", rows=len(life)):
+        per_group = run_grouped(life, by, _cox_group, columns=["crisis_period", "duration_days", "event"],
+                                max_workers=max_workers, min_rows=MIN_LICENCES, sort=True)
+    return pd.concat([pooled, per_group], ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Kaplan-Meier and Cox survival of licences by crisis")
+    parser.add_argument("--by", default="businesstype", choices=["businesstype", "sector"])
+    parser.add_argument("--bootstrap", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("LICENCE SURVIVAL: KAPLAN-MEIER AND COX PROPORTIONAL HAZARDS")
+    print("=" * 70)
+
+    start = time()
+    columns = ["status", "issueddate", "expireddate", "extractdate", "businesstype", "businesssubtype"]
+    with span("load") as stage:
+        df = load_licences(columns=columns)
+        stage.rows = len(df)
+    if args.by == "sector":
+        from taxonomy import sector_names, to_sectors
+        df["sector"] = sector_names(to_sectors(df["businesstype"], df["businesssubtype"])).to_numpy()
+    with span("lifetimes", rows=len(df)):
+        life = lifetimes(df)
+    print(f"Licences: {len(life):,} ({life['event'].sum():,} closed, "
+          f"{(life['event'] == 0).sum():,} censored)")
+
+    with span("kaplan-meier", rows=len(life)):
+        curves, summary = kaplan_meier_curves(life, by=args.by, n_bootstrap=args.bootstrap,
+                                              max_workers=args.workers)
+    cox = cox_table(life, by=args.by, max_workers=args.workers)
+    print(f"Computed {len(summary):,} curves and {len(cox):,} hazard ratios in {time()-start:.1f}s")
+
+    print("\nHazard of closure vs licences issued in normal times (all types, stratified):")
+    for _, row in cox[cox[args.by] == "all (stratified)"].iterrows():
+        print(f"  {row['crisis_period']:20s} HR {row['hazard_ratio']:.2f} "
+              f"[{row['ci_lower']:.2f}, {row['ci_upper']:.2f}] ({row['events']:,} closures)")
+
+    shortest = summary.dropna(subset=["median_days"]).nsmallest(10, "median_days")
+    print("\nShortest median licence lifetimes:")
+    for _, row in shortest.iterrows():
+        print(f"  {row[args.by]} / {row['crisis_period']}: {row['median_days']:.0f} days "
+              f"(n={row['licences']:,}, 1-year survival {row['survival_1y']:.2f})")
+
+    os.makedirs("data/cleaned", exist_ok=True)
+    curves.to_csv(CURVES_FILE, index=False)
+    summary.to_csv(CURVES_FILE.replace(".csv", "_summary.csv"), index=False)
+    cox.to_csv(COX_FILE, index=False)
+    print(f"\n✓ Saved: {CURVES_FILE}")
+    print(f"✓ Saved: {CURVES_FILE.replace('.csv', '_summary.csv')}")
+    print(f"✓ Saved: {COX_FILE}")
@@ -0,0 +1,320 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import shutil
+from time import time
+from concurrent.futures import ProcessPoolExecutor
+
+from normalize import BUSINESS_TYPE_CANONICAL, HISTORIC_MARKER, STATUS_CANONICAL, normalize_labels
+
+# Synthetic licence generator fitted to the raw extracts.
+#
+# learn_profile() summarises each raw extract separately (its share of rows,
+# column order, issue-month profile, expiry lags, date formats and the
+# frequency tables of every other column). Correlated columns are sampled
+# jointly as tuples: business type with subtype, the address/location block,
+# and city/province/country. Generation is chunked: chunk i is drawn from
+# default_rng([seed, i]), so output is identical for any number of workers.
+
+RAW_FILES = {
+    "1997_2012": "data/raw/1997_2012.csv",
+    "2013_2024": "data/raw/2013_2024.csv",
+    "current_2024_plus": "data/raw/current_2024_plus.csv"
+}
+PROFILE_FILE = "data/cleaned/synthetic_profile.json"
+CLEANED_NAME = "business_licences_1997_2024"
+
+JOINT_GROUPS = [
+    ["businesstype", "businesssubtype"],
+    ["unit", "unittype", "house", "street", "postalcode", "localarea", "geom", "geo_point_2d"],
+    ["city", "province", "country"],
+]
+# Generated rather than sampled from frequency tables
+DERIVED_COLUMNS = ["folderyear", "licencersn", "licencenumber", "businessname",
+                   "businesstradename", "issueddate", "expireddate"]
+
+MAX_TABLE_SIZE = 5000
+CHUNK_ROWS = 250_000
+
+
+# =============================================================================
+# LEARNING
+# =============================================================================
+
+def _json_value(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
+
+
+def frequency_table(frame, max_size=MAX_TABLE_SIZE):
+    """Most frequent value tuples of the given columns (missing values kept) with probabilities"""
+    counts = frame.value_counts(dropna=False).head(max_size)
+    values = [[_json_value(v) for v in (key if isinstance(key, tuple) else (key,))] for key in counts.index]
+    return {"columns": list(frame.columns), "values": values,
+            "p": (counts / counts.sum()).round(8).tolist()}
+
+
+def learn_extract(df):
+    """Profile of one raw extract"""
+    issued = pd.to_datetime(df["issueddate"], errors="coerce", utc=True, format="ISO8601").dt.tz_convert(None)
+    expired = pd.to_datetime(df["expireddate"], errors="coerce", utc=True, format="ISO8601").dt.tz_convert(None)
+    months = issued.dt.strftime("%Y-%m").value_counts()
+    both = issued.notna() & expired.notna()
+    lags = (expired[both].dt.year - issued[both].dt.year).value_counts()
+    expiry_days = expired.dt.strftime("%m-%d").value_counts().head(50)
+    expiry_years = expired.dt.year.dropna().astype(int).value_counts()
+    issued_text = df["issueddate"].dropna().astype(str)
+
+    profile = {
+        "rows": len(df),
+        "columns": list(df.columns),
+        "issued": {
+            "missing": float(issued.isna().mean()),
+            "months": months.index.tolist(),
+            "p": (months / months.sum()).round(8).tolist(),
+            "with_time": float(issued_text.str.contains("T").mean()) if len(issued_text) else 0.0,
+        },
+        "expired": {
+            "missing_when_issued": float(expired[issued.notna()].isna().mean()) if issued.notna().any() else 1.0,
+            "missing_when_not_issued": float(expired[issued.isna()].isna().mean()) if issued.isna().any() else 1.0,
+            "lags": lags.index.astype(int).tolist(),
+            "lag_p": (lags / lags.sum()).round(8).tolist(),
+            "days": expiry_days.index.tolist(),
+            "day_p": (expiry_days / expiry_days.sum()).round(8).tolist(),
+            "years": expiry_years.index.tolist(),
+            "year_p": (expiry_years / expiry_years.sum()).round(8).tolist(),
+        },
+        "missing": {col: float(df[col].isna().mean()) for col in ["businessname", "businesstradename"]
+                    if col in df.columns},
+        "folderyear": frequency_table(df[["folderyear"]]),
+        "tables": [],
+    }
+    grouped = {col for group in JOINT_GROUPS for col in group}
+    for group in JOINT_GROUPS:
+        present = [c for c in group if c in df.columns]
+        if present:
+            profile["tables"].append(frequency_table(df[present]))
+    for col in df.columns:
+        if col not in grouped and col not in DERIVED_COLUMNS:
+            profile["tables"].append(frequency_table(df[[col]]))
+    return profile
+
+
+def learn_profile(raw_files=RAW_FILES):
+    """Profiles of every available raw extract"""
+    extracts = {}
+    for name, path in raw_files.items():
+        if os.path.exists(path):
+            extracts[name] = learn_extract(pd.read_csv(path, low_memory=False))
+    if not extracts:
+        raise FileNotFoundError("No raw extracts found to learn from (run fetch.py first)")
+    total = sum(p["rows"] for p in extracts.values())
+    for profile in extracts.values():
+        profile["weight"] = profile["rows"] / total
+    return {"extracts": extracts}
+
+
+def load_profile(path=PROFILE_FILE, refresh=False):
+    """Cached profile; learned from the raw CSVs when missing or refresh=True"""
+    if os.path.exists(path) and not refresh:
+        with open(path) as f:
+            return json.load(f)
+    profile = learn_profile()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(profile, f)
+    return profile
+
+
+# =============================================================================
+# GENERATION
+# =============================================================================
+
+def _sample(rng, values, p, n):
+    p = np.asarray(p, dtype=float)
+    return rng.choice(len(values), size=n, p=p / p.sum())
+
+
+def generate_extract(profile, n, rng, first_id=0):
+    """n raw-schema rows drawn from one extract profile"""
+    columns = {}
+    for table in profile["tables"]:
+        picks = _sample(rng, table["values"], table["p"], n)
+        values = np.array(table["values"], dtype=object).reshape(len(table["values"]), -1)[picks]
+        for k, col in enumerate(table["columns"]):
+            columns[col] = values[:, k]
+
+    # Issue dates: month from the learned profile, day and time uniform within it
+    info = profile["issued"]
+    has_issued = rng.random(n) >= info["missing"]
+    month_start = pd.to_datetime(np.array(info["months"], dtype=object)[_sample(rng, info["months"], info["p"], n)]
+                                 if info["months"] else np.full(n, "2000-01"), format="%Y-%m")
+    seconds = (rng.random(n) * month_start.days_in_month * 86400).astype(np.int64)
+    issued = month_start + pd.to_timedelta(seconds, unit="s")
+    with_time = rng.random(n) < info["with_time"]
+    stamps = issued.to_numpy().astype("datetime64[s]")
+    issued_text = np.where(with_time, np.char.add(np.datetime_as_string(stamps, unit="s"), "+00:00"),
+                           np.datetime_as_string(stamps, unit="D"))
+    columns["issueddate"] = np.where(has_issued, issued_text, None)
+
+    # Expiry: learned lag in years after issue, or the marginal expiry year when not issued
+    exp = profile["expired"]
+    lag = np.array(exp["lags"] or [0])[_sample(rng, exp["lags"] or [0], exp["lag_p"] or [1.0], n)]
+    marginal_year = np.array(exp["years"] or [2000])[_sample(rng, exp["years"] or [0], exp["year_p"] or [1.0], n)]
+    expiry_year = np.where(has_issued, issued.year.to_numpy() + lag, marginal_year)
+    day = np.array(exp["days"] or ["12-31"], dtype=object)[_sample(rng, exp["days"] or [0], exp["day_p"] or [1.0], n)]
+    missing_expiry = np.where(has_issued, exp["missing_when_issued"], exp["missing_when_not_issued"])
+    has_expiry = rng.random(n) >= missing_expiry
+    expiry_text = np.char.add(np.char.add(expiry_year.astype(str), "-"), day.astype(str))
+    columns["expireddate"] = np.where(has_expiry, expiry_text, None)
+
+    folder = profile["folderyear"]
+    sampled_folder = np.array([v[0] for v in folder["values"]], dtype=object)[
+        _sample(rng, folder["values"], folder["p"], n)]
+    columns["folderyear"] = np.where(has_issued, issued.year.to_numpy() % 100, sampled_folder)
+
+    ids = first_id + np.arange(n)
+    columns["licencersn"] = ids + 1
+    id_text = pd.Series(ids).astype(str)
+    folder_text = (pd.Series(columns["folderyear"]).astype(int) % 100).astype(str).str.zfill(2)
+    columns["licencenumber"] = (folder_text + "-" + (pd.Series(ids) % 1_000_000).astype(str).str.zfill(6)).to_numpy()
+    missing = profile["missing"]
+    columns["businessname"] = np.where(rng.random(n) >= missing.get("businessname", 0.0),
+                                       ("Synthetic Business " + id_text).to_numpy(), None)
+    columns["businesstradename"] = np.where(rng.random(n) >= missing.get("businesstradename", 1.0),
+                                            ("Trade Name " + id_text).to_numpy(), None)
+    return pd.DataFrame({col: columns.get(col) for col in profile["columns"]}, columns=profile["columns"])
+
+
+def cleaned_columns(profile):
+    """Column order of clean.py's merged output: first extract, 'year', then later additions"""
+    extracts = list(profile["extracts"].values())
+    columns = extracts[0]["columns"] + ["year"]
+    for extract in extracts[1:]:
+        columns += [c for c in extract["columns"] if c not in columns]
+    return columns
+
+
+def to_cleaned(chunk, columns):
+    """Apply clean.py's normalization to a raw-schema chunk (lowercase labels, year column)"""
+    chunk = chunk.copy()
+    canonical = {"status": STATUS_CANONICAL, "businesstype": BUSINESS_TYPE_CANONICAL}
+    for col in ["status", "businesstype", "businesssubtype"]:
+        if col in chunk.columns:
+            chunk[col] = normalize_labels(chunk[col], canonical.get(col),
+                                          drop_markers=() if col == "status" else (HISTORIC_MARKER,))
+    chunk["year"] = pd.to_datetime(chunk["issueddate"], errors="coerce", utc=True, format="ISO8601").dt.year
+    return chunk.reindex(columns=columns)
+
+
+def _write_part(frame, path, fmt):
+    if fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def _chunk_task(task):
+    """Generate chunk i for every extract and write its part files (worker process)"""
+    profile, i, n, seed, first_id, out_dir, fmt, cleaned = task
+    rng = np.random.default_rng([seed, i])
+    counts = rng.multinomial(n, [p["weight"] for p in profile["extracts"].values()])
+    columns = cleaned_columns(profile) if cleaned else None
+    written = {}
+    for k, ((name, extract), count) in enumerate(zip(profile["extracts"].items(), counts)):
+        frame = generate_extract(extract, int(count), rng, first_id=first_id)
+        first_id += int(count)
+        target = name
+        if cleaned:
+            frame = to_cleaned(frame, columns)
+            target = CLEANED_NAME
+        part_dir = os.path.join(out_dir, f".{target}.parts")
+        os.makedirs(part_dir, exist_ok=True)
+        _write_part(frame, os.path.join(part_dir, f"part-{i:05d}-{k}.{fmt}"), fmt)
+        written[target] = written.get(target, 0) + int(count)
+    return written
+
+
+def _combine_parts(part_dir, path, fmt):
+    """Concatenate CSV parts by streaming bytes (headers after the first skipped)"""
+    parts = sorted(os.listdir(part_dir))
+    if fmt == "parquet":
+        os.makedirs(path, exist_ok=True)
+        for part in parts:
+            os.replace(os.path.join(part_dir, part), os.path.join(path, part))
+    else:
+        with open(path, "wb") as out:
+            for k, part in enumerate(parts):
+                with open(os.path.join(part_dir, part), "rb") as f:
+                    if k > 0:
+                        f.readline()
+                    shutil.copyfileobj(f, out)
+    shutil.rmtree(part_dir)
+
+
+def write_synthetic(n_rows, out_dir, profile=None, seed=0, fmt="csv", layout="raw",
+                    chunk_rows=CHUNK_ROWS, max_workers=None):
+    """Stream n_rows synthetic licences to disk, generating chunks in parallel.
+
+    layout='raw' writes one file per extract (<out_dir>/<extract>.csv, the
+    fetch.py layout); layout='cleaned' writes business_licences_1997_2024.csv
+    normalized like clean.py. fmt='parquet' writes a directory of part files
+    per output instead (requires pyarrow). Returns {output path: rows}.
+    """
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown format: {fmt} (expected 'csv' or 'parquet')")
+    profile = profile or load_profile()
+    cleaned = layout == "cleaned"
+    os.makedirs(out_dir, exist_ok=True)
+
+    tasks = [(profile, i, min(chunk_rows, n_rows - lo), seed, lo, out_dir, fmt, cleaned)
+             for i, lo in enumerate(range(0, n_rows, chunk_rows))]
+    if len(tasks) <= 1 or max_workers == 1:
+        results = [_chunk_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_chunk_task, tasks))
+
+    totals = {}
+    for result in results:
+        for target, rows in result.items():
+            totals[target] = totals.get(target, 0) + rows
+    outputs = {}
+    for target, rows in totals.items():
+        path = os.path.join(out_dir, f"{target}.{fmt}" if fmt == "csv" else target)
+        _combine_parts(os.path.join(out_dir, f".{target}.parts"), path, fmt)
+        outputs[path] = rows
+    return outputs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic licence data fitted to the raw extracts")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--out", default="data/synthetic")
+    parser.add_argument("--layout", choices=["raw", "cleaned"], default="raw")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--refresh-profile", action="store_true", help="re-learn from data/raw/*.csv")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("SYNTHETIC LICENCE GENERATOR")
+    print("=" * 70)
+
+    start = time()
+    profile = load_profile(refresh=args.refresh_profile)
+    shares = [f"{name} ({extract['weight']:.0%})" for name, extract in profile["extracts"].items()]
+    print(f"Profile: {', '.join(shares)}")
+    outputs = write_synthetic(args.rows, args.out, profile, seed=args.seed, fmt=args.format,
+                              layout=args.layout, max_workers=args.workers)
+    elapsed = time() - start
+    print(f"Generated {args.rows:,} rows in {elapsed:.1f}s ({args.rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    for path, rows in outputs.items():
+        print(f"✓ Saved: {path} ({rows:,} rows)")
@@ -0,0 +1,216 @@
+import pandas as pd
+import numpy as np
+import os
+import re
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+from normalize import BUSINESS_TYPE_CANONICAL, normalize_labels
+
+# Cross-era business type -> sector taxonomy.
+#
+# Mapping tables are versioned CSVs, data/taxonomy/sector_map_v<N>.csv, with
+# columns businesstype, businesssubtype (blank = any subtype), sector,
+# origin (curated | suggested), similarity and matched_label. The latest
+# version is used unless TAXONOMY_VERSION is set. Labels are matched after
+# normalize.py, so "Contractor *Historic*" and "general contractor" share a
+# row.
+#
+# A table is compiled once per process (and again only if the file changes)
+# into a label index plus an array of sector codes, so to_sectors() is one
+# categorical lookup over the rows. Labels missing from the table are
+# reported by suggest_mappings(), which proposes the sector of the most
+# similar mapped label (character trigrams, as in data/fetch/dedupe.py).
+
+TAXONOMY_DIR = "data/taxonomy"
+TABLE_PATTERN = re.compile(r"sector_map_v(\d+)\.csv$")
+SUGGESTIONS_FILE = os.path.join(TAXONOMY_DIR, "sector_map_suggestions.csv")
+
+# Suggestions below this cosine similarity are left for manual review
+SUGGEST_THRESHOLD = 0.5
+
+SECTORS = {
+    "CON": "Construction & trades",
+    "FOOD": "Food service & hospitality",
+    "RET": "Retail",
+    "WHL": "Wholesale, manufacturing & warehousing",
+    "PROF": "Professional & business services",
+    "FIN": "Finance, insurance & real estate",
+    "HLTH": "Health care",
+    "PERS": "Personal & beauty services",
+    "HOUS": "Accommodation & rental housing",
+    "ENT": "Arts, entertainment & recreation",
+    "EDU": "Education & instruction",
+    "TRN": "Transportation & automotive",
+    "TECH": "Information & technology",
+    "COMM": "Community & non-profit",
+    "RES": "Natural resources",
+    "OTH": "Other licences & permits",
+}
+UNMAPPED = "UNMAPPED"
+SECTOR_CODES = list(SECTORS) + [UNMAPPED]
+
+Lookup = namedtuple("Lookup", ["version", "labels", "sector_codes", "overrides"])
+
+
+def table_versions(directory=TAXONOMY_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(m.group(1)) for m in map(TABLE_PATTERN.match, os.listdir(directory)) if m)
+
+
+def table_path(version=None, directory=TAXONOMY_DIR):
+    """Path of a mapping table (TAXONOMY_VERSION or the latest by default)"""
+    if version is None:
+        version = os.environ.get("TAXONOMY_VERSION")
+    if version is None:
+        versions = table_versions(directory)
+        if not versions:
+            raise FileNotFoundError(f"No sector_map_v<N>.csv tables in {directory}")
+        version = versions[-1]
+    path = os.path.join(directory, f"sector_map_v{int(version)}.csv")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found (versions: {table_versions(directory)})")
+    return path
+
+
+def load_table(version=None, directory=TAXONOMY_DIR):
+    return pd.read_csv(table_path(version, directory), dtype=str, keep_default_na=False)
+
+
+@lru_cache(maxsize=8)
+def _compile(path, mtime):
+    table = pd.read_csv(path, dtype=str, keep_default_na=False)
+    unknown = set(table["sector"]) - set(SECTORS)
+    if unknown:
+        raise ValueError(f"{path}: unknown sector codes {sorted(unknown)}")
+    base = table[table["businesssubtype"] == ""].drop_duplicates("businesstype", keep="last")
+    sub = table[table["businesssubtype"] != ""]
+    position = {code: i for i, code in enumerate(SECTOR_CODES)}
+    labels = pd.Index(base["businesstype"])
+    sector_codes = np.array([position[s] for s in base["sector"]], dtype=np.int16)
+    overrides = {f"{t}|{s}": position[code]
+                 for t, s, code in zip(sub["businesstype"], sub["businesssubtype"], sub["sector"])}
+    version = int(TABLE_PATTERN.search(path).group(1))
+    return Lookup(version, labels, sector_codes, overrides)
+
+
+def compiled_lookup(version=None, directory=TAXONOMY_DIR):
+    path = table_path(version, directory)
+    return _compile(path, os.path.getmtime(path))
+
+
+def to_sectors(types, subtypes=None, version=None, directory=TAXONOMY_DIR):
+    """Sector code per row as a Categorical over SECTOR_CODES.
+
+    Types missing from the table become UNMAPPED; missing types stay NA.
+    Subtype-specific rows in the table take precedence when subtypes are given.
+    """
+    lookup = compiled_lookup(version, directory)
+    types = normalize_labels(types, BUSINESS_TYPE_CANONICAL)
+    type_codes = pd.Categorical(types, categories=lookup.labels).codes
+    codes = np.append(lookup.sector_codes, SECTOR_CODES.index(UNMAPPED))[type_codes]
+    codes[types.isna().to_numpy()] = -1
+
+    if subtypes is not None and lookup.overrides:
+        override_types = {key.split("|", 1)[0] for key in lookup.overrides}
+        rows = np.flatnonzero(types.isin(override_types).to_numpy())
+        if len(rows):
+            subtypes = normalize_labels(pd.Series(subtypes).iloc[rows])
+            keys = types.iloc[rows].astype(str).to_numpy() + "|" + subtypes.fillna("").astype(str).to_numpy()
+            matched = pd.Series(keys).map(lookup.overrides)
+            hit = matched.notna().to_numpy()
+            codes[rows[hit]] = matched[hit].astype(int).to_numpy()
+
+    return pd.Series(pd.Categorical.from_codes(codes, SECTOR_CODES), index=types.index, name="sector")
+
+
+def sector_names(codes):
+    """Readable names for sector codes (UNMAPPED kept as is)"""
+    return pd.Series(codes).map(lambda c: SECTORS.get(c, c) if pd.notna(c) else c)
+
+
+def _trigram_vectorizer():
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "fetch"))
+    from dedupe import _vectorizer
+    return _vectorizer
+
+
+def suggest_mappings(types, version=None, directory=TAXONOMY_DIR, threshold=SUGGEST_THRESHOLD):
+    """Proposed sectors for type labels the table does not cover.
+
+    Each unmapped label takes the sector of its most similar mapped label;
+    below threshold the sector is left blank for manual review.
+    """
+    lookup = compiled_lookup(version, directory)
+    labels = normalize_labels(pd.Series(types).dropna().drop_duplicates(), BUSINESS_TYPE_CANONICAL).dropna().unique()
+    unmapped = sorted(set(labels) - set(lookup.labels))
+    columns = ["businesstype", "businesssubtype", "sector", "origin", "similarity", "matched_label"]
+    if not unmapped:
+        return pd.DataFrame(columns=columns)
+
+    vectorizer = _trigram_vectorizer()
+    similarity = (vectorizer.transform(unmapped) @ vectorizer.transform(list(lookup.labels)).T).toarray()
+    best = similarity.argmax(axis=1)
+    score = similarity[np.arange(len(unmapped)), best]
+    sectors = np.array(SECTOR_CODES, dtype=object)[lookup.sector_codes[best]]
+    return pd.DataFrame({
+        "businesstype": unmapped,
+        "businesssubtype": "",
+        "sector": np.where(score >= threshold, sectors, ""),
+        "origin": "suggested",
+        "similarity": score.round(3),
+        "matched_label": lookup.labels[best],
+    })[columns]
+
+
+def accept_suggestions(suggestions, version=None, directory=TAXONOMY_DIR):
+    """Write the next table version with the suggestions that have a sector"""
+    current = table_path(version, directory)
+    table = pd.read_csv(current, dtype=str, keep_default_na=False)
+    accepted = suggestions[suggestions["sector"] != ""].astype(str)
+    updated = pd.concat([table, accepted], ignore_index=True).sort_values(["businesstype", "businesssubtype"])
+    path = os.path.join(directory, f"sector_map_v{table_versions(directory)[-1] + 1}.csv")
+    updated.to_csv(path, index=False)
+    return path, len(accepted)
+
+
+if __name__ == "__main__":
+    import argparse
+    from licences import load_licences
+
+    parser = argparse.ArgumentParser(description="Check sector taxonomy coverage and suggest mappings")
+    parser.add_argument("--version", type=int, default=None)
+    parser.add_argument("--threshold", type=float, default=SUGGEST_THRESHOLD)
+    parser.add_argument("--accept", action="store_true", help="write the next table version with suggestions")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("BUSINESS TYPE SECTOR TAXONOMY")
+    print("=" * 70)
+
+    df = load_licences(columns=["businesstype", "businesssubtype"])
+    lookup = compiled_lookup(args.version)
+    sectors = to_sectors(df["businesstype"], df["businesssubtype"], version=args.version)
+    print(f"Table: {table_path(args.version)} ({len(lookup.labels)} labels, {len(lookup.overrides)} subtype rules)")
+    print(f"Rows mapped: {(sectors.notna() & (sectors != UNMAPPED)).sum():,} / {df['businesstype'].notna().sum():,}")
+
+    counts = sectors.value_counts()
+    print("\nLicences per sector:")
+    for code, count in counts[counts > 0].items():
+        print(f"  {code:9s} {SECTORS.get(code, code):40s} {count:7,}")
+
+    suggestions = suggest_mappings(df["businesstype"], args.version, threshold=args.threshold)
+    if suggestions.empty:
+        print("\nEvery business type is mapped.")
+    else:
+        os.makedirs(TAXONOMY_DIR, exist_ok=True)
+        suggestions.to_csv(SUGGESTIONS_FILE, index=False)
+        needs_review = (suggestions["sector"] == "").sum()
+        print(f"\n{len(suggestions)} unmapped labels ({needs_review} below the similarity threshold)")
+        print(suggestions.head(20).to_string(index=False))
+        print(f"\n✓ Saved: {SUGGESTIONS_FILE}")
+        if args.accept:
+            path, accepted = accept_suggestions(suggestions, args.version)
+            print(f"✓ Saved: {path} ({accepted} suggested mappings added)")
@@ -1,9 +1,12 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import os
 
+import figures
+from plotting import render_figures, report
+from count_store import load_counts
+from licences import crisis_bounds
+
 # raw = pd.read_csv("data/cleaned/business_licences_1997_2024.csv")
 # raw['issueddate'] = pd.to_datetime(raw['issueddate'], errors='coerce')
 # raw['date'] = raw['issueddate']
@@ -64,7 +67,7 @@ import os
 
 # print("✓ Saved: sector_level_crisis_impact.png")
 
-df = pd.read_csv("data/cleaned/business_type_by_year.csv")
+df = load_counts("business_type_by_year").reset_index()
 
 # Clean column names
 df.columns = df.columns.str.strip().str.lower()
@@ -72,18 +75,12 @@ df.columns = df.columns.str.strip().str.lower()
 # Convert year to int
 df["year"] = df["year"].astype(int)
 
-# Crisis windows (year-based)
-CRISES = {
-    "Dot-Com": (2000, 2002),
-    "Great Recession": (2008, 2009),
-    "Oil Crash": (2014, 2016),
-    "COVID-19": (2020, 2021),
-    "Rate Shock": (2022, 2023)
-}
+# Crisis windows from licences.py, as the calendar years they touch
+CRISES = {name: (start.year, end.year) for name, (start, end) in crisis_bounds().items()}
 
 all_results = []
 
-# Business type columns (everything except year)
+# Sector columns (everything except year; crisis_analysis.py groups types by sector)
 business_cols = [c for c in df.columns if c != "year"]
 
 for crisis_name, (start, end) in CRISES.items():
@@ -106,7 +103,7 @@ for crisis_name, (start, end) in CRISES.items():
     pct_change = (crisis_pct - baseline_pct)
 
     temp = pd.DataFrame({
-        "businesstype": business_cols,
+        "sector": business_cols,
         "pct_change": pct_change.values,
         "crisis": crisis_name
     })
@@ -117,21 +114,12 @@ for crisis_name, (start, end) in CRISES.items():
 result_df = pd.concat(all_results)
 
 # Pivot for heatmap
-heat = result_df.pivot(index="businesstype", columns="crisis", values="pct_change")
-
-plt.figure(figsize=(12, 14))
-sns.heatmap(
-    heat,
-    cmap="RdYlGn",   # HIGH = GREEN, LOW = RED
-    center=0,
-    linewidths=0.5
-)
-plt.title("Business Type Impact Across Economic Crises (Year-based)")
-plt.tight_layout()
-plt.savefig("results/business_type_crisis_heatmap.png", dpi=300)
-plt.show()
-
-print("✓ Saved heatmap: business_type_crisis_heatmap.png")
+heat = result_df.pivot(index="sector", columns="crisis", values="pct_change")
+
+report(render_figures([
+    {"path": "results/business_type_crisis_heatmap", "render": figures.crisis_heatmap,
+     "data": {"heat": heat, "title": "Sector Impact Across Economic Crises (Year-based)"}},
+]))
 
 
 ##########